@@ -4,74 +4,51 @@ import threading
 import sys
 import os
 import time
-import sqlite3
-import sounddevice as sd
+import queue
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from scipy.io.wavfile import write
 
 # Backend modüllerini bağla
 sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
 
+# Bu modüller torch / pyannote / faster-whisper'ı import anında yüklemez; giriş
+# ekranı hemen açılır, ağır kütüphaneler girişten sonra arka planda ısıtılır.
 try:
     from backend.cloud_api import CloudTranscriber
     import backend.main as local_processor 
+    from transcription.streaming import StreamingTranscriber, format_words
 except ImportError:
     CloudTranscriber = None
     local_processor = None
+    StreamingTranscriber = None
 
-# --- VERİTABANI YÖNETİCİSİ ---
-class DatabaseManager:
-    def __init__(self, db_name="asistan_veritabani.db"):
-        self.conn = sqlite3.connect(db_name, check_same_thread=False)
-        self.cursor = self.conn.cursor()
-        self.create_tables()
-
-    def create_tables(self):
-        self.cursor.execute('''CREATE TABLE IF NOT EXISTS users
-                              (username TEXT PRIMARY KEY, password TEXT)''')
-        self.cursor.execute('''CREATE TABLE IF NOT EXISTS notes
-                              (id INTEGER PRIMARY KEY AUTOINCREMENT, 
-                               username TEXT, 
-                               title TEXT, 
-                               content TEXT, 
-                               timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-        try:
-            self.cursor.execute("INSERT INTO users VALUES ('admin', '1234')")
-            self.conn.commit()
-        except sqlite3.IntegrityError:
-            pass
-        self.conn.commit()
-
-    def login(self, user, pwd):
-        self.cursor.execute("SELECT * FROM users WHERE username=? AND password=?", (user, pwd))
-        return self.cursor.fetchone() is not None
-
-    def save_note(self, username, title, text):
-        self.cursor.execute("INSERT INTO notes (username, title, content) VALUES (?, ?, ?)", (username, title, text))
-        self.conn.commit()
+# Kaydedici ağır bağımlılık taşımaz; lokal modüller yüklenemese de kullanılır
+from transcription.recorder import Recorder
+from transcription import tracing
 
-    def get_notes_list(self, username):
-        self.cursor.execute("SELECT id, title, timestamp FROM notes WHERE username=? ORDER BY id DESC", (username,))
-        return self.cursor.fetchall()
+# --- VERİTABANI YÖNETİCİSİ --- (bkz. backend/database.py)
+from backend.database import DatabaseManager
+from backend.jobs import JobCancelled, JobScheduler
+from openai_client import stream_chat
 
-    def get_note_content(self, note_id):
-        self.cursor.execute("SELECT content FROM notes WHERE id=?", (note_id,))
-        result = self.cursor.fetchone()
-        return result[0] if result else ""
-
-    def get_all_context(self, username):
-        self.cursor.execute("SELECT title, content FROM notes WHERE username=?", (username,))
-        return self.cursor.fetchall()
+# Asistan sorusuna eklenecek en alakalı not parçası sayısı
+CHAT_TOP_K = int(os.getenv("CHAT_TOP_K", "6"))
+# Geçmiş sekmesi: sayfa başına satır ve içerik çiziminde parça boyu (karakter)
+HISTORY_PAGE_SIZE = 100
+RENDER_CHUNK_CHARS = 32 * 1024
+# Akan sohbet cevabı bu aralıkla (ms) toplu olarak pencereye yazılır
+CHAT_FLUSH_MS = 50
 
 # --- GİRİŞ EKRANI ---
 class LoginWindow:
-    def __init__(self, root, on_success):
+    def __init__(self, root, on_success, db):
         self.root = root
         self.on_success = on_success
         self.root.title("Giriş Yap")
         self.root.geometry("350x250")
         self.root.configure(bg="#263238")
-        self.db = DatabaseManager()
+        self.db = db
 
         tk.Label(root, text="AKILLI ASİSTAN GİRİŞİ", bg="#263238", fg="#eceff1", font=("Segoe UI", 14, "bold")).pack(pady=20)
         
@@ -100,10 +77,13 @@ class LoginWindow:
 
 # --- ANA UYGULAMA ---
 class MainApp:
-    def __init__(self, username):
+    def __init__(self, username, db):
         self.root = tk.Tk()
         self.username = username
-        self.db = DatabaseManager()
+        self.db = db
+        # Lokal/cloud/sohbet işleri sınırlı havuzda (aynı dosya iki kez işlenmez)
+        self.jobs = JobScheduler()
+        self.jobs.subscribe(self._on_job_event)
         self.root.title(f"Akıllı Not Asistanı - {username}")
         self.root.geometry("1100x750")
         self.root.configure(bg="#263238")
@@ -131,8 +111,34 @@ class MainApp:
         self.setup_chat_tab()
 
         self.is_recording = False
-        self.recording_data = []
         self.selected_file_path = None
+        self.stream_queue = None
+
+        # Lokal modeller pencere çizildikten sonra arka planda ısıtılır;
+        # ilk "LOKAL MOD" tıklaması beklemez
+        self.root.after(200, self._start_warmup)
+
+    def _start_warmup(self):
+        if not local_processor:
+            self._set_models_status("🧠 Lokal modüller yüklenemedi (sadece Cloud)", "#ef9a9a")
+        elif os.getenv("MODEL_PREWARM", "1") == "0":
+            self._set_models_status("🧠 Lokal modeller ilk kullanımda yüklenecek", "#b0bec5")
+        else:
+            self._set_models_status("🧠 Lokal modeller yükleniyor...", "#ffd54f")
+            local_processor.prewarm_models(
+                on_done=self._on_models_ready,
+                on_status=lambda msg: self.root.after(0, lambda: self._set_models_status(f"🧠 {msg}", "#ffd54f")))
+
+    def _set_models_status(self, text, color):
+        self.lbl_models.config(text=text, fg=color)
+
+    def _on_models_ready(self, error):
+        if error:
+            self.safe_log(f"⚠️ Modeller önceden yüklenemedi: {error}")
+            self.root.after(0, lambda: self._set_models_status("🧠 Modeller yüklenemedi (ilk kullanımda denenecek)", "#ef9a9a"))
+        else:
+            self.safe_log("🧠 Lokal modeller hazır.")
+            self.root.after(0, lambda: self._set_models_status("🧠 Lokal modeller hazır", "#00e676"))
 
     # --- GÜVENLİ LOGLAMA (DONMAYI ENGELLEYEN KISIM) ---
     def safe_log(self, text):
@@ -164,6 +170,11 @@ class MainApp:
         self.btn_record = tk.Button(frame_rec, text="🔴 KAYDI BAŞLAT", command=self.toggle_recording, bg="#d32f2f", fg="white", font=("Arial", 11, "bold"), width=20, bd=0)
         self.btn_record.pack(pady=10)
 
+        # Kayıt sırasında canlı döküm (kayıt bitince sadece son kısım çözülür)
+        self.live_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(frame_rec, text="⚡ Canlı döküm", variable=self.live_var, bg="#37474f", fg="#eceff1",
+                       selectcolor="#263238", activebackground="#37474f", bd=0).pack()
+
         tk.Label(panel_left, text="Veya Dosya Yükle:", bg="#263238", fg="#b0bec5").pack(anchor="w", pady=(20, 5))
         frame_file = tk.Frame(panel_left, bg="#37474f")
         frame_file.pack(fill="x")
@@ -182,6 +193,16 @@ class MainApp:
         self.btn_cloud = tk.Button(panel_left, text="☁️ CLOUD MOD\n(GPT-4o)", command=self.run_cloud, bg="#1e88e5", fg="white", font=("Arial", 10, "bold"), width=30, height=3, bd=0, cursor="hand2")
         self.btn_cloud.pack(pady=5)
 
+        # İş ilerlemesi (aşama, yüzde, kalan süre) + iptal
+        self.job_progress = ttk.Progressbar(panel_left, mode="determinate", maximum=100, length=260)
+        self.job_progress.pack(pady=(15, 2))
+        self.lbl_job = tk.Label(panel_left, text="", bg="#263238", fg="#b0bec5", font=("Arial", 9))
+        self.lbl_job.pack()
+        self.btn_cancel = tk.Button(panel_left, text="✖ İPTAL", command=self.cancel_jobs, bg="#546e7a", fg="white", bd=0, width=12, state="disabled")
+        self.btn_cancel.pack(pady=5)
+        self.lbl_models = tk.Label(panel_left, text="", bg="#263238", fg="#b0bec5", font=("Arial", 9))
+        self.lbl_models.pack(pady=(10, 0))
+
         tk.Label(panel_right, text="📝 İŞLEM DÖKÜMÜ", bg="#1e1e1e", fg="#b0bec5", font=("Arial", 10, "bold")).pack(anchor="w", padx=10, pady=10)
         self.txt_log = scrolledtext.ScrolledText(panel_right, bg="#121212", fg="#00e676", font=("Consolas", 10), bd=0)
         self.txt_log.pack(fill="both", expand=True, padx=10, pady=(0, 10))
@@ -197,9 +218,21 @@ class MainApp:
         self.tree.heading("date", text="Tarih")
         self.tree.column("title", width=180)
         self.tree.column("date", width=100)
+        self.tree_scroll = ttk.Scrollbar(frame_list, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_tree_scroll)
+        self.tree_scroll.pack(side=tk.RIGHT, fill="y")
         self.tree.pack(fill="both", expand=True)
         self.tree.bind("<<TreeviewSelect>>", self.on_history_select)
 
+        # Keyset sayfalama durumu: listedeki en yeni / en eski not id'si
+        self._newest_id = None
+        self._oldest_id = None
+        self._history_exhausted = False
+        self._render_token = 0
+        # Not içerikleri tek, kalıcı bir thread'de okunur: tıklama başına thread (ve her
+        # birinin açık kalan thread-local SQLite okuma bağlantısı) oluşmaz
+        self._history_reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history")
+
         frame_content = tk.Frame(self.tab_history, bg="#1e1e1e")
         frame_content.pack(side=tk.RIGHT, fill="both", expand=True, padx=10, pady=10)
         tk.Label(frame_content, text="İÇERİK", bg="#1e1e1e", fg="gray").pack()
@@ -219,6 +252,12 @@ class MainApp:
         self.entry_chat.pack(side=tk.LEFT, fill="both", expand=True, padx=20, pady=15)
         self.entry_chat.bind("<Return>", lambda event: self.ask_chatbot())
         tk.Button(frame_input, text="GÖNDER", command=self.ask_chatbot, bg="#1e88e5", fg="white", bd=0).pack(side=tk.RIGHT, padx=20, pady=15)
+        tk.Button(frame_input, text="DURDUR", command=self.stop_chat, bg="#e53935", fg="white", bd=0).pack(side=tk.RIGHT, pady=15)
+
+        # Soru başına bir parça kuyruğu; cevaplar soru sırasıyla akar
+        self._chat_answers = deque()
+        self._chat_started = False
+        self._chat_draining = False
 
     def select_file(self):
         path = filedialog.askopenfilename(filetypes=[("Ses", "*.wav *.mp3 *.ogg")])
@@ -229,7 +268,13 @@ class MainApp:
     def toggle_recording(self):
         if not self.is_recording:
             self.is_recording = True
-            self.recording_data = []
+            self.stream_queue = None
+            if self.live_var.get():
+                if StreamingTranscriber:
+                    self.stream_queue = queue.Queue()
+                    threading.Thread(target=self._stream_process, args=(self.stream_queue,), daemon=True).start()
+                else:
+                    self.safe_log("⚠️ Canlı döküm için lokal modüller yüklenemedi.")
             self.btn_record.config(text="⏹️ BİTİR", bg="#37474f")
             threading.Thread(target=self._record).start()
             threading.Thread(target=self._timer).start()
@@ -238,20 +283,67 @@ class MainApp:
             self.btn_record.config(text="🔴 KAYDI BAŞLAT", bg="#d32f2f")
 
     def _record(self):
-        fs = 44100
         try:
-            with sd.InputStream(samplerate=fs, channels=1, callback=lambda i,f,t,s: self.recording_data.append(i.copy())):
-                while self.is_recording: sd.sleep(100)
-            
+            # 16 kHz mono, diske akarak yazılır; bellek kullanımı kayıt süresinden bağımsız
             timestamp = int(time.time())
             filename = f"ses_kaydi_{timestamp}.wav"
-            write(filename, fs, np.concatenate(self.recording_data, axis=0))
+            on_block = self.stream_queue.put if self.stream_queue is not None else None
+            recorder = Recorder(filename, on_block=on_block)
+            try:
+                recorder.start()
+                while self.is_recording: time.sleep(0.1)
+            finally:
+                recorder.stop()
+                if self.stream_queue is not None:
+                    self.stream_queue.put(None)  # canlı dökümü bitir
+
+            if recorder.overflows:
+                self.safe_log(f"⚠️ Yazıcı yetişemedi, {recorder.overflows} örnek düştü.")
             self.selected_file_path = os.path.abspath(filename)
             self.lbl_filename.config(text=f"{filename} (Hazır)", fg="#00e676")
             self.safe_log(f"🎤 Kayıt bitti: {filename}")
         except Exception as e:
             self.safe_log(f"Kayıt Hatası: {e}")
 
+    # --- CANLI DÖKÜM ---
+    def _stream_process(self, blocks):
+        """Kaydedicinin 16 kHz bloklarını artımlı Whisper'a verir; kesinleşen satırları loglar."""
+        try:
+            self.safe_log("⚡ Canlı döküm başladı...")
+            transcriber = StreamingTranscriber()
+            lines, groups = [], []
+            done = False
+            while not done:
+                batch = []
+                try:
+                    # En az bir blok bekle, sonra kuyruktakilerin hepsini al
+                    batch.append(blocks.get(timeout=0.5))
+                    while True:
+                        batch.append(blocks.get_nowait())
+                except queue.Empty:
+                    pass
+                if any(b is None for b in batch):
+                    done = True
+                    batch = [b for b in batch if b is not None]
+                if batch:
+                    transcriber.feed(np.concatenate(batch))
+                words = transcriber.finish() if done else transcriber.process()
+                line = format_words(words)
+                if line:
+                    lines.append(line)
+                    groups.append({"speaker": None, "start": words[0]["start"], "end": words[-1]["end"],
+                                   "text": line.split("] ", 1)[1], "word_count": len(words)})
+                    self.safe_log(line)
+
+            if lines:
+                title = f"Canlı kayıt {time.strftime('%d.%m.%Y %H:%M')}"
+                transcript = {"groups": groups, "words": transcriber.committed}
+                self.db.save_note(self.username, title, "\n".join(lines) + "\n", transcript)
+                self.root.after(0, self.refresh_history)
+                self.safe_log("✅ Canlı döküm tamamlandı ve kaydedildi.")
+        except Exception as e:
+            self.safe_log(f"❌ Canlı Döküm Hatası: {e}")
+
     def _timer(self):
         start = time.time()
         while self.is_recording:
@@ -260,51 +352,97 @@ class MainApp:
             time.sleep(1)
         self.root.after(0, lambda: self.lbl_timer.config(text="00:00"))
 
+    # --- İŞ OLAYLARI ---
+    def _on_job_event(self, event):
+        # İşçi thread'inden gelir; arayüz ana thread'de güncellenir
+        self.root.after(0, lambda: self._show_job_event(event))
+
+    def _show_job_event(self, event):
+        if event.kind == "chat":
+            return
+        if event.state == "queued":
+            self._update_log_ui(f"⏳ İş #{event.job_id} sıraya alındı: {event.message}")
+        elif event.state == "running":
+            if event.stage is not None:
+                self.job_progress["value"] = event.percent or 0
+                eta = f" · ~{event.eta:.0f} sn kaldı" if event.eta is not None else ""
+                self.lbl_job.config(text=f"#{event.job_id} {event.stage} %{event.percent or 0:.0f}{eta}")
+            if event.message:
+                self._update_log_ui(event.message)
+        elif event.state == "done":
+            self.job_progress["value"] = 100
+            self.lbl_job.config(text=f"#{event.job_id} tamamlandı")
+        elif event.state == "failed":
+            self.lbl_job.config(text=f"#{event.job_id} hata")
+            label = {"local": "Lokal", "cloud": "Cloud"}.get(event.kind, event.kind)
+            self._update_log_ui(f"❌ {label} Hata: {event.error}")
+        elif event.state == "cancelled":
+            self.lbl_job.config(text=f"#{event.job_id} iptal edildi")
+            self._update_log_ui(f"🚫 İş #{event.job_id} iptal edildi.")
+        busy = any(job.kind in ("local", "cloud") for job in self.jobs.active())
+        self.btn_cancel.config(state="normal" if busy else "disabled")
+
+    def cancel_jobs(self):
+        self.jobs.cancel_all("local")
+        self.jobs.cancel_all("cloud")
+
+    def _submit_file_job(self, kind, process, label):
+        if not self.selected_file_path: return messagebox.showwarning("Hata", "Dosya seç!")
+        # Yol gönderim anında sabitlenir; sonradan seçilen dosya çalışan işi etkilemez
+        path = self.selected_file_path
+        if self.jobs.is_active(kind, path):
+            self.safe_log(f"⏳ {os.path.basename(path)} zaten işleniyor.")
+            return
+        self.jobs.submit(kind, lambda job: process(job, path), key=path,
+                         title=f"{label}: {os.path.basename(path)}")
+
     # --- LOKAL İŞLEM ---
     def run_local(self):
-        if not self.selected_file_path: return messagebox.showwarning("Hata", "Dosya seç!")
-        threading.Thread(target=self._process_local).start()
+        self._submit_file_job("local", self._process_local, "🏠 Lokal Analiz")
+
+    def _job_tracer(self, job):
+        """Aşama süreleri / RTF / bellek iş log'una yazılır (TRACE_DIR varsa iz dosyası da)."""
+        def on_event(event):
+            line = tracing.format_event(event)
+            if line:
+                job.log(line)
+        return tracing.Tracer(f"{job.kind}-{job.id}", on_event=on_event)
+
+    def _process_local(self, job, path):
+        with self._job_tracer(job) as tracer:
+            # Aşama başı/sonu ilerleme olayı üretir; iptal aşama sınırında işler
+            result = local_processor.run_pipeline(path, on_progress=job.progress)
+            result_text = result["text"] if result else None
+            job.check()
 
-    def _process_local(self):
-        self.safe_log("🏠 Lokal Analiz Başlıyor (Model Yükleniyor, Bekleyin)...")
-        # Butonları kilitlemiyoruz ki GUI donmasın, ama kullanıcıya bilgi verelim
-        try:
-            # Backend'deki printleri buraya alamıyoruz artık, ama işlem bitince sonucu alacağız
-            local_processor.AUDIO_FILE = self.selected_file_path
-            
-            # Bu işlem uzun sürer, bitene kadar bekler
-            result_text = local_processor.main() 
-            
             if result_text:
-                title = os.path.basename(self.selected_file_path)
-                self.db.save_note(self.username, title, result_text)
-                self.safe_log("✅ İŞLEM TAMAM! Sonuç veritabanına kaydedildi.")
-                self.safe_log(f"--- SONUÇ ---\n{result_text}")
-                self.root.after(0, self.refresh_history)
-                messagebox.showinfo("Başarılı", "Lokal işlem bitti!")
-            else:
-                self.safe_log("⚠️ Sonuç boş döndü.")
-        except Exception as e:
-            self.safe_log(f"❌ Lokal Hata: {e}")
+                # Kelime/turn zamanları da yapılandırılmış tablolara yazılır
+                with tracer.span("db_write"):
+                    self.db.save_note(self.username, os.path.basename(path), result_text, result)
+
+        if result_text:
+            job.log("✅ İŞLEM TAMAM! Sonuç veritabanına kaydedildi.")
+            job.log(f"--- SONUÇ ---\n{result_text}")
+            self.root.after(0, self.refresh_history)
+            self.root.after(0, lambda: messagebox.showinfo("Başarılı", "Lokal işlem bitti!"))
+        else:
+            job.log("⚠️ Sonuç boş döndü.")
 
     # --- CLOUD İŞLEM ---
     def run_cloud(self):
-        if not self.selected_file_path: return messagebox.showwarning("Hata", "Dosya seç!")
-        threading.Thread(target=self._process_cloud).start()
+        self._submit_file_job("cloud", self._process_cloud, "☁️ Cloud Analiz")
 
-    def _process_cloud(self):
-        self.safe_log("☁️ Cloud Analiz Başlıyor...")
-        try:
-            transcriber = CloudTranscriber()
-            result = transcriber.process_audio(self.selected_file_path)
-            self.safe_log(f"✅ Sonuç Geldi:\n{result}")
-            
-            title = os.path.basename(self.selected_file_path) + " (Cloud)"
-            self.db.save_note(self.username, title, result)
-            self.root.after(0, self.refresh_history)
-            messagebox.showinfo("Bitti", "Cloud işlem bitti!")
-        except Exception as e:
-            self.safe_log(f"❌ Cloud Hata: {e}")
+    def _process_cloud(self, job, path):
+        with self._job_tracer(job) as tracer:
+            job.progress("cloud", 10)
+            with tracer.span("cloud"):
+                result = CloudTranscriber().process_audio(path)
+            job.progress("save", 90, f"✅ Sonuç Geldi:\n{result}")
+
+            with tracer.span("db_write"):
+                self.db.save_note(self.username, os.path.basename(path) + " (Cloud)", result)
+        self.root.after(0, self.refresh_history)
+        self.root.after(0, lambda: messagebox.showinfo("Bitti", "Cloud işlem bitti!"))
 
     # --- CHATBOT ---
     def ask_chatbot(self):
@@ -314,49 +452,151 @@ class MainApp:
         self.chat_history.configure(state="normal")
         self.chat_history.insert(tk.END, f"Sen: {q}\n", "user")
         self.chat_history.configure(state="disabled")
-        threading.Thread(target=self._chat_process, args=(q,)).start()
 
-    def _chat_process(self, q):
-        try:
-            data = self.db.get_all_context(self.username)
-            context = "\n".join([f"Başlık: {t}\n{c}" for t, c in data])
-            if not context:
-                response = "Henüz kaydedilmiş bir notun yok."
+        answer = queue.Queue()
+        self._chat_answers.append(answer)
+        # Etkileşimli istek: sıradaki lokal/cloud işlerinin önüne geçer
+        job = self.jobs.submit("chat", lambda job: self._chat_process(job, q, answer), priority=10)
+        job.future.add_done_callback(lambda f: self._finish_answer(f, answer))
+        if not self._chat_draining:
+            self._chat_draining = True
+            self.root.after(CHAT_FLUSH_MS, self._drain_chat)
+
+    def stop_chat(self):
+        self.jobs.cancel_all("chat")
+
+    def _chat_process(self, job, q, answer):
+        # Tüm arşiv yerine soruyla en alakalı parçalar (BM25 + vektör)
+        chunks = self.db.retrieve_context(self.username, q, k=CHAT_TOP_K)
+        context = "\n\n".join(f"Başlık: {c['title']}\n{c['content']}" for c in chunks)
+        if not context:
+            answer.put("Henüz kaydedilmiş bir notun yok.")
+            return
+        job.check()
+        prompt = f"Geçmiş notlar:\n{context}\n\nSoru: {q}"
+        # Paylaşılan async istemci; parçalar geldikçe kuyruğa düşer
+        stream = stream_chat([{"role": "user", "content": prompt}], on_delta=answer.put)
+        while not stream.wait(0.1):
+            if job.cancelled:
+                stream.cancel()
+                job.check()
+        return stream.result()
+
+    def _finish_answer(self, future, answer):
+        # İş bitince (başarılı, hatalı ya da iptal) cevabı kapatır; işçi thread'inden gelir
+        if future.cancelled():
+            answer.put(" [iptal edildi]")
+        else:
+            error = future.exception()
+            if isinstance(error, JobCancelled):
+                answer.put(" [durduruldu]")
+            elif isinstance(error, TimeoutError):
+                answer.put("Hata: zaman aşımı")
+            elif error is not None:
+                answer.put(f"Hata: {error}")
+        answer.put(None)
+
+    def _drain_chat(self):
+        """Kuyruktaki parçaları tek insert ile yazar; her parça için ayrı çizim yapılmaz."""
+        texts = []
+        while self._chat_answers:
+            answer = self._chat_answers[0]
+            if not self._chat_started:
+                texts.append("Asistan: ")
+                self._chat_started = True
+            try:
+                item = answer.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                texts.append("\n\n")
+                self._chat_answers.popleft()
+                self._chat_started = False
             else:
-                transcriber = CloudTranscriber()
-                prompt = f"Geçmiş notlar:\n{context}\n\nSoru: {q}"
-                res = transcriber.client.chat.completions.create(
-                    model="gpt-4o", messages=[{"role": "user", "content": prompt}]
-                )
-                response = res.choices[0].message.content
-            self.root.after(0, lambda: self._update_chat_ui(response))
-        except Exception as e:
-            self.root.after(0, lambda: self._update_chat_ui(f"Hata: {e}"))
-
-    def _update_chat_ui(self, text):
-        self.chat_history.configure(state="normal")
-        self.chat_history.insert(tk.END, f"Asistan: {text}\n\n")
-        self.chat_history.see(tk.END)
-        self.chat_history.configure(state="disabled")
+                texts.append(item)
+        if texts:
+            self.chat_history.configure(state="normal")
+            self.chat_history.insert(tk.END, "".join(texts))
+            self.chat_history.see(tk.END)
+            self.chat_history.configure(state="disabled")
+        if self._chat_answers:
+            self.root.after(CHAT_FLUSH_MS, self._drain_chat)
+        else:
+            self._chat_draining = False
 
     def refresh_history(self):
-        for item in self.tree.get_children(): self.tree.delete(item)
-        notes = self.db.get_notes_list(self.username)
-        for note_id, title, timestamp in notes:
+        """Liste boşsa ilk sayfayı yükler; değilse yalnızca yeni notları en üste ekler."""
+        if self._newest_id is None and not self._history_exhausted:
+            self._load_more_history()
+            return
+        for note_id, title, timestamp in self.db.get_notes_since(self.username, self._newest_id or 0):
+            self.tree.insert("", 0, iid=note_id, values=(title, str(timestamp)[:16]))
+            self._newest_id = note_id
+            if self._oldest_id is None:
+                self._oldest_id = note_id
+
+    def _load_more_history(self):
+        """Listenin sonuna bir sonraki (daha eski) sayfayı ekler."""
+        if self._history_exhausted:
+            return
+        rows = self.db.get_notes_page(self.username, before_id=self._oldest_id, limit=HISTORY_PAGE_SIZE)
+        for note_id, title, timestamp in rows:
             self.tree.insert("", "end", iid=note_id, values=(title, str(timestamp)[:16]))
+        if rows:
+            if self._newest_id is None:
+                self._newest_id = rows[0][0]
+            self._oldest_id = rows[-1][0]
+        if len(rows) < HISTORY_PAGE_SIZE:
+            self._history_exhausted = True
+
+    def _on_tree_scroll(self, first, last):
+        self.tree_scroll.set(first, last)
+        # Listenin sonuna yaklaşınca bir sonraki sayfa
+        if float(last) > 0.9 and not self._history_exhausted:
+            self.root.after_idle(self._load_more_history)
 
     def on_history_select(self, event):
         selected = self.tree.selection()
         if not selected: return
-        content = self.db.get_note_content(selected[0])
+        self._render_token += 1
+        token = self._render_token
         self.txt_history_content.delete("1.0", tk.END)
-        self.txt_history_content.insert(tk.END, content)
+        self.txt_history_content.insert(tk.END, "Yükleniyor...")
+        note_id = selected[0]
+
+        def fetch():
+            # Hızlı art arda tıklamalarda kuyrukta bekleyen eski seçimler hiç okunmaz
+            if token != self._render_token:
+                return
+            # İçerik (LRU'da yoksa) SQLite'tan UI thread'i dışında okunur
+            content = self.db.get_note_content(note_id)
+            if token == self._render_token:
+                self.root.after(0, lambda: self._render_content(token, content, 0))
+        self._history_reader.submit(fetch)
+
+    def close(self):
+        self._history_reader.shutdown(wait=True, cancel_futures=True)
+
+    def _render_content(self, token, content, offset):
+        """Büyük dökümleri parça parça yazar; bu arada başka not seçilirse bırakır."""
+        if token != self._render_token:
+            return
+        if offset == 0:
+            self.txt_history_content.delete("1.0", tk.END)
+        end = offset + RENDER_CHUNK_CHARS
+        self.txt_history_content.insert(tk.END, content[offset:end])
+        if end < len(content):
+            self.root.after(1, lambda: self._render_content(token, content, end))
 
 if __name__ == "__main__":
+    # Tek veritabanı katmanı (yazıcı thread + okuma bağlantıları) tüm pencerelerce paylaşılır
+    db = DatabaseManager()
     root_login = tk.Tk()
     def start(user):
-        app = MainApp(user)
+        app = MainApp(user, db)
         app.refresh_history()
         app.root.mainloop()
-    LoginWindow(root_login, start)
-    root_login.mainloop()
\ No newline at end of file
+        app.close()
+    LoginWindow(root_login, start, db)
+    root_login.mainloop()
+    db.close()
\ No newline at end of file
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Kelime ↔ konuşmacı eşleştirme benchmark'ı.
+
+Sentetik kelime/turn listeleri üretir, transcription.align ile eski
+O(kelime × turn) döngüsünü karşılaştırır ve (kelime + turn) başına süreyi
+yazdırır. Sweep-line doğrusal ölçekleniyorsa bu değer boyutla sabit kalır.
+
+Kullanım:
+    python backend/benchmarks/bench_align.py --sizes 1000 10000 100000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from transcription.align import assign_speakers, UNKNOWN_SPEAKER  # noqa: E402
+
+
+def make_data(n_words: int, seed: int = 0):
+    """~4 kelime/sn konuşma, 2-8 sn'lik turn'ler, arada örtüşen konuşmalar."""
+    rng = random.Random(seed)
+    words = []
+    t = 0.0
+    for _ in range(n_words):
+        t += rng.uniform(0.05, 0.3)
+        dur = rng.uniform(0.1, 0.5)
+        words.append({"start": t, "end": t + dur, "word": " w"})
+        t += dur
+
+    turns = []
+    t = 0.0
+    while t < words[-1]["end"]:
+        dur = rng.uniform(2.0, 8.0)
+        turns.append((t, t + dur, f"SPEAKER_{rng.randrange(4):02d}"))
+        if rng.random() < 0.1:
+            # üst üste konuşma
+            turns.append((t + dur * 0.5, t + dur * 1.2, f"SPEAKER_{rng.randrange(4):02d}"))
+        t += dur + rng.uniform(0.0, 1.0)
+    turns.sort(key=lambda x: x[0])
+    return words, turns
+
+
+def naive_assign(words, turns):
+    """Eski backend/main.py döngüsü (referans)."""
+    out = []
+    for w in words:
+        best, max_overlap = UNKNOWN_SPEAKER, 0
+        for t_start, t_end, spk in turns:
+            s, e = max(w["start"], t_start), min(w["end"], t_end)
+            if e > s and e - s > max_overlap:
+                max_overlap, best = e - s, spk
+        out.append(best)
+    return out
+
+
+def _time(fn, *args):
+    t0 = time.perf_counter()
+    res = fn(*args)
+    return time.perf_counter() - t0, res
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Alignment benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 300000])
+    parser.add_argument("--naive-max", type=int, default=20000,
+                        help="Eski döngü bu kelime sayısına kadar ölçülür (yavaş)")
+    args = parser.parse_args(argv)
+
+    print(f"{'kelime':>8} {'turn':>7} {'sweep (s)':>10} {'ns/öğe':>8} {'eski (s)':>10} {'hız':>7}")
+    for n in args.sizes:
+        words, turns = make_data(n)
+        t_fast, fast = _time(assign_speakers, words, turns)
+        per_item = t_fast / (len(words) + len(turns)) * 1e9
+
+        if n <= args.naive_max:
+            t_slow, slow = _time(naive_assign, words, turns)
+            assert fast == slow, "sweep-line sonucu eski döngüden farklı!"
+            slow_txt, ratio = f"{t_slow:10.3f}", f"{t_slow / t_fast:6.1f}x"
+        else:
+            slow_txt, ratio = f"{'-':>10}", f"{'-':>7}"
+
+        print(f"{len(words):>8} {len(turns):>7} {t_fast:10.3f} {per_item:8.0f} {slow_txt} {ratio}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+Lokal hattın uçtan uca benchmark'ı.
+
+Belirli bir tohumdan (seed) her seferinde aynı sentetik çok konuşmacılı
+toplantı sesi üretir (konuşmacı başına farklı temel frekanslı, hece hece
+harmonik tonlar + sessizlikler) ve aşama aşama ölçer:
+
+    decode       load_audio (ffmpeg pipe / WAV hızlı yolu)
+    model_load   Whisper modelinin kayıt defterine yüklenmesi
+    transcribe   transcribe_file (çözme dahil) ve gerçek zaman oranı (RTF)
+    diarization  konuşmacı turn'leri (+ sentetik gerçek turn'lere göre doğruluk)
+    alignment    align_words + render_transcript
+    db_write     DatabaseManager.save_note (geçici veritabanı)
+
+ve süreç tepe belleğini (peak RSS). Sonuçlar JSON'a yazılır; iki commit'in
+sonuçları `compare` ile karşılaştırılır.
+
+Çevrimdışı, CPU üzerinde çalışır:
+    --models auto   faster-whisper "tiny" yerel önbellekte varsa onu, yoksa stub'ı kullanır
+    --models stub   Enerji tabanlı sahte Whisper (model indirmez, hat maliyetini ölçer)
+    --diarizer stub Spektral tepe + k-means ile hafif konuşmacı ayrımı (varsayılan)
+    --diarizer pyannote  main.diarize_stage (torch + HF_TOKEN + önbellekte model gerekir)
+
+Kullanım:
+    python backend/benchmarks/bench_pipeline.py --seconds 120 --speakers 3 --out sonuc.json
+    python backend/benchmarks/bench_pipeline.py compare eski.json yeni.json --threshold 0.1
+"""
+
+import os
+import sys
+import json
+import time
+import wave
+import argparse
+import platform
+import itertools
+import subprocess
+import tempfile
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from transcription.align import align_words, flatten_words, render_transcript  # noqa: E402
+from transcription.audio import SAMPLE_RATE, load_audio  # noqa: E402
+from transcription import models, whisper  # noqa: E402
+from transcription.tracing import peak_rss_mb as _peak_rss_mb  # noqa: E402
+
+# Karşılaştırmada "küçük olan iyi" kabul edilen metrikler
+COMPARE_METRICS = ("decode", "model_load", "transcribe", "diarization", "alignment", "db_write",
+                   "rtf", "peak_rss_mb")
+
+
+# -------------------------------
+# Sentetik ses
+# -------------------------------
+def synth_meeting(seconds: float, speakers: int = 3, seed: int = 0, sr: int = SAMPLE_RATE):
+    """
+    Deterministik toplantı sesi -> (float32 ses, [(start, end, "SPEAKER_0N"), ...]).
+    Her konuşmacının temel frekansı farklıdır; turn'ler 1.5-6 sn, aralarında kısa sessizlik.
+    """
+    rng = np.random.default_rng(seed)
+    f0s = 100.0 * 1.45 ** np.arange(speakers)
+    audio = rng.normal(0.0, 0.003, int(seconds * sr)).astype(np.float32)
+    harmonics = np.arange(1, 6)[:, None]
+    weights = (0.5 ** np.arange(5))[:, None]
+
+    turns = []
+    t, previous = 0.3, -1
+    while t < seconds - 1.0:
+        spk = int(rng.integers(speakers))
+        if spk == previous and speakers > 1:
+            spk = (spk + 1) % speakers
+        previous = spk
+        dur = min(rng.uniform(1.5, 6.0), seconds - 0.2 - t)
+        s = t
+        while s < t + dur - 0.05:
+            syl = min(rng.uniform(0.12, 0.3), t + dur - s)
+            i0, i1 = int(s * sr), int((s + syl) * sr)
+            tt = np.arange(i1 - i0) / sr
+            f0 = f0s[spk] * rng.uniform(0.97, 1.03) * (1 + 0.03 * np.sin(2 * np.pi * 5 * tt))
+            phase = 2 * np.pi * np.cumsum(f0) / sr
+            tone = (weights * np.sin(harmonics * phase)).sum(axis=0)
+            audio[i0:i1] += (0.25 * np.hanning(i1 - i0) * tone).astype(np.float32)
+            s += syl + rng.uniform(0.04, 0.12)
+        turns.append((round(t, 3), round(t + dur, 3), f"SPEAKER_{spk:02d}"))
+        t += dur + rng.uniform(0.2, 0.8)
+    return np.clip(audio, -1.0, 1.0), turns
+
+
+def write_audio(path: str, audio: np.ndarray, sr: int = SAMPLE_RATE, fmt: str = "wav") -> str:
+    """16 bit WAV yazar; fmt wav değilse ffmpeg ile dönüştürür (yoksa WAV kalır)."""
+    wav_path = os.path.splitext(path)[0] + ".wav"
+    with wave.open(wav_path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sr)
+        w.writeframes((audio * 32767).astype("<i2").tobytes())
+    if fmt == "wav":
+        return wav_path
+    out = os.path.splitext(path)[0] + "." + fmt
+    try:
+        subprocess.run(["ffmpeg", "-nostdin", "-v", "error", "-y", "-i", wav_path, out],
+                       check=True, capture_output=True)
+        return out
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"⚠️ {fmt} üretilemedi ({e}); WAV ile devam.", file=sys.stderr)
+        return wav_path
+
+
+# -------------------------------
+# Stub modeller
+# -------------------------------
+def _frame_energy(audio: np.ndarray, sr: int, hop: float = 0.01) -> np.ndarray:
+    step = int(hop * sr)
+    n = audio.size // step
+    return np.square(audio[:n * step].reshape(n, step)).mean(axis=1)
+
+
+def _runs(mask: np.ndarray):
+    """True bloklarının [başlangıç, bitiş) indeksleri."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+class StubWhisperModel:
+    """
+    faster-whisper WhisperModel.transcribe arayüzünü taklit eder: her sesli
+    hece bir "kelime" olur, 0.5 sn'den uzun sessizlikler segment sınırıdır.
+    """
+
+    def __init__(self, name, device="cpu", compute_type="int8", **options):
+        self.name = name
+
+    def transcribe(self, audio, language=None, **options):
+        hop = 0.01
+        energy = np.log(_frame_energy(audio, SAMPLE_RATE, hop) + 1e-10)
+        threshold = (np.percentile(energy, 10) + np.percentile(energy, 90)) / 2
+        starts, ends = _runs(energy > threshold)
+        info = SimpleNamespace(language=language or "tr", duration=audio.size / SAMPLE_RATE)
+
+        def segments():
+            words = []
+            for i, (a, b) in enumerate(zip(starts, ends)):
+                words.append(SimpleNamespace(start=a * hop, end=b * hop, word=f" w{i}"))
+                if i + 1 == len(starts) or (starts[i + 1] - b) * hop > 0.5:
+                    yield SimpleNamespace(start=words[0].start, end=words[-1].end,
+                                          text="".join(w.word for w in words), words=words)
+                    words = []
+        return segments(), info
+
+
+def stub_diarize(audio: np.ndarray, speakers: int, sr: int = SAMPLE_RATE,
+                 frame: float = 0.032, hop: float = 0.016, block: int = 4096):
+    """
+    Hafif konuşmacı ayrımı: sesli karelerde baskın spektral tepe (perde yaklaşığı),
+    1-B k-means ile `speakers` kümeye ayrılır, etiketler kayan çoğunlukla yumuşatılır.
+    """
+    win, step = int(frame * sr), int(hop * sr)
+    if audio.size < win:
+        return []
+    n = 1 + (audio.size - win) // step
+    view = np.lib.stride_tricks.sliding_window_view(audio, win)[::step][:n]
+    window = np.hanning(win).astype(np.float32)
+    freqs = np.fft.rfftfreq(win, 1.0 / sr)
+    band = (freqs >= 60) & (freqs <= 800)
+    energy = np.empty(n, dtype=np.float32)
+    peak = np.empty(n, dtype=np.float32)
+    for i in range(0, n, block):
+        spec = np.abs(np.fft.rfft(view[i:i + block] * window, axis=1))
+        energy[i:i + block] = np.log(np.square(spec).sum(axis=1) + 1e-10)
+        peak[i:i + block] = freqs[band][spec[:, band].argmax(axis=1)]
+
+    voiced = energy > (np.percentile(energy, 10) + np.percentile(energy, 90)) / 2
+    if not voiced.any():
+        return []
+    feature = np.log(peak[voiced])
+    centers = np.quantile(feature, (np.arange(speakers) + 0.5) / speakers)
+    for _ in range(20):
+        labels = np.abs(feature[:, None] - centers[None, :]).argmin(axis=1)
+        for k in range(speakers):
+            if (labels == k).any():
+                centers[k] = feature[labels == k].mean()
+
+    # Sesli kareler arasında 0.3 sn'lik kayan çoğunluk oyu
+    votes = np.zeros((n, speakers), dtype=np.float32)
+    votes[np.flatnonzero(voiced), labels] = 1.0
+    kernel = np.ones(int(0.3 / hop) | 1, dtype=np.float32)
+    smooth = np.stack([np.convolve(votes[:, k], kernel, mode="same") for k in range(speakers)], axis=1)
+    frame_labels = np.where(smooth.sum(axis=1) > 0, smooth.argmax(axis=1), -1)
+
+    turns = []
+    changes = np.flatnonzero(np.diff(frame_labels)) + 1
+    for a, b in zip(np.concatenate(([0], changes)), np.concatenate((changes, [n]))):
+        if frame_labels[a] >= 0:
+            turns.append((a * hop, b * hop + frame, f"SPEAKER_{frame_labels[a]:02d}"))
+    return turns
+
+
+def speaker_accuracy(reference, hypothesis, duration: float, hop: float = 0.01) -> float:
+    """Referansta konuşma olan karelerde, en iyi etiket eşlemesiyle doğru konuşmacı oranı."""
+    n = int(duration / hop) + 1
+
+    def grid(turns, names):
+        out = np.full(n, -1, dtype=np.int32)
+        for s, e, spk in turns:
+            out[int(s / hop):int(e / hop)] = names.setdefault(spk, len(names))
+        return out
+
+    ref_names, hyp_names = {}, {}
+    ref, hyp = grid(reference, ref_names), grid(hypothesis, hyp_names)
+    speech = ref >= 0
+    if not speech.any():
+        return 0.0
+    k = max(len(ref_names), len(hyp_names))
+    confusion = np.zeros((k, k), dtype=np.int64)
+    mask = speech & (hyp >= 0)
+    np.add.at(confusion, (ref[mask], hyp[mask]), 1)
+    if k <= 7:
+        best = max(sum(confusion[r, h] for r, h in enumerate(perm)) for perm in itertools.permutations(range(k)))
+    else:
+        best = confusion.max(axis=1).sum()
+    return float(best) / float(speech.sum())
+
+
+# -------------------------------
+# Ölçüm
+# -------------------------------
+def peak_rss_mb():
+    """Süreç tepe RSS'i (MB, 0.1 yuvarlanmış); ölçülemiyorsa None."""
+    peak = _peak_rss_mb()
+    return round(peak, 1) if peak is not None else None
+
+
+def _timed(fn, repeat: int = 1):
+    """fn'i repeat kez çalıştırır -> (son sonuç, [süreler], medyan süre)."""
+    times, result = [], None
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return result, [round(t, 4) for t in times], round(float(np.median(times)), 4)
+
+
+def _load_model(mode: str, name: str):
+    """
+    Whisper modelini yükler -> (kullanılan mod, ad). auto: yerel tiny yoksa stub.
+    Model transcribe_audio'nun isteyeceği seçeneklerle yüklenir; transcribe aşaması
+    kayıt defterindeki bu girdiyi kullanır, ikinci kez yükleme ölçülmez.
+    """
+    if mode in ("auto", "tiny"):
+        try:
+            # Yalnızca yerel önbellek kontrolü; indirme yapılmaz
+            from faster_whisper.utils import download_model
+            download_model(name, local_files_only=True)
+            whisper.load_model(name, "cpu", "int8")
+            return "tiny", name
+        except Exception as e:
+            if mode == "tiny":
+                raise
+            print(f"ℹ️ {name} yüklenemedi ({e}); stub model kullanılacak.", file=sys.stderr)
+    models.register_loader("whisper", StubWhisperModel, lambda n, c: 0.0)
+    whisper.load_model("bench-stub", "cpu", "int8")
+    return "stub", "bench-stub"
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(args) -> dict:
+    stages, runs = {}, {}
+    rss = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        audio, truth = synth_meeting(args.seconds, args.speakers, args.seed)
+        path = write_audio(os.path.join(tmp, "toplanti"), audio, fmt=args.format)
+        synth_seconds = time.perf_counter() - t0
+        duration = audio.size / SAMPLE_RATE
+        del audio
+        rss["synth"] = peak_rss_mb()
+
+        decoded, runs["decode"], stages["decode"] = _timed(lambda: load_audio(path), args.repeat)
+        rss["decode"] = peak_rss_mb()
+
+        (model_mode, model_name), _, stages["model_load"] = _timed(lambda: _load_model(args.models, args.model))
+        rss["model_load"] = peak_rss_mb()
+
+        result, runs["transcribe"], stages["transcribe"] = _timed(
+            lambda: whisper.transcribe_file(path, lang="tr", model_name=model_name, device="cpu",
+                                            compute_type="int8", use_cache=False), args.repeat)
+        words = flatten_words(result["segments"])
+        rss["transcribe"] = peak_rss_mb()
+        models_loaded = len(models.REGISTRY.loaded())
+        if models_loaded != 1:
+            print(f"⚠️ Kayıt defterinde {models_loaded} model var (1 beklenirdi); "
+                  "transcribe süresi ikinci bir yükleme içeriyor olabilir.", file=sys.stderr)
+
+        if args.diarizer == "pyannote":
+            import main as pipeline
+            diarize = lambda: pipeline.diarize_stage(decoded, min_speakers=1, max_speakers=args.speakers)
+        else:
+            diarize = lambda: stub_diarize(decoded, args.speakers)
+        turns, runs["diarization"], stages["diarization"] = _timed(diarize, args.repeat)
+        rss["diarization"] = peak_rss_mb()
+
+        def _align():
+            groups = align_words(words, turns)
+            return groups, render_transcript(groups)
+        (groups, text), runs["alignment"], stages["alignment"] = _timed(_align, args.repeat)
+        rss["alignment"] = peak_rss_mb()
+
+        from database import DatabaseManager
+        db = DatabaseManager(os.path.join(tmp, "bench.db"))
+        try:
+            transcript = {"groups": groups, "words": words, "turns": turns, "language": result["language"]}
+            counter = itertools.count()
+            _, runs["db_write"], stages["db_write"] = _timed(
+                lambda: db.save_note("admin", f"bench-{next(counter)}", text, transcript), args.repeat)
+        finally:
+            db.close()
+        rss["db_write"] = peak_rss_mb()
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "audio": {
+            "seconds": round(duration, 2),
+            "speakers": args.speakers,
+            "format": os.path.splitext(path)[1].lstrip("."),
+            "synth_seconds": round(synth_seconds, 3),
+        },
+        "models": {"whisper": model_mode, "whisper_name": model_name, "diarizer": args.diarizer,
+                   "registry_entries": models_loaded},
+        "stages": stages,
+        "runs": runs,
+        "rtf": round(stages["transcribe"] / duration, 5) if duration else None,
+        "words": len(words),
+        "turns": len(turns),
+        "speaker_accuracy": round(speaker_accuracy(truth, turns, duration), 4),
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_after_stage_mb": rss,
+    }
+
+
+def _metric(result: dict, name: str):
+    if name in result.get("stages", {}):
+        return result["stages"][name]
+    return result.get(name)
+
+
+def compare(old: dict, new: dict, threshold: float) -> bool:
+    """Tabloyu yazdırır; threshold'dan fazla kötüleşen metrik varsa True."""
+    print(f"{'metrik':<14} {'eski':>12} {'yeni':>12} {'değişim':>9}")
+    regressed = False
+    for name in COMPARE_METRICS:
+        a, b = _metric(old, name), _metric(new, name)
+        if a is None or b is None:
+            continue
+        change = (b - a) / a if a else 0.0
+        flag = ""
+        if change > threshold:
+            flag, regressed = "  ⚠️ yavaşladı", True
+        elif change < -threshold:
+            flag = "  ✅"
+        print(f"{name:<14} {a:>12.4f} {b:>12.4f} {change:>+8.1%}{flag}")
+    for name in ("speaker_accuracy", "words", "turns"):
+        a, b = old.get(name), new.get(name)
+        if a is not None and b is not None and a != b:
+            print(f"{name:<14} {a:>12} {b:>12}   (çıktı değişti)")
+    settings = [{k: v for k, v in r.get("meta", {}).get("args", {}).items() if k != "out"} for r in (old, new)]
+    if settings[0] != settings[1]:
+        print("ℹ️ İki çalıştırmanın ayarları farklı; karşılaştırma yanıltıcı olabilir.")
+    return regressed
+
+
+def _compare_main(argv):
+    parser = argparse.ArgumentParser(prog="bench_pipeline.py compare", description="İki sonucu karşılaştır")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Kötüleşme eşiği (0.1 = %%10)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Kötüleşmede çıkış kodu 1")
+    args = parser.parse_args(argv)
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    regressed = compare(old, new, args.threshold)
+    return 1 if regressed and args.fail_on_regression else 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "compare":
+        return _compare_main(argv[1:])
+
+    parser = argparse.ArgumentParser(description="Lokal hat benchmark")
+    parser.add_argument("--seconds", type=float, default=60.0, help="Sentetik ses uzunluğu")
+    parser.add_argument("--speakers", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", default="wav", choices=["wav", "mp3", "ogg", "flac"],
+                        help="Çözülecek dosya biçimi (wav dışı ffmpeg ister)")
+    parser.add_argument("--models", default="auto", choices=["auto", "tiny", "stub"])
+    parser.add_argument("--model", default="tiny", help="--models tiny/auto için Whisper model adı")
+    parser.add_argument("--diarizer", default="stub", choices=["stub", "pyannote"])
+    parser.add_argument("--repeat", type=int, default=1, help="Her aşama kaç kez ölçülsün (medyan)")
+    parser.add_argument("--out", help="JSON sonuç dosyası (verilmezse stdout)")
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"💾 Sonuç yazıldı: {args.out}", file=sys.stderr)
+    else:
+        print(text)
+
+    s = result["stages"]
+    print(f"⏱️  {result['audio']['seconds']:.0f} sn ses | decode {s['decode']:.3f}s | "
+          f"transcribe {s['transcribe']:.3f}s (RTF {result['rtf']:.4f}, {result['models']['whisper']}) | "
+          f"diarization {s['diarization']:.3f}s | alignment {s['alignment']:.4f}s | "
+          f"db {s['db_write']:.4f}s | peak RSS {result['peak_rss_mb']} MB", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
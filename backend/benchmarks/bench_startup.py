@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+GUI açılış süresi benchmark'ı (giriş penceresi görünene kadar).
+
+Her ölçüm temiz bir alt süreçte yapılır: app_gui import edilir, geçici bir
+veritabanıyla LoginWindow kurulur ve pencere ilk kez çizilene kadar
+(root.update) geçen süre ölçülür. Aynı süreçte o ana kadar yüklenmiş ağır
+modüller (torch, pyannote, faster_whisper...) de raporlanır; hedef, giriş
+ekranında hiçbirinin yüklenmemiş olmasıdır.
+
+Ekran yoksa (DISPLAY) yalnızca import süresi ölçülür. --importtime ile
+`python -X importtime` çıktısından en pahalı importlar listelenir.
+
+Kullanım:
+    python backend/benchmarks/bench_startup.py --runs 5
+    python backend/benchmarks/bench_startup.py --importtime --out startup.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HEAVY_MODULES = ("torch", "torchaudio", "pyannote.audio", "faster_whisper", "ctranslate2",
+                 "openai", "httpx", "sounddevice", "scipy", "numpy")
+# Bunlar giriş ekranından önce hiç yüklenmemeli
+ML_MODULES = ("torch", "torchaudio", "pyannote", "faster_whisper", "ctranslate2")
+
+# Alt süreçte çalışan ölçüm kodu; sonucu stdout'a tek satır JSON yazar
+_PROBE = r"""
+import json, os, sys, tempfile, time
+t0 = time.perf_counter()
+sys.path.insert(0, {root!r})
+os.chdir({root!r})
+import app_gui
+t_import = time.perf_counter() - t0
+result = {{"import_seconds": t_import, "window_seconds": None, "error": None}}
+try:
+    import tkinter as tk
+    from backend.database import DatabaseManager
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "startup.db"))
+        root = tk.Tk()
+        app_gui.LoginWindow(root, lambda user: None, db)
+        root.update()
+        result["window_seconds"] = time.perf_counter() - t0
+        root.destroy()
+        db.close()
+except Exception as e:
+    result["error"] = f"{{type(e).__name__}}: {{e}}"
+result["heavy_loaded"] = [m for m in {heavy!r} if m in sys.modules]
+print("@@" + json.dumps(result))
+"""
+
+
+def _probe(extra_args=()):
+    code = _PROBE.format(root=ROOT, heavy=HEAVY_MODULES)
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, *extra_args, "-c", code], capture_output=True, text=True,
+                          cwd=ROOT, env={**os.environ, "MODEL_PREWARM": "0"})
+    wall = time.perf_counter() - t0
+    line = next((l for l in proc.stdout.splitlines() if l.startswith("@@")), None)
+    if line is None:
+        raise RuntimeError(f"Ölçüm süreci başarısız:\n{proc.stderr[-2000:]}")
+    result = json.loads(line[2:])
+    result["process_seconds"] = wall
+    return result, proc.stderr
+
+
+def _baseline(runs: int) -> float:
+    """Boş yorumlayıcı açılışı (karşılaştırma için)."""
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def _top_imports(stderr: str, count: int):
+    """-X importtime çıktısından kümülatif süresi en büyük üst düzey importlar."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        # İç içe importlar girintilidir; yalnızca üst düzeydekiler sayılır
+        if name[1:2] == " ":
+            continue
+        rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GUI açılış süresi benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--importtime", action="store_true", help="En pahalı importları listele")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--out", help="JSON sonuç dosyası")
+    args = parser.parse_args(argv)
+
+    baseline = _baseline(args.runs)
+    results = [_probe()[0] for _ in range(args.runs)]
+    imports = [r["import_seconds"] for r in results]
+    windows = [r["window_seconds"] for r in results if r["window_seconds"] is not None]
+    summary = {
+        "runs": args.runs,
+        "interpreter_seconds": round(baseline, 4),
+        "import_seconds": round(statistics.median(imports), 4),
+        "login_window_seconds": round(statistics.median(windows), 4) if windows else None,
+        "process_seconds": round(statistics.median(r["process_seconds"] for r in results), 4),
+        "heavy_loaded": results[-1]["heavy_loaded"],
+        "error": results[-1]["error"],
+    }
+
+    print(f"Yorumlayıcı açılışı     : {baseline * 1000:8.1f} ms")
+    print(f"app_gui import          : {summary['import_seconds'] * 1000:8.1f} ms")
+    if windows:
+        print(f"Giriş penceresi çizildi : {summary['login_window_seconds'] * 1000:8.1f} ms")
+    else:
+        print(f"Giriş penceresi ölçülemedi ({summary['error']})")
+    ml = [m for m in summary["heavy_loaded"] if m.split(".")[0] in ML_MODULES]
+    print(f"Açılışta yüklü ağır modüller: {', '.join(summary['heavy_loaded']) or '-'}"
+          + (f"  ⚠️ ML kütüphaneleri girişten önce yüklendi: {', '.join(ml)}" if ml else ""))
+
+    if args.importtime:
+        _, stderr = _probe(("-X", "importtime"))
+        top = _top_imports(stderr, args.top)
+        summary["top_imports"] = [{"module": name, "cumulative_ms": round(us / 1000, 1)} for us, name in top]
+        print("\nEn pahalı üst düzey importlar (kümülatif):")
+        for us, name in top:
+            print(f"   {us / 1000:8.1f} ms  {name}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Vektör indeksi sorgu gecikmesi benchmark'ı.
+
+Geçici bir klasörde n satırlık rastgele (normalize) bir indeks kurar ve
+top-k aramasının ortalama / p95 süresini yazdırır. Hedef: 100k parçada tek
+haneli milisaniye.
+
+Kullanım:
+    python backend/benchmarks/bench_vector_index.py --sizes 10000 100000 --dim 384
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from vector_index import HashingEmbedder, VectorIndex  # noqa: E402
+
+
+def bench(n: int, dim: int, k: int, queries: int, batch: int = 10000):
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = VectorIndex(tmp, dim, "bench")
+        t0 = time.perf_counter()
+        for start in range(0, n, batch):
+            m = rng.standard_normal((min(batch, n - start), dim)).astype(np.float32)
+            m /= np.linalg.norm(m, axis=1, keepdims=True)
+            index.add(np.arange(start + 1, start + 1 + m.shape[0]), m)
+        build = time.perf_counter() - t0
+
+        qs = rng.standard_normal((queries, dim)).astype(np.float32)
+        index.search(qs[0], k)   # ilk sayfa hataları ölçüme girmesin
+        times = []
+        for q in qs:
+            t = time.perf_counter()
+            index.search(q, k)
+            times.append(time.perf_counter() - t)
+        times = np.array(times) * 1000
+        print(f"{n:>8} satır  ekleme {build:6.2f} s   sorgu ort {times.mean():6.2f} ms"
+              f"   p95 {np.percentile(times, 95):6.2f} ms")
+
+
+def bench_embedder(count: int = 1000):
+    emb = HashingEmbedder()
+    texts = [f"SPEAKER_0{i % 4}: toplantıda bütçe ve takvim konuşuldu, madde {i}" * 8
+             for i in range(count)]
+    t = time.perf_counter()
+    emb.embed(texts)
+    dt = time.perf_counter() - t
+    print(f"HashingEmbedder: {count} parça {dt * 1000:.1f} ms ({dt / count * 1e6:.0f} µs/parça)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vektör indeksi benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=12)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        bench(n, args.dim, args.k, args.queries)
+    bench_embedder()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,82 +1,350 @@
+"""
+GPT-4o ses modeli ile bulut deşifresi.
+
+Ses gönderilmeden önce 16 kHz mono'ya çözülür ve düşük bit hızlı mp3'e
+sıkıştırılır (ffmpeg yoksa 16 bit WAV). Uzun kayıtlar sessizlik
+noktalarından, kenarlarda birkaç saniye örtüşen parçalara bölünür; parçalar
+sınırlı sayıda eşzamanlı istekle gönderilir, geçici hatalarda üstel bekleme
+ile yeniden denenir. Parçaların "Speaker N:" çıktıları sırayla birleştirilir;
+örtüşmeden dolayı iki kez yazılmış satırlar atılır.
+
+Model her parçayı ayrı dinlediği için "Speaker 1" parçadan parçaya başka bir
+kişi olabilir. Birden çok parça varsa etiketler parçaya göre yazılır
+("Parça 2 / Konuşmacı 1"); örtüşmede iki parçada da geçen satırlar aynı
+kişiyi gösterdiğinden, orada eşleşen konuşmacı önceki parçadaki etiketini korur.
+
+API istemcisi dışarıdan verilebilir (client=...) ya da OPENAI_BASE_URL ile
+yerel bir sahte sunucuya yönlendirilebilir; testler gerçek API'ye gitmez.
+`FakeAudioClient` ağ olmadan parçalama, yeniden deneme ve birleştirmeyi çalıştırır:
+
+    python cloud_api.py kayit.wav --fake --fail 2   # ilk 2 istek 503 döner
+Varsayılan olarak süreç genelinde paylaşılan, bağlantı havuzlu istemci
+kullanılır (openai_client.py); her CloudTranscriber yeni bağlantı açmaz.
+
+Ortam değişkenleri:
+    OPENAI_API_KEY / OPENAI_BASE_URL
+    CLOUD_CHUNK_SECONDS     Parça uzunluğu (varsayılan 600)
+    CLOUD_OVERLAP_SECONDS   Parçalar arası örtüşme (varsayılan 3)
+    CLOUD_CONCURRENCY       Aynı anda en fazla istek (varsayılan 3)
+    CLOUD_MAX_RETRIES       Parça başına yeniden deneme (varsayılan 3)
+    CLOUD_BITRATE           mp3 bit hızı (varsayılan 32k)
+"""
+
 import os
+import re
 import base64
-from openai import OpenAI
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+
 from dotenv import load_dotenv
 
+from openai_client import get_client
+# Aynı ses daha önce gönderildiyse sonucu önbellekten ver (transcription/cache.py)
+from transcription.cache import cached
+from transcription import tracing
+from transcription.audio import SAMPLE_RATE, encode_audio
+from transcription.audio_source import open_audio
+from transcription.chunked import find_split_points
+
 load_dotenv()
 
+AUDIO_MODEL = "gpt-4o-audio-preview"
+
+CHUNK_SECONDS = float(os.getenv("CLOUD_CHUNK_SECONDS", "600"))
+OVERLAP_SECONDS = float(os.getenv("CLOUD_OVERLAP_SECONDS", "3"))
+CONCURRENCY = int(os.getenv("CLOUD_CONCURRENCY", "3"))
+MAX_RETRIES = int(os.getenv("CLOUD_MAX_RETRIES", "3"))
+BITRATE = os.getenv("CLOUD_BITRATE", "32k")
+
+# İŞTE BURAYA "MAX 3 KİŞİ" AYARINI YAZDIK 👇
+SYSTEM_PROMPT = ("Sen bir deşifre asistanısın. Bu kayıtta EN FAZLA 3 FARKLI KONUŞMACI var. "
+                 "Sakın 4. veya 5. bir kişiyi uydurma. "
+                 "Konuşmaları sadece 'Speaker 1:', 'Speaker 2:', 'Speaker 3:' etiketleriyle yaz. "
+                 "Başka hiçbir şey yazma.")
+
+_SPEAKER_LINE = re.compile(r"^\s*((?:Parça\s*\d+\s*/\s*)?(?:Speaker|Konuşmacı)\s*(\d+))\s*:\s*(.*)$",
+                           re.IGNORECASE)
+_DUPLICATE_RATIO = 0.8
+_DUPLICATE_WINDOW = 3
+
+
+class CloudResponseError(Exception):
+    """Model cevap verdi ama kullanılabilir metin yok (ret / boş cevap)."""
+
+
+def _transport_errors():
+    """Ağ katmanının geçici hata türleri (bağlantı / zaman aşımı)."""
+    errors = []
+    try:
+        import openai
+        errors += [openai.APIConnectionError, openai.APITimeoutError]
+    except ImportError:
+        pass
+    try:
+        import httpx
+        errors.append(httpx.TransportError)
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+def _is_retryable(error: Exception) -> bool:
+    """
+    Yalnızca bağlantı / zaman aşımı hataları ve 408/409/429, 5xx geçicidir.
+    Ret, diğer 4xx ve yerel hatalar (TypeError, dosya, ffmpeg vb.) yeniden denenmez.
+    """
+    if isinstance(error, CloudResponseError):
+        return False
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    return isinstance(error, _transport_errors())
+
+
+def _normalize(text):
+    return re.sub(r"\W+", " ", text.lower()).strip()
+
+
+def _split_line(line):
+    """Satır -> (etiket, parça içi konuşmacı no, metin); konuşmacısız satırda (None, None, satır)."""
+    m = _SPEAKER_LINE.match(line)
+    if not m:
+        return None, None, line
+    return m.group(1), int(m.group(2)), m.group(3)
+
+
+def merge_transcripts(parts):
+    """
+    Parça çıktılarını sırayla birleştirir. Bir parçanın ilk satırları, örtüşme
+    yüzünden önceki parçanın son satırlarıyla aynıysa atılır.
+
+    Birden çok parça varsa konuşmacılar "Parça i / Konuşmacı n" olarak yeniden
+    etiketlenir; atılan (örtüşen) satırlarda eşleşen konuşmacı ise önceki
+    parçadaki etiketiyle devam eder.
+    """
+    relabel = len(parts) > 1
+    merged = []
+    for number, text in enumerate(parts, 1):
+        lines = [l.strip() for l in (text or "").splitlines() if l.strip()]
+        tail = [(label, _normalize(body))
+                for label, _, body in map(_split_line, merged[-_DUPLICATE_WINDOW:])]
+        skip = 0
+        carried = {}   # parça içi konuşmacı no -> önceki parçadaki etiket
+        for line in lines[:_DUPLICATE_WINDOW]:
+            _, speaker, body = _split_line(line)
+            body = _normalize(body)
+            match = next((label for label, t in tail
+                          if body and SequenceMatcher(None, body, t).ratio() >= _DUPLICATE_RATIO), False)
+            if match is False:
+                break
+            skip += 1
+            if speaker is not None and match:
+                carried.setdefault(speaker, match)
+        for line in lines[skip:]:
+            label, speaker, body = _split_line(line)
+            if relabel and speaker is not None:
+                line = f"{carried.get(speaker) or f'Parça {number} / Konuşmacı {speaker}'}: {body}"
+            merged.append(line)
+    return "\n".join(merged)
+
+
+class FakeAudioClient:
+    """
+    OpenAI istemcisinin çevrimdışı yerine geçeni (CloudTranscriber(client=...)).
+
+    Her istek parça numarasını ve ses boyutunu içeren "Speaker N:" satırları
+    döner; ilk `failures` istek `status` kodlu bir hata fırlatır (503 geçicidir,
+    400 değildir). `reply(index, total)` verilirse cevap metnini o üretir.
+    Gelen istekler `calls` listesinde tutulur.
+    """
+
+    class Error(Exception):
+        def __init__(self, status_code):
+            super().__init__(f"Sahte API hatası {status_code}")
+            self.status_code = status_code
+
+    def __init__(self, failures=0, status=503, reply=None):
+        from types import SimpleNamespace
+        self.failures = failures
+        self.status = status
+        self.reply = reply
+        self.calls = []
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **request):
+        from types import SimpleNamespace
+        content = request["messages"][1]["content"]
+        m = re.search(r"(\d+)/(\d+)", content[0]["text"])
+        index, total = (int(m.group(1)) - 1, int(m.group(2))) if m else (0, 1)
+        with self._lock:
+            self.calls.append({"index": index, "total": total,
+                               "bytes": len(content[1]["input_audio"]["data"]) * 3 // 4})
+            failing = len(self.calls) <= self.failures
+        if failing:
+            raise self.Error(self.status)
+        if self.reply is not None:
+            text = self.reply(index, total)
+        else:
+            text = (f"Speaker 1: Parça {index + 1} başlıyor.\n"
+                    f"Speaker 2: Bu parçada {self.calls[-1]['bytes']} bayt ses var.")
+        message = SimpleNamespace(content=text, refusal=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
 class CloudTranscriber:
-    def __init__(self):
+    def __init__(self, client=None, base_url=None, concurrency=CONCURRENCY,
+                 chunk_seconds=CHUNK_SECONDS, overlap_seconds=OVERLAP_SECONDS,
+                 max_retries=MAX_RETRIES):
         self.api_key = os.getenv("OPENAI_API_KEY")
-        if not self.api_key:
+        self.concurrency = max(1, concurrency)
+        self.chunk_seconds = chunk_seconds
+        self.overlap_seconds = overlap_seconds
+        self.max_retries = max_retries
+        self.base_url = base_url or os.getenv("OPENAI_BASE_URL") or None
+        # Dışarıdan verilen istemcinin (ör. FakeAudioClient) cevapları önbelleğe yazılmaz;
+        # gerçek GPT-4o sonucuyla aynı anahtarı paylaşmasınlar
+        self.cacheable = client is None
+        if client is not None:
+            self.client = client
+        elif not self.api_key:
             print("⚠️ HATA: .env dosyasında OPENAI_API_KEY yok!")
             self.client = None
+        elif base_url:
+            from openai import OpenAI
+            self.client = OpenAI(api_key=self.api_key, base_url=base_url)
         else:
-            self.client = OpenAI(api_key=self.api_key)
+            self.client = get_client()
 
     def process_audio(self, audio_path):
         if not self.client:
             return "API Key Eksik"
 
         print(f"☁️ OpenAI (GPT-4o) Ses İşleniyor... ({os.path.basename(audio_path)})")
-        
-        ext = os.path.splitext(audio_path)[1].lower()
-        if ext in [".wav"]:
-            audio_format = "wav"
-        elif ext in [".mp3"]:
-            audio_format = "mp3"
-        else:
-            return f"⚠️ UYARI: {ext} formatı desteklenmiyor. Lütfen .mp3 veya .wav kullan."
 
         try:
-            with open(audio_path, "rb") as audio_file:
-                audio_data = audio_file.read()
-                encoded_string = base64.b64encode(audio_data).decode('utf-8')
-
-            # API İsteği
-            completion = self.client.chat.completions.create(
-                model="gpt-4o-audio-preview", 
-                modalities=["text"],
-                audio={"voice": "alloy", "format": audio_format},
-                messages=[
-                    {
-                        "role": "system",
-                        # İŞTE BURAYA "MAX 3 KİŞİ" AYARINI YAZDIK 👇
-                        "content": "Sen bir deşifre asistanısın. Bu kayıtta EN FAZLA 3 FARKLI KONUŞMACI var. "
-                                   "Sakın 4. veya 5. bir kişiyi uydurma. "
-                                   "Konuşmaları sadece 'Speaker 1:', 'Speaker 2:', 'Speaker 3:' etiketleriyle yaz. "
-                                   "Başka hiçbir şey yazma."
-                    },
-                    {
-                        "role": "user",
-                        "content": [
-                            { 
-                                "type": "text", 
-                                "text": "Bu kaydı deşifre et."
-                            },
-                            {
-                                "type": "input_audio",
-                                "input_audio": {
-                                    "data": encoded_string,
-                                    "format": audio_format
-                                }
-                            }
-                        ]
-                    }
-                ]
-            )
-            
-            response_message = completion.choices[0].message
-            
-            if hasattr(response_message, 'refusal') and response_message.refusal:
-                return f"Model Reddi: {response_message.refusal}"
-
-            if not response_message.content:
-                return "Model boş cevap döndü."
-
-            print("✅ Temiz Yanıt Alındı!")
-            return response_message.content
+            if not self.cacheable:
+                return self._transcribe(audio_path)
+            # Sadece başarılı cevaplar önbelleğe girer (hatalar exception olarak çıkar);
+            # farklı uç noktanın (OPENAI_BASE_URL) cevapları ayrı anahtarda tutulur
+            params = {"model": AUDIO_MODEL, "prompt": SYSTEM_PROMPT,
+                      "chunk_seconds": self.chunk_seconds, "overlap_seconds": self.overlap_seconds,
+                      "bitrate": BITRATE, "base_url": self.base_url}
+            return cached("cloud", audio_path, params, lambda: self._transcribe(audio_path))
 
+        except CloudResponseError as e:
+            return str(e)
         except Exception as e:
             print(f"❌ HATA: {e}")
-            return f"Bir hata oluştu: {str(e)}"
\ No newline at end of file
+            return f"Bir hata oluştu: {str(e)}"
+
+    # -------------------------------
+    # Parçalama + eşzamanlı gönderim
+    # -------------------------------
+    def _chunk_bounds(self, audio):
+        """Sessizlik noktalarından kesim + her iki yana overlap_seconds pay."""
+        cuts = find_split_points(audio, SAMPLE_RATE, self.chunk_seconds)
+        pad = int(self.overlap_seconds * SAMPLE_RATE)
+        return [(max(0, a - pad), min(audio.size, b + pad)) for a, b in zip(cuts[:-1], cuts[1:])]
+
+    def _transcribe(self, audio_path):
+        with tracing.span("cloud.decode") as span:
+            # Bellek eşlemeli; parçalar kodlanırken yalnızca kendi pencereleri okunur
+            audio = open_audio(audio_path).samples()
+            span.set(audio_seconds=audio.size / SAMPLE_RATE)
+        bounds = self._chunk_bounds(audio)
+        total = len(bounds)
+        if total > 1:
+            print(f"   -> {total} parça, en fazla {self.concurrency} eşzamanlı istek")
+
+        slots = threading.BoundedSemaphore(self.concurrency)
+
+        def _one(index):
+            start, end = bounds[index]
+            seconds = (end - start) / SAMPLE_RATE
+            with tracing.span("cloud.encode", chunk=index, audio_seconds=seconds) as span:
+                data, audio_format = encode_audio(audio[start:end], SAMPLE_RATE, BITRATE)
+                span.set(bytes=len(data), format=audio_format)
+            with slots, tracing.span("cloud.request", chunk=index, audio_seconds=seconds):
+                return self._request_with_retry(data, audio_format, index, total)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="cloud") as pool:
+            parts = list(pool.map(tracing.bind(_one), range(total)))
+
+        print("✅ Temiz Yanıt Alındı!")
+        return merge_transcripts(parts)
+
+    def _request_with_retry(self, data, audio_format, index, total):
+        attempt = 0
+        while True:
+            try:
+                return self._request(data, audio_format, index, total)
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                delay = min(30.0, 2.0 ** attempt) + random.uniform(0, 0.5)
+                attempt += 1
+                print(f"   ⚠️ Parça {index + 1}/{total} hata verdi ({e}); {delay:.1f} sn sonra deneme {attempt}")
+                time.sleep(delay)
+
+    def _request(self, data, audio_format, index, total):
+        encoded_string = base64.b64encode(data).decode('utf-8')
+        instruction = "Bu kaydı deşifre et."
+        if total > 1:
+            instruction = (f"Bu kayıt uzun bir toplantının {index + 1}/{total}. parçası. "
+                           "Konuşmacı numaralarını tutarlı kullanarak deşifre et.")
+
+        # API İsteği
+        completion = self.client.chat.completions.create(
+            model=AUDIO_MODEL,
+            modalities=["text"],
+            audio={"voice": "alloy", "format": audio_format},
+            messages=[
+                {
+                    "role": "system",
+                    "content": SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": instruction
+                        },
+                        {
+                            "type": "input_audio",
+                            "input_audio": {
+                                "data": encoded_string,
+                                "format": audio_format
+                            }
+                        }
+                    ]
+                }
+            ]
+        )
+
+        response_message = completion.choices[0].message
+
+        if hasattr(response_message, 'refusal') and response_message.refusal:
+            raise CloudResponseError(f"Model Reddi: {response_message.refusal}")
+
+        if not response_message.content:
+            raise CloudResponseError("Model boş cevap döndü.")
+
+        return response_message.content
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="GPT-4o bulut deşifresi")
+    parser.add_argument("audio")
+    parser.add_argument("--fake", action="store_true", help="Ağa gitmeden FakeAudioClient ile çalıştır")
+    parser.add_argument("--fail", type=int, default=0, help="--fake: ilk N istek 503 döner")
+    parser.add_argument("--chunk-seconds", type=float, default=CHUNK_SECONDS)
+    args = parser.parse_args()
+    client = FakeAudioClient(failures=args.fail) if args.fake else None
+    # Verilen istemcinin cevapları önbelleğe yazılmaz (bkz. CloudTranscriber.cacheable)
+    print(CloudTranscriber(client=client, chunk_seconds=args.chunk_seconds).process_audio(args.audio))
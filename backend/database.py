@@ -0,0 +1,747 @@
+"""
+Uygulama veritabanı (SQLite).
+
+`notes` tablosu ekranda gösterilen döküm metnini tutmaya devam eder; ayrıca her
+not için yapılandırılmış döküm normalize tablolarda saklanır:
+
+    speakers   (id, label)                                 konuşmacı etiketleri
+    recordings (id, note_id, username, source, language,   bir not = bir kayıt
+                duration, created_at)
+    segments   (id, recording_id, speaker_id, start, end, text)
+    turns      (recording_id, speaker_id, start, end)      diarization turn'leri
+    words      (recording_id, segment_id, start, end, word)
+
+Zamanlar REAL (saniye / epoch) sütunlardır; "SPEAKER_01 geçen hafta ne dedi"
+gibi sorgular metni yeniden ayrıştırmadan indekslerle çalışır. Eski
+veritabanları açılışta `PRAGMA user_version` ile bir kez taşınır (mevcut
+notların metni ayrıştırılıp tablolara yazılır).
+
+Asistan sekmesi için not metinleri ~800 karakterlik parçalara bölünür
+(`note_chunks`) ve FTS5 tam metin indeksinde tutulur; trigger'lar indeksi
+`save_note` ile senkron tutar. `search_notes` BM25 sırasıyla en alakalı k
+parçayı snippet'leriyle döner, böylece prompt boyutu arşivle büyümez.
+
+Aynı parçalar ayrıca yerel bir vektör indeksinde (`vector_index.py`,
+veritabanının yanında `<ad>.vectors/`) tutulur; `semantic_search` başka
+kelimelerle sorulan soruları da bulur, `retrieve_context` iki sıralamayı
+birleştirir (reciprocal rank fusion).
+
+Erişim thread-safe'tir: WAL modu, thread başına okuma bağlantısı ve tüm
+yazımları gruplayıp tek transaction'da işleyen tek bir yazıcı thread
+(bkz. `DatabaseManager`). Uygulama genelinde tek örnek paylaşılır.
+"""
+
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from textnorm import fold_text
+
+SCHEMA_VERSION = 2
+CHUNK_CHARS = 800
+VECTOR_INDEX_ENABLED = os.getenv("VECTOR_INDEX", "1") != "0"
+CONTENT_CACHE_SIZE = int(os.getenv("NOTE_CACHE_SIZE", "64"))   # get_note_content LRU
+WRITE_BATCH_MAX = 64        # bir transaction'a toplanan en fazla yazım
+_RRF_K = 60
+
+# [12.34s] SPEAKER_00: metin   |   [12.34s] metin (canlı döküm)
+_LOCAL_LINE = re.compile(r"^\[(\d+(?:\.\d+)?)s\]\s+(?:([^:\s]+(?: [^:\s]+){0,2}):\s+)?(.*)$")
+# Speaker 1: metin  /  Parça 2 / Konuşmacı 1: metin (cloud, çok parçalı)
+_CLOUD_LINE = re.compile(r"^((?:Parça\s*\d+\s*/\s*)?(?:Speaker|Konuşmacı)\s*\d+)\s*:\s*(.*)$", re.IGNORECASE)
+
+
+_SCHEMA_V1 = [
+    '''CREATE TABLE IF NOT EXISTS speakers
+        (id INTEGER PRIMARY KEY,
+         label TEXT NOT NULL UNIQUE)''',
+    '''CREATE TABLE IF NOT EXISTS recordings
+        (id INTEGER PRIMARY KEY,
+         note_id INTEGER NOT NULL UNIQUE REFERENCES notes(id) ON DELETE CASCADE,
+         username TEXT NOT NULL,
+         source TEXT,
+         language TEXT,
+         duration REAL,
+         created_at REAL NOT NULL)''',
+    '''CREATE TABLE IF NOT EXISTS segments
+        (id INTEGER PRIMARY KEY,
+         recording_id INTEGER NOT NULL REFERENCES recordings(id) ON DELETE CASCADE,
+         speaker_id INTEGER REFERENCES speakers(id),
+         start REAL,
+         end REAL,
+         text TEXT NOT NULL)''',
+    '''CREATE TABLE IF NOT EXISTS turns
+        (recording_id INTEGER NOT NULL REFERENCES recordings(id) ON DELETE CASCADE,
+         speaker_id INTEGER NOT NULL REFERENCES speakers(id),
+         start REAL NOT NULL,
+         end REAL NOT NULL)''',
+    '''CREATE TABLE IF NOT EXISTS words
+        (recording_id INTEGER NOT NULL REFERENCES recordings(id) ON DELETE CASCADE,
+         segment_id INTEGER REFERENCES segments(id) ON DELETE CASCADE,
+         start REAL NOT NULL,
+         end REAL NOT NULL,
+         word TEXT NOT NULL)''',
+    '''CREATE INDEX IF NOT EXISTS idx_notes_user_time ON notes(username, timestamp)''',
+    '''CREATE INDEX IF NOT EXISTS idx_notes_user_id ON notes(username, id)''',
+    '''CREATE INDEX IF NOT EXISTS idx_recordings_user_time ON recordings(username, created_at)''',
+    '''CREATE INDEX IF NOT EXISTS idx_segments_recording ON segments(recording_id, start)''',
+    '''CREATE INDEX IF NOT EXISTS idx_segments_speaker ON segments(speaker_id, recording_id)''',
+    '''CREATE INDEX IF NOT EXISTS idx_turns_recording ON turns(recording_id, start)''',
+    '''CREATE INDEX IF NOT EXISTS idx_words_recording ON words(recording_id, start)''',
+    '''CREATE INDEX IF NOT EXISTS idx_words_segment ON words(segment_id)''',
+]
+
+_SCHEMA_V2 = [
+    '''CREATE TABLE IF NOT EXISTS note_chunks
+        (id INTEGER PRIMARY KEY,
+         note_id INTEGER NOT NULL REFERENCES notes(id) ON DELETE CASCADE,
+         username TEXT NOT NULL,
+         chunk_index INTEGER NOT NULL,
+         content TEXT NOT NULL)''',
+    '''CREATE INDEX IF NOT EXISTS idx_chunks_note ON note_chunks(note_id, chunk_index)''',
+    '''CREATE INDEX IF NOT EXISTS idx_chunks_user ON note_chunks(username, id)''',
+]
+
+# FTS5 dış içerik (external content) tablosu + senkron trigger'ları
+_SCHEMA_V2_FTS = [
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS note_chunks_fts USING fts5(
+         content, content='note_chunks', content_rowid='id',
+         tokenize='unicode61 remove_diacritics 2')''',
+    '''CREATE TRIGGER IF NOT EXISTS note_chunks_ai AFTER INSERT ON note_chunks BEGIN
+         INSERT INTO note_chunks_fts(rowid, content) VALUES (new.id, new.content);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS note_chunks_ad AFTER DELETE ON note_chunks BEGIN
+         INSERT INTO note_chunks_fts(note_chunks_fts, rowid, content) VALUES ('delete', old.id, old.content);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS note_chunks_au AFTER UPDATE ON note_chunks BEGIN
+         INSERT INTO note_chunks_fts(note_chunks_fts, rowid, content) VALUES ('delete', old.id, old.content);
+         INSERT INTO note_chunks_fts(rowid, content) VALUES (new.id, new.content);
+       END''',
+]
+
+
+def chunk_text(text: str, max_chars: int = CHUNK_CHARS) -> List[str]:
+    """Metni satır sınırlarından ~max_chars'lık parçalara böler (çok uzun satırlar kelimeden)."""
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for line in (text or "").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        pieces = [line]
+        if len(line) > max_chars:
+            pieces, piece = [], ""
+            for word in line.split():
+                if piece and len(piece) + len(word) + 1 > max_chars:
+                    pieces.append(piece)
+                    piece = ""
+                piece = f"{piece} {word}" if piece else word
+            if piece:
+                pieces.append(piece)
+        for piece in pieces:
+            if current and size + len(piece) + 1 > max_chars:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def fts_query(text: str) -> str:
+    """
+    Serbest soruyu güvenli bir FTS5 sorgusuna çevirir: kelimeler OR ile, önek eşleşmeli.
+    Türkçe ekler için uzun kelimeler ilk 6 harfe kısaltılır ("toplantıda" -> "toplan"*).
+    Kelimeler indeksle aynı biçimde katlanır (fold_text: "İstanbul" -> "istanbul").
+    """
+    terms = []
+    for token in re.findall(r"\w+", fold_text(text)):
+        if len(token) < 2:
+            continue
+        stem = token[:6] if len(token) > 6 else token
+        term = f'"{stem}"*'
+        if term not in terms:
+            terms.append(term)
+    return " OR ".join(terms)
+
+
+def parse_transcript(text: str) -> List[Dict[str, Any]]:
+    """
+    Ekrandaki döküm metnini segmentlere ayırır.
+    Zamanı olmayan satırlarda start/end None olur; konuşmacısız devam satırları
+    bir önceki segmente eklenir.
+    """
+    segments: List[Dict[str, Any]] = []
+    for raw in (text or "").splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        m = _LOCAL_LINE.match(line)
+        if m:
+            segments.append({"speaker": m.group(2), "start": float(m.group(1)),
+                             "end": None, "text": m.group(3).strip()})
+            continue
+        m = _CLOUD_LINE.match(line)
+        if m:
+            segments.append({"speaker": m.group(1), "start": None, "end": None,
+                             "text": m.group(2).strip()})
+            continue
+        if segments:
+            segments[-1]["text"] = f"{segments[-1]['text']} {line}".strip()
+        else:
+            segments.append({"speaker": None, "start": None, "end": None, "text": line})
+
+    # Zamanlı satırlarda bitiş = bir sonraki satırın başlangıcı
+    for cur, nxt in zip(segments, segments[1:]):
+        if cur["start"] is not None and nxt["start"] is not None:
+            cur["end"] = nxt["start"]
+    return segments
+
+
+class _LRU:
+    """Küçük, thread-safe LRU sözlüğü (okuma önbelleği)."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Any, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class DatabaseManager:
+    """
+    Thread-safe veritabanı katmanı.
+
+    - WAL modu: okuyucular yazıcıyı beklemez.
+    - Okumalar her thread'in kendi bağlantısından yapılır (threading.local).
+    - Tüm yazımlar tek bir "db-writer" thread'inden geçer; kuyrukta biriken
+      işler tek transaction'da toplanır (her biri kendi SAVEPOINT'inde, biri
+      hata verirse yalnızca o geri alınır).
+    - SQL metinleri sabittir; sqlite3 her bağlantıda hazırlanmış ifadeleri
+      önbellekte tutar (cached_statements).
+    - get_note_content gibi sık okumalar küçük bir LRU önbellekten döner.
+    """
+
+    def __init__(self, db_name="asistan_veritabani.db", embedder=None):
+        self.db_name = db_name
+        if db_name == ":memory:":
+            # Bağlantılar arası paylaşılan bellek içi veritabanı
+            self._target, self._uri = f"file:asistan-{id(self)}?mode=memory&cache=shared", True
+        else:
+            self._target, self._uri = db_name, False
+
+        self.conn = self._connect()
+        self.conn.isolation_level = None   # transaction'ları yazıcı kendisi yönetir
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.create_tables()
+        self.migrate()
+        self.has_fts = self._has_fts(self.conn)
+
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._content_cache = _LRU(CONTENT_CACHE_SIZE)
+
+        self._writes: "queue.Queue" = queue.Queue()
+        self._writer = threading.Thread(target=self._writer_loop, name="db-writer", daemon=True)
+        self._writer.start()
+
+        self.embedder = None
+        self.vectors = None
+        self._vector_lock = threading.Lock()
+        self._closing = threading.Event()
+        self._vector_sync: Optional[threading.Thread] = None
+        if VECTOR_INDEX_ENABLED and db_name != ":memory:":
+            from vector_index import VectorIndex, get_embedder
+            self.embedder = embedder or get_embedder()
+            self.vectors = VectorIndex(os.path.splitext(db_name)[0] + ".vectors",
+                                       self.embedder.dim, self.embedder.name)
+            # Eksik gömmeler (ör. OpenAI çağrıları) giriş ekranını bekletmesin
+            self._vector_sync = threading.Thread(target=self._sync_vectors_background,
+                                                 name="db-vectors", daemon=True)
+            self._vector_sync.start()
+
+    # --- BAĞLANTILAR ---
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._target, uri=self._uri, timeout=30,
+                               check_same_thread=False, cached_statements=256)
+        # FTS5 yoksa LIKE araması da sorguyla aynı katlanmış metinde yapılır
+        conn.create_function("fold", 1, fold_text, deterministic=True)
+        return conn
+
+    def _read(self) -> sqlite3.Connection:
+        """Çağıran thread'in okuma bağlantısı (ilk kullanımda açılır)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            conn.execute("PRAGMA query_only=ON")
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def _release_reader(self) -> None:
+        """Çağıran thread'in okuma bağlantısını kapatır (kısa ömürlü thread'ler için)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._readers_lock:
+            if conn in self._readers:
+                self._readers.remove(conn)
+        conn.close()
+
+    def close(self) -> None:
+        """Bekleyen yazımları bitirir ve tüm bağlantıları kapatır."""
+        self._closing.set()
+        if self._vector_sync is not None:
+            self._vector_sync.join()
+        if self._writer.is_alive():
+            self._writes.put(None)
+            self._writer.join()
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        self.conn.close()
+
+    def create_tables(self):
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS users
+                             (username TEXT PRIMARY KEY, password TEXT)''')
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS notes
+                             (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                              username TEXT,
+                              title TEXT,
+                              content TEXT,
+                              timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+        self.conn.execute("INSERT OR IGNORE INTO users VALUES ('admin', '1234')")
+
+    # --- ŞEMA / TAŞIMA ---
+    def migrate(self):
+        conn = self.conn
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        conn.execute("BEGIN")
+        try:
+            if version < 1:
+                self._migrate_v1(conn)
+            if version < 2:
+                self._migrate_v2(conn)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _migrate_v1(self, conn):
+        """Yapılandırılmış döküm tabloları + indeksler; mevcut notları ayrıştırıp doldurur."""
+        # executescript kendi COMMIT'ini yapar; taşıma tek transaction kalsın diye tek tek
+        for statement in _SCHEMA_V1:
+            conn.execute(statement)
+        notes = conn.execute(
+            '''SELECT n.id, n.username, n.title, n.content, CAST(strftime('%s', n.timestamp) AS REAL)
+               FROM notes n LEFT JOIN recordings r ON r.note_id = n.id
+               WHERE r.id IS NULL''').fetchall()
+        for note_id, username, title, content, created_at in notes:
+            self._insert_structured(conn, note_id, username, title, content, None, created_at or time.time())
+
+    def _migrate_v2(self, conn):
+        """Not parçaları + FTS5 indeksi; mevcut notlar parçalanıp indekslenir."""
+        for statement in _SCHEMA_V2:
+            conn.execute(statement)
+        conn.execute("SAVEPOINT fts")
+        try:
+            for statement in _SCHEMA_V2_FTS:
+                conn.execute(statement)
+            conn.execute("RELEASE fts")
+        except sqlite3.OperationalError as e:
+            # SQLite FTS5 olmadan derlenmişse arama LIKE ile çalışır
+            conn.execute("ROLLBACK TO fts")
+            conn.execute("RELEASE fts")
+            print(f"⚠️ FTS5 kullanılamıyor, basit aramaya düşülecek: {e}")
+        notes = conn.execute(
+            '''SELECT n.id, n.username, n.content FROM notes n
+               WHERE NOT EXISTS (SELECT 1 FROM note_chunks c WHERE c.note_id = n.id)''').fetchall()
+        for note_id, username, content in notes:
+            self._insert_chunks(conn, note_id, username, content)
+
+    @staticmethod
+    def _has_fts(conn) -> bool:
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name='note_chunks_fts'").fetchone() is not None
+
+    # --- YAZICI THREAD ---
+    def _submit(self, fn, *args) -> Future:
+        """fn(conn, *args) yazıcı thread'de, bir transaction içinde çalışır."""
+        if not self._writer.is_alive():
+            raise RuntimeError("Veritabanı kapatıldı")
+        future: Future = Future()
+        self._writes.put((fn, args, future))
+        return future
+
+    def _writer_loop(self):
+        stopping = False
+        while not stopping:
+            item = self._writes.get()
+            if item is None:
+                break
+            batch = [item]
+            # O ana kadar biriken yazımlar aynı transaction'a
+            while len(batch) < WRITE_BATCH_MAX:
+                try:
+                    item = self._writes.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        conn = self.conn
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for fn, args, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT job")
+                try:
+                    outcomes.append((future, fn(conn, *args), None))
+                    conn.execute("RELEASE job")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    outcomes.append((future, None, e))
+            conn.execute("COMMIT")
+        except Exception as e:
+            # BEGIN/COMMIT başarısız: toplu işin tamamı geçersiz
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for fn, args, future in batch:
+                if not future.done():
+                    if not future.running():
+                        future.set_running_or_notify_cancel()
+                    future.set_exception(e)
+            return
+        for future, value, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(value)
+
+    # --- VEKTÖR İNDEKSİ ---
+    def sync_vectors(self, batch_size=512):
+        """İndekste olmayan (id'si son eklenenden büyük) parçaları gömüp sona ekler."""
+        if self.vectors is None:
+            return
+        conn = self._read()
+        with self._vector_lock:
+            while not self._closing.is_set():
+                rows = conn.execute(
+                    "SELECT id, content FROM note_chunks WHERE id > ? ORDER BY id LIMIT ?",
+                    (self.vectors.last_id, batch_size)).fetchall()
+                if not rows:
+                    break
+                self.vectors.add([r[0] for r in rows], self.embedder.embed([r[1] for r in rows]))
+
+    def _sync_vectors_background(self):
+        try:
+            self.sync_vectors()
+        except Exception as e:
+            # Anlamsal arama ilk sorguda yeniden dener; anahtar kelime araması etkilenmez
+            print(f"⚠️ Vektör indeksi güncellenemedi: {e}")
+        finally:
+            self._release_reader()
+
+    # --- YAZMA (yazıcı thread'de) ---
+    @staticmethod
+    def _insert_chunks(conn, note_id, username, text):
+        """Not parçalarını ekler; FTS indeksi trigger ile güncellenir."""
+        conn.executemany(
+            "INSERT INTO note_chunks (note_id, username, chunk_index, content) VALUES (?, ?, ?, ?)",
+            [(note_id, username, i, chunk) for i, chunk in enumerate(chunk_text(text))])
+
+    @staticmethod
+    def _speaker_ids(conn, labels: Iterable[Optional[str]]) -> Dict[str, int]:
+        labels = sorted({l for l in labels if l})
+        conn.executemany("INSERT OR IGNORE INTO speakers (label) VALUES (?)", [(l,) for l in labels])
+        ids = {}
+        for label in labels:
+            ids[label] = conn.execute("SELECT id FROM speakers WHERE label=?", (label,)).fetchone()[0]
+        return ids
+
+    def _insert_structured(self, conn, note_id, username, title, text, transcript, created_at):
+        """Bir notun yapılandırılmış dökümünü yazar (çağıran transaction içinde)."""
+        if transcript and transcript.get("groups"):
+            groups = transcript["groups"]
+            words = transcript.get("words") or []
+            turns = transcript.get("turns") or []
+            language = transcript.get("language")
+        else:
+            groups, words, turns, language = parse_transcript(text), [], [], None
+
+        ends = [g["end"] for g in groups if g.get("end") is not None] + [t[1] for t in turns]
+        duration = max(ends) if ends else None
+        cur = conn.execute(
+            "INSERT INTO recordings (note_id, username, source, language, duration, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (note_id, username, title, language, duration, created_at))
+        recording_id = cur.lastrowid
+
+        speakers = self._speaker_ids(conn, [g.get("speaker") for g in groups] + [t[2] for t in turns])
+
+        # Segment id'leri ardışık olsun diye tek tek (executemany lastrowid vermez)
+        segment_ids = []
+        for g in groups:
+            cur = conn.execute(
+                "INSERT INTO segments (recording_id, speaker_id, start, end, text) VALUES (?, ?, ?, ?, ?)",
+                (recording_id, speakers.get(g.get("speaker")), g.get("start"), g.get("end"), g["text"]))
+            segment_ids.append(cur.lastrowid)
+
+        conn.executemany(
+            "INSERT INTO turns (recording_id, speaker_id, start, end) VALUES (?, ?, ?, ?)",
+            [(recording_id, speakers[t[2]], t[0], t[1]) for t in turns])
+
+        if words:
+            conn.executemany(
+                "INSERT INTO words (recording_id, segment_id, start, end, word) VALUES (?, ?, ?, ?, ?)",
+                [(recording_id, seg_id, w["start"], w["end"], w["word"].strip())
+                 for w, seg_id in zip(words, self._word_segments(groups, words, segment_ids))])
+        return recording_id
+
+    @staticmethod
+    def _word_segments(groups, words, segment_ids) -> List[Optional[int]]:
+        """Kelime -> segment id. Gruplar ardışık kelimelerden oluşur (bkz. align.group_by_speaker)."""
+        if all("word_count" in g for g in groups):
+            out = []
+            for g, seg_id in zip(groups, segment_ids):
+                out.extend([seg_id] * g["word_count"])
+            return out
+        # Eski sonuçlarda sayı yoksa: kelimenin başladığı segment
+        out, gi = [], 0
+        for w in words:
+            while gi + 1 < len(groups) and w["start"] >= groups[gi + 1]["start"]:
+                gi += 1
+            out.append(segment_ids[gi] if groups else None)
+        return out
+
+    def _write_note(self, conn, username, title, text, transcript):
+        cur = conn.execute("INSERT INTO notes (username, title, content) VALUES (?, ?, ?)",
+                           (username, title, text))
+        note_id = cur.lastrowid
+        self._insert_structured(conn, note_id, username, title, text, transcript, time.time())
+        self._insert_chunks(conn, note_id, username, text)
+        return note_id
+
+    def save_note(self, username, title, text, transcript=None, wait=True):
+        """
+        Notu kaydeder. transcript (run_pipeline sonucu: groups/words/turns/language)
+        verilirse kelime ve turn'ler de yazılır; yoksa metin ayrıştırılır.
+        Yazım, yazıcı thread'de diğer bekleyen yazımlarla aynı transaction'da yapılır.
+        wait=False ise note_id'yi verecek bir Future döner.
+        """
+        future = self._submit(self._write_note, username, title, text, transcript)
+        if not wait:
+            return future
+        note_id = future.result()
+        self._content_cache.pop(note_id)
+        try:
+            self.sync_vectors()
+        except Exception as e:
+            # Not kaydı geçerli; eksik vektörler bir sonraki senkronda eklenir
+            print(f"⚠️ Vektör indeksi güncellenemedi: {e}")
+        return note_id
+
+    # --- OKUMA (çağıran thread'in bağlantısıyla) ---
+    def login(self, user, pwd):
+        row = self._read().execute("SELECT 1 FROM users WHERE username=? AND password=?",
+                                   (user, pwd)).fetchone()
+        return row is not None
+
+    def get_notes_list(self, username):
+        return self._read().execute("SELECT id, title, timestamp FROM notes WHERE username=? ORDER BY id DESC",
+                                    (username,)).fetchall()
+
+    def get_notes_page(self, username, before_id=None, limit=100):
+        """Keyset sayfalama: id'si before_id'den küçük en yeni `limit` not (azalan)."""
+        if before_id is None:
+            return self._read().execute(
+                "SELECT id, title, timestamp FROM notes WHERE username=? ORDER BY id DESC LIMIT ?",
+                (username, limit)).fetchall()
+        return self._read().execute(
+            "SELECT id, title, timestamp FROM notes WHERE username=? AND id<? ORDER BY id DESC LIMIT ?",
+            (username, before_id, limit)).fetchall()
+
+    def get_notes_since(self, username, after_id):
+        """id'si after_id'den büyük notlar, eskiden yeniye (geçmiş listesine ekleme için)."""
+        return self._read().execute(
+            "SELECT id, title, timestamp FROM notes WHERE username=? AND id>? ORDER BY id",
+            (username, after_id)).fetchall()
+
+    def get_note_content(self, note_id):
+        note_id = int(note_id)
+        content = self._content_cache.get(note_id)
+        if content is None:
+            row = self._read().execute("SELECT content FROM notes WHERE id=?", (note_id,)).fetchone()
+            if row is None:
+                return ""
+            content = row[0]
+            self._content_cache.put(note_id, content)
+        return content
+
+    def get_all_context(self, username):
+        return self._read().execute("SELECT title, content FROM notes WHERE username=?", (username,)).fetchall()
+
+    def get_segments(self, username, speaker=None, since=None, until=None) -> List[Tuple]:
+        """
+        Kullanıcının segmentleri: (note_id, title, created_at, speaker, start, end, text).
+        speaker: etiket (ör. "SPEAKER_01"); since/until: epoch saniye.
+        """
+        sql = ['''SELECT r.note_id, r.source, r.created_at, sp.label, s.start, s.end, s.text
+                  FROM recordings r
+                  JOIN segments s ON s.recording_id = r.id
+                  LEFT JOIN speakers sp ON sp.id = s.speaker_id
+                  WHERE r.username = ?''']
+        args: List[Any] = [username]
+        if since is not None:
+            sql.append("AND r.created_at >= ?")
+            args.append(since)
+        if until is not None:
+            sql.append("AND r.created_at < ?")
+            args.append(until)
+        if speaker is not None:
+            sql.append("AND s.speaker_id = (SELECT id FROM speakers WHERE label = ?)")
+            args.append(speaker)
+        sql.append("ORDER BY r.created_at, s.start")
+        return self._read().execute(" ".join(sql), args).fetchall()
+
+    def get_words(self, note_id) -> List[Tuple]:
+        """Notun kelimeleri: (start, end, word, speaker)."""
+        return self._read().execute(
+            '''SELECT w.start, w.end, w.word, sp.label
+               FROM recordings r
+               JOIN words w ON w.recording_id = r.id
+               LEFT JOIN segments s ON s.id = w.segment_id
+               LEFT JOIN speakers sp ON sp.id = s.speaker_id
+               WHERE r.note_id = ?
+               ORDER BY w.start''', (note_id,)).fetchall()
+
+    def search_notes(self, username, query, k=6) -> List[Dict[str, Any]]:
+        """
+        Soruyla en alakalı k not parçası (BM25 sırasıyla):
+        [{"note_id", "title", "content", "snippet", "score"}, ...]
+        """
+        match = fts_query(query)
+        if not match:
+            return []
+        if self.has_fts:
+            rows = self._read().execute(
+                '''SELECT c.id, c.note_id, n.title, c.content,
+                          snippet(note_chunks_fts, 0, '[', ']', '…', 16),
+                          bm25(note_chunks_fts)
+                   FROM note_chunks_fts
+                   JOIN note_chunks c ON c.id = note_chunks_fts.rowid
+                   JOIN notes n ON n.id = c.note_id
+                   WHERE note_chunks_fts MATCH ? AND c.username = ?
+                   ORDER BY bm25(note_chunks_fts)
+                   LIMIT ?''', (match, username, k)).fetchall()
+        else:
+            terms = [t.strip('"*') for t in match.split(" OR ")]
+            where = " OR ".join("fold(c.content) LIKE ?" for _ in terms)
+            rows = self._read().execute(
+                f'''SELECT c.id, c.note_id, n.title, c.content, substr(c.content, 1, 160), 0.0
+                    FROM note_chunks c JOIN notes n ON n.id = c.note_id
+                    WHERE c.username = ? AND ({where})
+                    ORDER BY c.id DESC LIMIT ?''',
+                [username] + [f"%{t}%" for t in terms] + [k]).fetchall()
+        return [{"chunk_id": r[0], "note_id": r[1], "title": r[2], "content": r[3],
+                 "snippet": r[4], "score": r[5]} for r in rows]
+
+    def get_recent_chunks(self, username, k=6) -> List[Dict[str, Any]]:
+        """Arama sonuç vermezse: en yeni notların ilk parçaları."""
+        rows = self._read().execute(
+            '''SELECT c.id, c.note_id, n.title, c.content
+               FROM note_chunks c JOIN notes n ON n.id = c.note_id
+               WHERE c.username = ? AND c.chunk_index = 0
+               ORDER BY c.id DESC LIMIT ?''', (username, k)).fetchall()
+        return [{"chunk_id": r[0], "note_id": r[1], "title": r[2], "content": r[3],
+                 "snippet": r[3][:160], "score": None} for r in rows]
+
+    def semantic_search(self, username, query, k=6, overfetch=8) -> List[Dict[str, Any]]:
+        """
+        Vektör indeksinde soruya en yakın k parça (kosinüs benzerliği).
+        İndeks tüm kullanıcıları içerir; k*overfetch aday alınıp kullanıcıya göre
+        süzülür, k sonuç çıkmazsa aday sayısı büyütülerek (en fazla tüm indeks) tekrarlanır.
+        """
+        if self.vectors is None or not query.strip():
+            return []
+        self.sync_vectors()   # wait=False ile kaydedilen notlar
+        embedding = self.embedder.embed([query])[0]
+        fetch = k * overfetch
+        checked = set()
+        rows = []
+        while True:
+            ids, scores = self.vectors.search(embedding, fetch)
+            score_of = dict(zip(ids.tolist(), scores.tolist()))
+            fresh = [i for i in score_of if i not in checked]
+            checked.update(fresh)
+            for start in range(0, len(fresh), 500):   # SQLite parametre sınırı
+                batch = fresh[start:start + 500]
+                marks = ",".join("?" * len(batch))
+                rows += [r + (score_of[r[0]],) for r in self._read().execute(
+                    f'''SELECT c.id, c.note_id, n.title, c.content
+                        FROM note_chunks c JOIN notes n ON n.id = c.note_id
+                        WHERE c.username = ? AND c.id IN ({marks})''',
+                    [username] + batch).fetchall()]
+            if len(rows) >= k or ids.size < fetch:
+                break
+            fetch *= 4
+        rows.sort(key=lambda r: r[4], reverse=True)
+        return [{"chunk_id": r[0], "note_id": r[1], "title": r[2], "content": r[3],
+                 "snippet": r[3][:160], "score": r[4]} for r in rows[:k]]
+
+    def retrieve_context(self, username, query, k=6) -> List[Dict[str, Any]]:
+        """
+        Asistan için bağlam: BM25 ve vektör sıralamaları reciprocal rank fusion ile
+        birleştirilir; ikisi de boşsa en yeni notların parçaları döner.
+        """
+        fused: Dict[int, float] = {}
+        hits: Dict[int, Dict[str, Any]] = {}
+        for results in (self.search_notes(username, query, k * 2),
+                        self.semantic_search(username, query, k * 2)):
+            for rank, hit in enumerate(results):
+                fused[hit["chunk_id"]] = fused.get(hit["chunk_id"], 0.0) + 1.0 / (_RRF_K + rank + 1)
+                hits.setdefault(hit["chunk_id"], hit)
+        if not fused:
+            return self.get_recent_chunks(username, k)
+        best = sorted(fused, key=fused.get, reverse=True)[:k]
+        return [hits[i] for i in best]
@@ -0,0 +1,311 @@
+"""
+Arka plan işleri için sınırlı iş zamanlayıcı.
+
+Her "LOKAL MOD" / "CLOUD MOD" / sohbet isteği artık kendi sınırsız thread'ini
+açmaz; işler tek bir zamanlayıcıya gönderilir:
+
+- Sabit sayıda işçi thread'i: varsayılan olarak tür sınırlarının toplamı, böylece
+  lokal + cloud işleri doluyken de sohbet isteği bekleyen bir işçi bulur.
+- Tür başına eşzamanlılık sınırı: lokal (GPU/CPU, model belleği) işler
+  varsayılan olarak tek tek, cloud ve sohbet (I/O) işleri birkaç tane birden.
+- Aynı tür + aynı anahtar (ör. aynı dosya) sırada ya da çalışır durumdaysa
+  yeni gönderim mevcut işe bağlanır; model iki kez yüklenmez.
+- İptal: sıradaki iş hemen düşer, çalışan iş bir sonraki aşama sınırında
+  (`job.progress` / `job.check`) JobCancelled ile durur.
+- İlerleme olayları (aşama, yüzde, tahmini kalan süre) abonelere yayınlanır;
+  GUI metin log'u yerine bunları dinler.
+
+Modül olarak:
+    from jobs import JobScheduler
+    jobs = JobScheduler()
+    jobs.subscribe(print)                        # JobEvent'ler işçi thread'inden gelir
+    job = jobs.submit("local", lambda job: run(job), key="kayit.wav")
+    job.cancel()
+
+Ortam değişkenleri:
+    JOB_WORKERS          Toplam işçi sayısı (varsayılan: sınırların toplamı, 1+2+2=5)
+    JOB_LIMIT_LOCAL      Aynı anda lokal iş (varsayılan 1)
+    JOB_LIMIT_CLOUD      Aynı anda cloud işi (varsayılan 2)
+    JOB_LIMIT_CHAT       Aynı anda sohbet isteği (varsayılan 2)
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "0")) or None   # None: sum(limits)
+DEFAULT_LIMITS = {
+    "local": int(os.getenv("JOB_LIMIT_LOCAL", "1")),
+    "cloud": int(os.getenv("JOB_LIMIT_CLOUD", "2")),
+    "chat": int(os.getenv("JOB_LIMIT_CHAT", "2")),
+}
+
+# İş durumları
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+class JobCancelled(Exception):
+    """Çalışan iş iptal edildiğinde aşama sınırında fırlatılır."""
+
+
+class JobEvent:
+    """Abonelere giden yapılandırılmış olay."""
+
+    __slots__ = ("job_id", "kind", "key", "state", "stage", "percent", "eta", "message", "error", "time")
+
+    def __init__(self, job: "Job", state: str, stage: Optional[str] = None,
+                 percent: Optional[float] = None, eta: Optional[float] = None,
+                 message: Optional[str] = None, error: Optional[BaseException] = None):
+        self.job_id = job.id
+        self.kind = job.kind
+        self.key = job.key
+        self.state = state
+        self.stage = stage
+        self.percent = percent
+        self.eta = eta
+        self.message = message
+        self.error = error
+        self.time = time.time()
+
+    def __repr__(self):
+        pct = f" {self.percent:.0f}%" if self.percent is not None else ""
+        return f"<JobEvent #{self.job_id} {self.kind} {self.state} {self.stage or ''}{pct}>"
+
+
+class Job:
+    """Zamanlayıcıdaki tek iş. fn(job) işçi thread'inde çağrılır."""
+
+    def __init__(self, scheduler: "JobScheduler", job_id: int, kind: str, fn: Callable[["Job"], Any],
+                 key: Optional[str], priority: int, title: Optional[str]):
+        self.id = job_id
+        self.kind = kind
+        self.key = key
+        self.priority = priority
+        self.title = title or kind
+        self.state = QUEUED
+        self.future: Future = Future()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._fn = fn
+        self._scheduler = scheduler
+        self._cancel = threading.Event()
+
+    # -------------------------------
+    # İş fonksiyonunun kullandıkları
+    # -------------------------------
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def check(self) -> None:
+        """İptal istendiyse JobCancelled fırlatır."""
+        if self._cancel.is_set():
+            raise JobCancelled(f"İş #{self.id} iptal edildi")
+
+    def progress(self, stage: str, percent: Optional[float] = None, message: Optional[str] = None) -> None:
+        """İlerleme olayı yayınlar; ETA geçen süre ve yüzdeden tahmin edilir. İptal noktasıdır."""
+        self.check()
+        eta = None
+        if percent is not None and 0 < percent < 100 and self.started is not None:
+            elapsed = time.time() - self.started
+            eta = elapsed * (100.0 - percent) / percent
+        self._scheduler._emit(JobEvent(self, RUNNING, stage, percent, eta, message))
+
+    def log(self, message: str) -> None:
+        """Aşama bilgisi olmadan mesaj yayınlar."""
+        self._scheduler._emit(JobEvent(self, RUNNING, message=message))
+
+    # -------------------------------
+    # Dışarıdan
+    # -------------------------------
+    def cancel(self) -> bool:
+        return self._scheduler.cancel(self.id)
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        return self.future.result(timeout)
+
+    def __repr__(self):
+        return f"<Job #{self.id} {self.kind} {self.state} {self.key or ''}>"
+
+
+class JobScheduler:
+    """Öncelikli, tür başına sınırlı iş havuzu."""
+
+    def __init__(self, workers: Optional[int] = JOB_WORKERS, limits: Optional[Dict[str, int]] = None):
+        self.limits = dict(DEFAULT_LIMITS)
+        if limits:
+            self.limits.update(limits)
+        if workers is None:
+            # Her tür kendi sınırına kadar aynı anda çalışabilsin; aksi halde ör. 3 işçiyle
+            # 1 lokal + 2 cloud iş havuzu doldurur ve sohbet sırada aç kalır
+            workers = sum(self.limits.values())
+        self._cond = threading.Condition()
+        self._pending: List = []               # (-priority, sıra, job) yığını
+        self._seq = itertools.count()
+        self._ids = itertools.count(1)
+        self._jobs: Dict[int, Job] = {}        # sıradaki + çalışan işler
+        self._by_key: Dict[tuple, Job] = {}
+        self._running: Dict[str, int] = {}
+        self._subscribers: List[Callable[[JobEvent], None]] = []
+        self._shutdown = False
+        self._threads = [threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+                         for i in range(max(1, workers))]
+        for t in self._threads:
+            t.start()
+
+    # -------------------------------
+    # Olaylar
+    # -------------------------------
+    def subscribe(self, callback: Callable[[JobEvent], None]) -> Callable[[], None]:
+        """Olay aboneliği; aboneliği bitiren fonksiyonu döner. Geri çağrılar işçi thread'inden gelir."""
+        with self._cond:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._cond:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def _emit(self, event: JobEvent) -> None:
+        with self._cond:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"⚠️ İş olayı dinleyicisi hata verdi: {e}")
+
+    # -------------------------------
+    # Gönderme / iptal
+    # -------------------------------
+    def submit(self, kind: str, fn: Callable[[Job], Any], key: Optional[str] = None,
+               priority: int = 0, title: Optional[str] = None) -> Job:
+        """
+        İşi sıraya koyar. Aynı (kind, key) ile sırada/çalışan bir iş varsa onu döner.
+        priority büyük olan önce çalışır.
+        """
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("Zamanlayıcı kapatıldı")
+            if key is not None:
+                existing = self._by_key.get((kind, key))
+                if existing is not None:
+                    return existing
+            job = Job(self, next(self._ids), kind, fn, key, priority, title)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._by_key[(kind, key)] = job
+            heapq.heappush(self._pending, (-priority, next(self._seq), job))
+            self._cond.notify_all()
+        self._emit(JobEvent(job, QUEUED, message=job.title))
+        return job
+
+    def is_active(self, kind: str, key: str) -> bool:
+        with self._cond:
+            return (kind, key) in self._by_key
+
+    def cancel(self, job_id: int) -> bool:
+        """Sıradaki işi düşürür, çalışana iptal işareti koyar. İş bulunamazsa False."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return False
+            job._cancel.set()
+            queued = job.state == QUEUED
+            if queued:
+                self._pending = [entry for entry in self._pending if entry[2] is not job]
+                heapq.heapify(self._pending)
+                self._forget(job, CANCELLED)
+        if queued:
+            job.future.cancel()
+            job.future.set_running_or_notify_cancel()
+            self._emit(JobEvent(job, CANCELLED))
+        return True
+
+    def cancel_all(self, kind: Optional[str] = None) -> None:
+        with self._cond:
+            ids = [j.id for j in self._jobs.values() if kind is None or j.kind == kind]
+        for job_id in ids:
+            self.cancel(job_id)
+
+    def active(self) -> List[Job]:
+        with self._cond:
+            return list(self._jobs.values())
+
+    def shutdown(self, wait: bool = True, cancel: bool = True) -> None:
+        if cancel:
+            self.cancel_all()
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for t in self._threads:
+                t.join()
+
+    # -------------------------------
+    # İşçiler
+    # -------------------------------
+    def _forget(self, job: Job, state: str) -> None:
+        # _cond tutulurken çağrılır
+        job.state = state
+        job.finished = time.time()
+        self._jobs.pop(job.id, None)
+        if job.key is not None and self._by_key.get((job.kind, job.key)) is job:
+            del self._by_key[(job.kind, job.key)]
+
+    def _next_job(self) -> Optional[Job]:
+        """Sınırı dolmamış türden en öncelikli işi sıradan alır (_cond tutulurken)."""
+        skipped = []
+        job = None
+        while self._pending:
+            entry = heapq.heappop(self._pending)
+            candidate = entry[2]
+            if self._running.get(candidate.kind, 0) < self.limits.get(candidate.kind, 1):
+                job = candidate
+                break
+            skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(self._pending, entry)
+        return job
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    if self._shutdown:
+                        return
+                    self._cond.wait()
+                    job = self._next_job()
+                self._running[job.kind] = self._running.get(job.kind, 0) + 1
+                job.state = RUNNING
+                job.started = time.time()
+            job.future.set_running_or_notify_cancel()
+            self._emit(JobEvent(job, RUNNING, message=job.title))
+
+            state, value, error = DONE, None, None
+            try:
+                value = job._fn(job)
+                if job.cancelled:
+                    state = CANCELLED
+            except JobCancelled as e:
+                state, error = CANCELLED, e
+            except Exception as e:
+                state, error = FAILED, e
+
+            with self._cond:
+                self._running[job.kind] -= 1
+                self._forget(job, state)
+                self._cond.notify_all()
+            if state == DONE:
+                job.future.set_result(value)
+            elif error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(value)
+            self._emit(JobEvent(job, state, percent=100.0 if state == DONE else None, error=error))
@@ -1,11 +1,24 @@
 import os
-import torch
-import torchaudio
+import json
+import time
 import sys
-from pyannote.audio import Pipeline
-from faster_whisper import WhisperModel
+import threading
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+from transcription.align import align_words, flatten_words, render_transcript
+from transcription.audio import SAMPLE_RATE
+from transcription.audio_source import open_audio
+from transcription.whisper import transcribe_audio
+from transcription.models import DIARIZATION_MODEL, get_whisper_model, prewarm
+from transcription.cache import CACHE_DIR, cached
+from transcription.checkpoint import open_run
+from transcription.vad import VAD_ENABLED, SpeechMap, detect_speech, vad_params
+from transcription.diarization.diarization import DIARIZATION_BACKEND, backend_params, diarize
+from transcription import tracing
+
 # .env yükle
 load_dotenv()
 
@@ -14,145 +27,357 @@ HF_TOKEN = os.getenv("HF_TOKEN")
 AUDIO_FILE = "" # Bu GUI tarafından doldurulacak
 MODEL_SIZE = "medium"
 
-# Windows için NVIDIA yollarını ekle
-def add_nvidia_paths():
+# Whisper ve pyannote aynı anda mı çalışsın? (PIPELINE_PARALLEL=0 -> sırayla)
+PARALLEL_STAGES = os.getenv("PIPELINE_PARALLEL", "1") != "0"
+# İlerleme yüzdesi için aşamaların yaklaşık süre payları
+STAGE_WEIGHTS = {"decode": 0.05, "whisper": 0.5, "diarization": 0.4, "alignment": 0.05}
+
+# torch / pyannote / faster-whisper bu modül import edilirken yüklenmez; ilk
+# kullanımda (_torch, model kayıt defteri) yüklenir. GUI giriş ekranı beklemez.
+_NVIDIA_CACHE = os.path.join(CACHE_DIR, "nvidia_paths.json")
+_nvidia_lock = threading.Lock()
+_nvidia_added = False
+
+# torch thread sayısı süreç genelidir: paralel çalıştırmalar onu birlikte kullanır
+_torch_threads_lock = threading.Lock()
+_torch_threads_users = 0
+_torch_threads_saved = None
+
+def _nvidia_bin_dirs(nvidia_path):
+    """nvidia/**/bin klasörleri. Tarama sonucu klasörün mtime'ıyla diskte saklanır."""
+    mtime = os.stat(nvidia_path).st_mtime_ns
     try:
-        venv_base = os.path.dirname(os.path.dirname(sys.executable))
-        nvidia_path = os.path.join(venv_base, "Lib", "site-packages", "nvidia")
-        if os.path.exists(nvidia_path):
-            for root, dirs, files in os.walk(nvidia_path):
-                if "bin" in dirs:
-                    bin_path = os.path.join(root, "bin")
+        with open(_NVIDIA_CACHE, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get("root") == nvidia_path and cache.get("mtime") == mtime:
+            return cache["dirs"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    dirs = [os.path.join(root, "bin") for root, subdirs, _ in os.walk(nvidia_path) if "bin" in subdirs]
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = _NVIDIA_CACHE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"root": nvidia_path, "mtime": mtime, "dirs": dirs}, f)
+        os.replace(tmp, _NVIDIA_CACHE)
+    except OSError:
+        pass
+    return dirs
+
+# Windows için NVIDIA yollarını ekle (süreç başına bir kez, torch importundan önce)
+def add_nvidia_paths():
+    global _nvidia_added
+    with _nvidia_lock:
+        if _nvidia_added:
+            return
+        _nvidia_added = True
+        try:
+            venv_base = os.path.dirname(os.path.dirname(sys.executable))
+            nvidia_path = os.path.join(venv_base, "Lib", "site-packages", "nvidia")
+            if os.path.exists(nvidia_path):
+                for bin_path in _nvidia_bin_dirs(nvidia_path):
                     os.environ["PATH"] = bin_path + os.pathsep + os.environ["PATH"]
                     if hasattr(os, 'add_dll_directory'):
                         os.add_dll_directory(bin_path)
-    except:
-        pass
+        except Exception:
+            pass
 
-add_nvidia_paths()
+def _torch():
+    """torch'u ilk kullanımda yükler (NVIDIA DLL yolları önce eklenir)."""
+    add_nvidia_paths()
+    import torch
+    return torch
 
-def main():
-    print("🚀 AKILLI NOT ASİSTANI (HASSAS LOKAL MOD) BAŞLATILIYOR...\n")
+@contextmanager
+def _torch_threads(torch, threads):
+    """
+    Paralel aşamalar boyunca torch thread sayısını ayarlar. Eşzamanlı çalıştırmalar
+    sayaçla paylaşır: ilk giren ayarlar, son çıkan ilk girenin gördüğü değere döndürür;
+    biri bitince diğerinin ayarı bozulmaz.
+    """
+    global _torch_threads_users, _torch_threads_saved
+    with _torch_threads_lock:
+        if _torch_threads_users == 0:
+            _torch_threads_saved = torch.get_num_threads()
+            torch.set_num_threads(threads)
+        _torch_threads_users += 1
+    try:
+        yield
+    finally:
+        with _torch_threads_lock:
+            _torch_threads_users -= 1
+            if _torch_threads_users == 0:
+                torch.set_num_threads(_torch_threads_saved)
+                _torch_threads_saved = None
 
-    if not os.path.exists(AUDIO_FILE):
-        print(f"❌ HATA: '{AUDIO_FILE}' dosyası bulunamadı!")
-        return None
+def _thread_split(parallel):
+    """
+    CPU çekirdeklerini iki model arasında böler: (whisper, torch).
+    Paralel modda ikisi aynı anda çalıştığı için toplam çekirdek sayısını aşmasınlar.
+    Her çalıştırmanın başında hesaplanır (import anında dondurulmaz; ör. konteyner
+    CPU kotası ya da WHISPER_CPU_THREADS sonradan değişebilir).
+    """
+    total = os.cpu_count() or 1
+    if not parallel:
+        return total, total
+    whisper_threads = int(os.getenv("WHISPER_CPU_THREADS", "0")) or max(1, (total + 1) // 2)
+    torch_threads = max(1, total - whisper_threads)
+    return whisper_threads, torch_threads
 
-    # --- 1. WHISPER (METİN) ---
-    print("📝 1. Aşama: Whisper ile kelime kelime döküm alınıyor...")
-    whisper_segments = []
-    
-    try:
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        compute_type = "float16" if device == "cuda" else "int8"
-        print(f"   -> Cihaz: {device} modunda çalışıyor...")
-        
-        # 'large-v2' modeli daha iyi ayırır ama yavaştır. Hız istersen 'medium' kalsın.
-        model = WhisperModel(MODEL_SIZE, device=device, compute_type=compute_type)
-        
-        # word_timestamps=True -> İşte bu salise ayarı için şart
-        segments, info = model.transcribe(AUDIO_FILE, beam_size=5, language="tr", word_timestamps=True)
-        whisper_segments = list(segments)
-        print(f"   ✅ Metin çıkarıldı! (Dil: {info.language})")
-
-    except Exception as e:
-        print(f"❌ Whisper Hatası: {e}")
+@lru_cache(maxsize=1)
+def _device_settings():
+    device = "cuda" if _torch().cuda.is_available() else "cpu"
+    compute_type = "float16" if device == "cuda" else "int8"
+    return device, compute_type
+
+def _diarization_spec(device):
+    if DIARIZATION_BACKEND == "ecapa":
+        from transcription.diarization.ecapa import SPEAKER_EMBEDDING_MODEL
+        return ("embedding", SPEAKER_EMBEDDING_MODEL, device, "float32", {"token": HF_TOKEN})
+    return ("pyannote", DIARIZATION_MODEL, device, "float32", {"token": HF_TOKEN})
+
+def prewarm_models(on_done=None, on_status=None):
+    """
+    torch importu ve Whisper/pyannote yüklemesi arka plan thread'inde (GUI girişten sonra).
+    on_status(mesaj) ara adımları, on_done(hata) sonucu bildirir; ikisi de arka plandan gelir.
+    """
+    status = on_status or (lambda message: None)
+
+    def _run():
+        try:
+            t0 = time.perf_counter()
+            device, compute_type = _device_settings()
+            status(f"torch hazır ({device}, {time.perf_counter() - t0:.1f} sn), modeller yükleniyor...")
+        except Exception as e:
+            if on_done:
+                on_done(e)
+            return
+        prewarm([
+            ("whisper", MODEL_SIZE, device, compute_type, {"cpu_threads": _thread_split(PARALLEL_STAGES)[0]}),
+            _diarization_spec(device),
+        ], on_done=on_done).join()
+
+    thread = threading.Thread(target=_run, name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+# --- AŞAMALAR ---
+def transcribe_stage(audio, lang="tr", cpu_threads=None):
+    """1. Aşama: Whisper kelime zaman damgaları -> {"words": [...], "language": "tr"}."""
+    device, compute_type = _device_settings()
+    cpu_threads = cpu_threads or _thread_split(PARALLEL_STAGES)[0]
+    print(f"   -> Cihaz: {device} modunda çalışıyor...")
+
+    # 'large-v2' modeli daha iyi ayırır ama yavaştır. Hız istersen 'medium' kalsın.
+    # Model süreç genelinde bir kez yüklenir (transcription/models.py)
+    with tracing.span("whisper.model_load", model=MODEL_SIZE, device=device):
+        get_whisper_model(MODEL_SIZE, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+    # word_timestamps=True -> İşte bu salise ayarı için şart (transcribe_audio içinde)
+    with tracing.span("whisper.transcribe", audio_seconds=audio.size / SAMPLE_RATE) as span:
+        result = transcribe_audio(audio, lang=lang, model_name=MODEL_SIZE, device=device,
+                                  compute_type=compute_type, beam_size=5, cpu_threads=cpu_threads)
+        span.set(segments=len(result["segments"]))
+    print(f"   ✅ Metin çıkarıldı! (Dil: {result['language']})")
+    return {"words": flatten_words(result["segments"]), "language": result["language"]}
+
+def diarize_stage(audio, min_speakers=1, max_speakers=3):
+    """2. Aşama: konuşmacı turn'leri -> [(start, end, speaker), ...] (pyannote ya da ecapa)."""
+    _torch()
+    device, _ = _device_settings()
+
+    # --- İŞTE BURASI ÖNEMLİ REİS ---
+    # min_speakers=1, max_speakers=5 vererek modele "Bak burada kalabalık olabilir" diyoruz.
+    # Bu sayede 3. kişiyi yutmaz.
+    print(f"   -> Derin analiz yapılıyor ({DIARIZATION_BACKEND}, 3-5 kişi olabilir)...")
+    turns = diarize(audio, min_speakers=min_speakers, max_speakers=max_speakers, device=device, token=HF_TOKEN)
+
+    print("   ✅ Konuşmacı zaman çizelgesi çıkarıldı!")
+    return turns
+
+
+def run_pipeline(audio_path, parallel=None, lang="tr", min_speakers=1, max_speakers=3, use_cache=True,
+                 on_progress=None):
+    """
+    Lokal hattın tamamı. Hata olursa None, yoksa:
+    {"text": "...", "groups": [...], "words": [...], "turns": [...], "language": "tr", "timings": [...]}
+    Aynı ses + aynı ayarlar daha önce işlendiyse sonuç önbellekten döner;
+    yarım kalmış bir çalıştırma varsa sadece eksik aşamalar çalışır.
+
+    on_progress(aşama, yüzde) her aşamanın başında ve sonunda çağrılır; fırlattığı
+    hata (ör. iş iptali) hattı aşama sınırında durdurur.
+
+    Aşamalar transcription/tracing.py span'leri olarak ölçülür; çağıran bir
+    Tracer etkinleştirdiyse (GUI / sunucu) span'ler ona yazılır.
+    """
+    if not os.path.exists(audio_path):
+        print(f"❌ HATA: '{audio_path}' dosyası bulunamadı!")
         return None
 
-    # --- 2. PYANNOTE (KONUŞMACI AYRIMI - HASSAS AYARLI) ---
-    print("\n🗣️  2. Aşama: Konuşmacılar salise hassasiyetiyle aranıyor...")
-    diarization_result = None
+    _, compute_type = _device_settings()
+    params = {"model": MODEL_SIZE, "compute_type": compute_type, "lang": lang,
+              "diarization": backend_params(),
+              "min_speakers": min_speakers, "max_speakers": max_speakers,
+              "vad": vad_params()}
+    fresh = False
 
-    try:
-        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        pipeline = Pipeline.from_pretrained("pyannote/speaker-diarization-3.1", token=HF_TOKEN).to(device)
-        
-        waveform, sample_rate = torchaudio.load(AUDIO_FILE)
-        
-        # --- İŞTE BURASI ÖNEMLİ REİS ---
-        # min_speakers=1, max_speakers=5 vererek modele "Bak burada kalabalık olabilir" diyoruz.
-        # Bu sayede 3. kişiyi yutmaz.
-        print("   -> Derin analiz yapılıyor (3-5 kişi olabilir)...")
-        
-        # Sözlük formatında veriyoruz ama parametreleri de ekliyoruz
-        inputs = {"waveform": waveform, "sample_rate": sample_rate}
-        
-        # Çağırırken min/max parametrelerini basıyoruz
-        output = pipeline(inputs, min_speakers=1, max_speakers=3)
-
-        if hasattr(output, "speaker_diarization"): diarization_result = output.speaker_diarization
-        elif hasattr(output, "annotation"): diarization_result = output.annotation
-        elif isinstance(output, tuple): diarization_result = output[0]
-        else: diarization_result = output
-             
-        print("   ✅ Konuşmacı zaman çizelgesi çıkarıldı!")
-
-    except Exception as e:
-        print(f"❌ Pyannote Hatası: {e}")
+    def _compute():
+        nonlocal fresh
+        fresh = True
+        return _run_pipeline(audio_path, params, parallel, lang, min_speakers, max_speakers, on_progress)
+
+    if not use_cache:
+        return _compute()
+
+    result = cached("pipeline", audio_path, params, _compute)
+    if result and not fresh:
+        print("♻️ Bu kayıt daha önce işlenmiş, sonuç önbellekten alındı.\n")
+        print(result["text"], end="")
+    return result
+
+def _run_pipeline(audio_path, params, parallel, lang, min_speakers, max_speakers, on_progress=None):
+    active = tracing.current()
+    with (nullcontext(active) if active else tracing.Tracer("pipeline")) as tracer:
+        return _run_stages(tracer, audio_path, params, parallel, lang, min_speakers, max_speakers, on_progress)
+
+def _run_stages(tracer, audio_path, params, parallel, lang, min_speakers, max_speakers, on_progress):
+    parallel = PARALLEL_STAGES if parallel is None else parallel
+    whisper_threads, torch_threads = _thread_split(parallel)
+    finished = set()
+    progress_lock = threading.Lock()
+
+    def progress(stage, done=False):
+        if on_progress is None:
+            return
+        with progress_lock:
+            if done:
+                finished.add(stage)
+            percent = 100.0 * sum(STAGE_WEIGHTS[s] for s in finished)
+        on_progress(stage, percent)
+
+    # Her aşamanın çıktısı diske yazılır; tekrar denemede biten aşamalar atlanır
+    store = open_run(audio_path, params)
+
+    # Ses bir kez diskteki 16 kHz mono WAV'a çözülür (önbellek) ve bellek eşlemeli
+    # okunur; iki aşama da aynı eşlemeyi paylaşır, kayıt RAM'e bütünüyle alınmaz
+    source = audio = None
+    progress("decode")
+    if not (store.has("transcript") and store.has("diarization")):
+        try:
+            with tracer.span("decode") as span:
+                source = open_audio(audio_path)
+                audio = source.samples()
+                span.set(audio_seconds=audio.size / SAMPLE_RATE)
+        except Exception as e:
+            print(f"❌ Ses Çözme Hatası: {e}")
+            return None
+    progress("decode", done=True)
+    audio_seconds = audio.size / SAMPLE_RATE if audio is not None else None
+
+    # Ortak VAD: iki modele de yalnızca konuşma bölgeleri verilir, çıktılar
+    # speech.map_* ile orijinal kayıt zamanına geri çevrilir
+    speech = engine_audio = None
+    if audio is not None:
+        if VAD_ENABLED:
+            with tracer.span("vad") as span:
+                speech = detect_speech(audio)
+                span.set(regions=len(speech.regions), speech_ratio=round(speech.ratio, 3))
+            if not speech.is_identity:
+                print(f"🔇 VAD: {speech.total_seconds:.0f} sn kaydın {speech.speech_seconds:.0f} sn'si konuşma")
+        else:
+            speech = SpeechMap.identity(audio.size)
+        # Sıkıştırılmış ses de diskte, bellek eşlemeli: iki model aynı eşlemeyi okur
+        with tracer.span("vad.compact"):
+            engine_audio = speech.compact_source(source).samples()
+        audio_seconds = engine_audio.size / SAMPLE_RATE
+    silent = speech is not None and not len(speech.regions)
+
+    def _transcribe():
+        if silent:
+            return {"words": [], "language": lang}
+        result = transcribe_stage(engine_audio, lang=lang, cpu_threads=whisper_threads)
+        return {**result, "words": speech.map_words(result["words"])}
+
+    def _diarize():
+        if silent:
+            return []
+        return speech.map_turns(diarize_stage(engine_audio, min_speakers, max_speakers))
+
+    def _whisper():
+        progress("whisper")
+        print("📝 1. Aşama: Whisper ile kelime kelime döküm alınıyor...")
+        try:
+            with tracer.span("whisper", audio_seconds=audio_seconds):
+                result = store.stage("transcript", _transcribe)
+        except Exception as e:
+            print(f"❌ Whisper Hatası: {e}")
+            return None
+        progress("whisper", done=True)
+        return result
+
+    def _pyannote():
+        progress("diarization")
+        print("\n🗣️  2. Aşama: Konuşmacılar salise hassasiyetiyle aranıyor...")
+        try:
+            with tracer.span("diarization", audio_seconds=audio_seconds):
+                result = store.stage("diarization", _diarize)
+        except Exception as e:
+            print(f"❌ Pyannote Hatası: {e}")
+            return None
+        progress("diarization", done=True)
+        return result
+
+    # --- 1 + 2. AŞAMALAR ---
+    # İki model de GIL'i bırakır (CTranslate2 / torch), thread'ler gerçekten paralel koşar.
+    if parallel:
+        print(f"⚡ Paralel mod: Whisper {whisper_threads} thread, pyannote {torch_threads} thread\n")
+        with _torch_threads(_torch(), torch_threads), \
+                ThreadPoolExecutor(max_workers=2, thread_name_prefix="stage") as pool:
+            # bind: stage thread'lerindeki alt span'ler de bu tracer'a yazılır
+            whisper_future = pool.submit(tracing.bind(_whisper))
+            turns_future = pool.submit(tracing.bind(_pyannote))
+            transcription, turns = whisper_future.result(), turns_future.result()
+    else:
+        transcription = _whisper()
+        turns = _pyannote() if transcription is not None else None
+
+    if transcription is None or turns is None:
+        if transcription is not None:
+            print("💾 Döküm kaydedildi; tekrar denendiğinde sadece başarısız aşama çalışacak.")
         return None
+    words, language = transcription["words"], transcription["language"]
 
     # --- 3. BİRLEŞTİRME (SALİSE HASSASİYETİ) ---
+    progress("alignment")
     print("\n🔗 3. Aşama: Kelimeler ve Kişiler Eşleştiriliyor...\n")
-    
-    diarization_data = list(diarization_result.itertracks(yield_label=True))
-    current_speaker = None
-    current_sentence = []
-    current_start_time = 0.0
-    
-    final_output_text = ""
-
-    for segment in whisper_segments:
-        if not segment.words: continue
-        for word in segment.words:
-            word_start = word.start
-            word_end = word.end
-            word_text = word.word.strip()
-
-            best_speaker = "Bilinmiyor"
-            max_overlap = 0
-
-            # Salise hesabı yaparak en doğru konuşmacıyı bul
-            for turn, _, speaker in diarization_data:
-                intersection_start = max(word_start, turn.start)
-                intersection_end = min(word_end, turn.end)
-                
-                # Eğer kesişim varsa
-                if intersection_end > intersection_start:
-                    overlap = intersection_end - intersection_start
-                    if overlap > max_overlap:
-                        max_overlap = overlap
-                        best_speaker = speaker
-
-            # Konuşmacı değişti mi?
-            if current_speaker is not None and best_speaker != current_speaker:
-                full_sentence = " ".join(current_sentence)
-                
-                # REİS DİKKAT: :.2f yaparak salise hassasiyetini açtık (örn: 0.53s)
-                line = f"[{current_start_time:.2f}s] {current_speaker}: {full_sentence}"
-                
-                print(line)
-                final_output_text += line + "\n"
-                
-                current_sentence = [word_text]
-                current_speaker = best_speaker
-                current_start_time = word_start
-            else:
-                if current_speaker is None:
-                    current_speaker = best_speaker
-                    current_start_time = word_start
-                current_sentence.append(word_text)
-
-    # Kalan son cümleyi yazdır
-    if current_sentence:
-        full_sentence = " ".join(current_sentence)
-        line = f"[{current_start_time:.2f}s] {current_speaker}: {full_sentence}"
-        print(line)
-        final_output_text += line + "\n"
+    with tracer.span("alignment", words=len(words)):
+        # Turn'ler bir kez sıralanıp süpürülür (bkz. transcription/align.py)
+        groups = store.stage("alignment", lambda: align_words(words, turns))
+        final_output_text = render_transcript(groups)
+    print(final_output_text, end="")
+
+    # Eski sürümlerin yazdığı audio.npy varsa silinir (çözülmüş ses artık audio_source önbelleğinde)
+    store.discard("audio")
+    progress("alignment", done=True)
 
     print("=" * 60)
+    print(tracer.report())
     print("✅ İŞLEM TAMAMLANDI!")
-    
-    return final_output_text
+
+    return {
+        "text": final_output_text,
+        "groups": groups,
+        "words": words,
+        "turns": turns,
+        "language": language,
+        "timings": tracer.stages,
+    }
+
+def main():
+    print("🚀 AKILLI NOT ASİSTANI (HASSAS LOKAL MOD) BAŞLATILIYOR...\n")
+    result = run_pipeline(AUDIO_FILE)
+    return result["text"] if result else None
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
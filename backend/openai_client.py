@@ -0,0 +1,175 @@
+"""
+Süreç genelinde paylaşılan OpenAI istemcileri.
+
+Her istek için yeni `OpenAI()` (ve yeni HTTP bağlantısı) açmak yerine:
+
+- `get_client()`        senkron istemci (bulut deşifresi); thread-safe, bağlantı havuzlu.
+- `get_host()`          arka plandaki tek bir asyncio döngüsünde yaşayan `AsyncOpenAI`;
+                        keep-alive bağlantılar istekler arasında yeniden kullanılır.
+- `stream_chat(...)`    sohbet cevabını parça parça (token token) geri çağrıya verir,
+                        toplam / ilk token zaman aşımı ve iptal destekler.
+
+Modül olarak:
+    from openai_client import stream_chat
+    stream = stream_chat([{"role": "user", "content": "Merhaba"}], on_delta=print)
+    stream.result()          # bitene kadar bekle (ya da stream.cancel())
+
+Ortam değişkenleri:
+    OPENAI_API_KEY / OPENAI_BASE_URL
+    CHAT_MODEL              Sohbet modeli (varsayılan gpt-4o)
+    OPENAI_TIMEOUT          Toplam istek zaman aşımı, sn (varsayılan 120)
+    OPENAI_CONNECT_TIMEOUT  Bağlantı zaman aşımı, sn (varsayılan 10)
+    OPENAI_MAX_CONNECTIONS  Havuzdaki en fazla bağlantı (varsayılan 10)
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, wait
+from typing import Callable, Dict, List, Optional
+
+CHAT_MODEL = os.getenv("CHAT_MODEL", "gpt-4o")
+TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "120"))
+CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10"))
+MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "10"))
+KEEPALIVE_SECONDS = 60.0
+
+
+class MissingAPIKey(RuntimeError):
+    """OPENAI_API_KEY tanımlı değil."""
+
+
+def _settings():
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise MissingAPIKey("OPENAI_API_KEY tanımlı değil (.env)")
+    import httpx
+    timeout = httpx.Timeout(TIMEOUT, connect=CONNECT_TIMEOUT)
+    limits = httpx.Limits(max_connections=MAX_CONNECTIONS,
+                          max_keepalive_connections=MAX_CONNECTIONS,
+                          keepalive_expiry=KEEPALIVE_SECONDS)
+    return api_key, os.getenv("OPENAI_BASE_URL") or None, timeout, limits
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Paylaşılan senkron OpenAI istemcisi (ilk çağrıda oluşturulur)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            import httpx
+            from openai import OpenAI
+            api_key, base_url, timeout, limits = _settings()
+            _client = OpenAI(api_key=api_key, base_url=base_url, timeout=timeout,
+                             http_client=httpx.Client(limits=limits, timeout=timeout))
+        return _client
+
+
+class AsyncClientHost:
+    """Arka plan thread'inde çalışan event loop + tek AsyncOpenAI örneği."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._client = None
+        self._thread = threading.Thread(target=self.loop.run_forever, name="openai-loop", daemon=True)
+        self._thread.start()
+
+    @property
+    def client(self):
+        # Yalnızca döngü thread'inde çağrılır
+        if self._client is None:
+            import httpx
+            from openai import AsyncOpenAI
+            api_key, base_url, timeout, limits = _settings()
+            self._client = AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=timeout,
+                                       http_client=httpx.AsyncClient(limits=limits, timeout=timeout))
+        return self._client
+
+    def submit(self, coro) -> Future:
+        """Coroutine'i döngüde çalıştırır; iptal edilebilir concurrent Future döner."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def close(self) -> None:
+        async def _close():
+            if self._client is not None:
+                await self._client.close()
+        self.submit(_close()).result(timeout=5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+_host: Optional[AsyncClientHost] = None
+_host_lock = threading.Lock()
+
+
+def get_host() -> AsyncClientHost:
+    global _host
+    with _host_lock:
+        if _host is None:
+            _host = AsyncClientHost()
+        return _host
+
+
+class ChatStream:
+    """Akan sohbet cevabı. result() tam metni döner; cancel() isteği keser."""
+
+    def __init__(self, future: Future):
+        self._future = future
+
+    def cancel(self) -> bool:
+        return self._future.cancel()
+
+    def done(self) -> bool:
+        return self._future.done()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Bitene kadar (en fazla timeout sn) bekler; bittiyse True."""
+        return bool(wait([self._future], timeout).done)
+
+    def result(self, timeout: Optional[float] = None) -> str:
+        return self._future.result(timeout)
+
+
+async def _stream(client, messages, on_delta, model, first_token_timeout):
+    stream = await client.chat.completions.create(model=model, messages=messages, stream=True)
+    parts: List[str] = []
+    iterator = stream.__aiter__()
+    try:
+        first = True
+        while True:
+            try:
+                if first:
+                    chunk = await asyncio.wait_for(iterator.__anext__(), first_token_timeout)
+                else:
+                    chunk = await iterator.__anext__()
+            except StopAsyncIteration:
+                break
+            first = False
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                on_delta(delta)
+    finally:
+        # İptal / zaman aşımında bağlantı havuza temiz dönsün
+        await stream.close()
+    return "".join(parts)
+
+
+def stream_chat(messages: List[Dict[str, str]], on_delta: Callable[[str], None],
+                model: str = CHAT_MODEL, timeout: float = TIMEOUT,
+                first_token_timeout: float = 30.0) -> ChatStream:
+    """
+    Cevabı akış halinde ister. on_delta(metin_parçası) döngü thread'inden çağrılır;
+    GUI tarafı parçaları kuyruğa alıp toplu çizmelidir.
+    """
+    host = get_host()
+
+    async def _run():
+        return await asyncio.wait_for(_stream(host.client, messages, on_delta, model, first_token_timeout),
+                                      timeout)
+
+    return ChatStream(host.submit(_run()))
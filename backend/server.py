@@ -0,0 +1,592 @@
+#!/usr/bin/env python3
+"""
+Yerel asyncio HTTP servisi (frontend ve diğer istemciler için).
+
+Bağımlılıksız (stdlib asyncio) küçük bir HTTP/1.1 sunucusu; modeller tek
+süreçte sıcak tutulur, birden çok kullanıcı aynı model sunucusunu paylaşır.
+İşler backend/jobs.py zamanlayıcısından geçer: lokal işler tür sınırıyla
+(JOB_LIMIT_LOCAL) sıraya girer, aynı içerik + aynı ayarlarla gelen
+tekrar istekler tek işte birleştirilir.
+
+Uç noktalar:
+    POST   /uploads              Ham ses gövdesi diske akıtılır (Content-Length
+                                 ya da chunked). ?name=kayit.wav
+                                 -> {"upload_id", "token", "bytes", "sha256"}
+    POST   /jobs                 {"upload_id", "token", "kind": "pipeline"|"whisper", "lang",
+                                  "min_speakers", "max_speakers"}       -> 202 {"job_id", ...}
+    GET    /jobs                 Yalnızca verilen token'ın işleri
+    GET    /jobs/<id>            Durum, aşama, yüzde, ETA; bittiyse sonuç
+    GET    /jobs/<id>/events     Server-sent events ile ilerleme akışı
+    DELETE /jobs/<id>            İptal
+    GET    /health               Canlılık + yüklü modeller
+    GET    /metrics              Prometheus metin formatında sayaçlar
+
+Erişim: Sunucunun kullanıcı girişi yoktur. Her yükleme rastgele bir token
+alır; iş oluşturmak ve işi okumak / iptal etmek için bu token gerekir
+(`X-Job-Token` başlığı ya da EventSource için `?token=`). Tarayıcıdan gelen
+istekler yalnızca izinli origin'lerden kabul edilir; başka bir sayfa
+kullanıcının tarayıcısı üzerinden yükleme yapamaz. Yüklenen dosya, ona bağlı
+işler bitince silinir; hiç iş bağlanmayan yüklemeler SERVER_UPLOAD_TTL sonra
+temizlenir.
+Kullanım:
+    python backend/server.py --host 127.0.0.1 --port 8765 --prewarm
+
+    curl -X POST --data-binary @toplanti.wav "http://127.0.0.1:8765/uploads?name=toplanti.wav"
+    curl -X POST -d '{"upload_id": "...", "token": "..."}' http://127.0.0.1:8765/jobs
+    curl -N "http://127.0.0.1:8765/jobs/1/events?token=..."
+
+Ortam değişkenleri:
+    SERVER_UPLOAD_DIR     Yüklemelerin klasörü (varsayılan: önbellek klasörü/uploads)
+    SERVER_MAX_UPLOAD_MB  Tek yükleme sınırı (varsayılan 2048)
+    SERVER_CORS_ORIGIN    İzinli origin'ler, virgülle (varsayılan Vite geliştirme sunucusu
+                          http://localhost:5173,http://127.0.0.1:5173). "*" yalnızca
+                          açıkça verilirse kabul edilir.
+    SERVER_UPLOAD_TTL     İşe bağlanmamış yüklemelerin ömrü, sn (varsayılan 3600)
+"""
+
+import argparse
+import asyncio
+import contextvars
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from jobs import CANCELLED, DONE, FAILED, JobScheduler
+from transcription import tracing
+from transcription.cache import CACHE_DIR
+
+UPLOAD_DIR = os.getenv("SERVER_UPLOAD_DIR", os.path.join(CACHE_DIR, "uploads"))
+MAX_UPLOAD_BYTES = int(float(os.getenv("SERVER_MAX_UPLOAD_MB", "2048")) * 1024 * 1024)
+CORS_ORIGINS = [o.strip() for o in
+                os.getenv("SERVER_CORS_ORIGIN", "http://localhost:5173,http://127.0.0.1:5173").split(",")
+                if o.strip()]
+UPLOAD_TTL_SECONDS = float(os.getenv("SERVER_UPLOAD_TTL", "3600"))
+
+_IO_CHUNK = 1 << 20
+_MAX_JSON_BODY = 1 << 20
+_MAX_HEADER = 64 * 1024
+_KEEP_FINISHED = 500
+_SSE_PING_SECONDS = 15.0
+_TERMINAL = (DONE, FAILED, CANCELLED)
+
+_REASONS = {200: "OK", 202: "Accepted", 204: "No Content", 400: "Bad Request", 401: "Unauthorized",
+            403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed", 411: "Length Required", 413: "Payload Too Large",
+            500: "Internal Server Error"}
+
+
+# Bağlantı görevine özel: yanıtın CORS başlığı isteğin Origin'ine göre yazılır
+_request_origin: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_origin", default=None)
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def origin_allowed(origin: Optional[str]) -> bool:
+    """Origin başlığı yoksa (curl, yerel istemci) izinli; varsa listede olmalı."""
+    if origin is None:
+        return True
+    return "*" in CORS_ORIGINS or origin in CORS_ORIGINS
+
+
+def _cors_origin() -> Optional[str]:
+    origin = _request_origin.get()
+    if "*" in CORS_ORIGINS:
+        return "*"
+    return origin if origin in CORS_ORIGINS else None
+
+
+# -------------------------------
+# İş fonksiyonları (işçi thread'inde)
+# -------------------------------
+def _log_span(job, event: Dict[str, Any]) -> None:
+    line = tracing.format_event(event)
+    if line:
+        job.log(line)
+
+
+def _run_pipeline_job(job, path: str, options: Dict[str, Any]):
+    # main.py torch vb. yükler; sunucu açılışını yavaşlatmasın diye ilk işte import edilir
+    import main as local_processor
+    # Aşama süreleri / RTF / bellek iş olayı olarak SSE akışına düşer
+    with tracing.Tracer(f"job-{job.id}", on_event=lambda e: _log_span(job, e)):
+        result = local_processor.run_pipeline(path, lang=options["lang"],
+                                              min_speakers=options["min_speakers"],
+                                              max_speakers=options["max_speakers"],
+                                              on_progress=job.progress)
+    job.check()
+    if result is None:
+        raise RuntimeError("Lokal hat sonuç üretmedi (ayrıntılar sunucu log'unda)")
+    return result
+
+
+def _run_whisper_job(job, path: str, options: Dict[str, Any]):
+    from transcription.whisper import transcribe_file
+    job.progress("whisper", 0)
+    result = transcribe_file(path, lang=options["lang"])
+    job.check()
+    return result
+
+
+JOB_KINDS = {"pipeline": _run_pipeline_job, "whisper": _run_whisper_job}
+
+
+class PipelineServer:
+    """HTTP katmanı + iş zamanlayıcısı köprüsü. Tüm durum event loop thread'inde güncellenir."""
+
+    def __init__(self, scheduler: Optional[JobScheduler] = None, upload_dir: str = UPLOAD_DIR):
+        self.scheduler = scheduler or JobScheduler()
+        self.upload_dir = upload_dir
+        os.makedirs(upload_dir, exist_ok=True)
+        self.started = time.time()
+        self.uploads: Dict[str, Dict[str, Any]] = {}
+        self.jobs: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._handles: Dict[int, Any] = {}
+        self._listeners: Dict[int, set] = {}
+        self.metrics = {"requests_total": 0, "upload_bytes_total": 0, "jobs_submitted_total": 0,
+                        "jobs_coalesced_total": 0, "jobs_done_total": 0, "jobs_failed_total": 0,
+                        "jobs_cancelled_total": 0, "job_seconds_sum": 0.0}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.scheduler.subscribe(self._on_job_event)
+
+    # -------------------------------
+    # Zamanlayıcı olayları -> event loop
+    # -------------------------------
+    def _on_job_event(self, event) -> None:
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._apply_event, event)
+
+    def _apply_event(self, event) -> None:
+        info = self.jobs.get(event.job_id)
+        if info is None:
+            return
+        if event.state in _TERMINAL:
+            info["state"] = event.state
+            info["finished"] = event.time
+            handle = self._handles.pop(event.job_id, None)
+            if event.state == DONE:
+                info["percent"] = 100.0
+                info["eta"] = 0.0
+                info["result"] = handle.future.result() if handle is not None else None
+                self.metrics["jobs_done_total"] += 1
+            elif event.state == FAILED:
+                info["error"] = str(event.error)
+                self.metrics["jobs_failed_total"] += 1
+            else:
+                self.metrics["jobs_cancelled_total"] += 1
+            if info.get("started"):
+                self.metrics["job_seconds_sum"] += event.time - info["started"]
+            self._release_uploads(info)
+            self._trim_finished()
+        else:
+            if event.state == "running" and info["started"] is None:
+                info["started"] = event.time
+            info["state"] = event.state
+            if event.stage is not None:
+                info["stage"] = event.stage
+                info["percent"] = event.percent
+                info["eta"] = event.eta
+        payload = self._public(info, with_result=False)
+        for q in list(self._listeners.get(event.job_id, ())):
+            q.put_nowait(payload)
+
+    def _trim_finished(self) -> None:
+        finished = [jid for jid, info in self.jobs.items() if info["state"] in _TERMINAL]
+        for jid in finished[:max(0, len(finished) - _KEEP_FINISHED)]:
+            self.jobs.pop(jid, None)
+
+    def _release_uploads(self, info: Dict[str, Any]) -> None:
+        """İş bitti: bu işe bağlı son iş olan yüklemelerin dosyası ve kaydı silinir."""
+        for upload_id in info.get("uploads", ()):
+            upload = self.uploads.get(upload_id)
+            if upload is None:
+                continue
+            upload["jobs"].discard(info["id"])
+            if not upload["jobs"]:
+                self._drop_upload(upload_id)
+
+    def _drop_upload(self, upload_id: str) -> None:
+        upload = self.uploads.pop(upload_id, None)
+        if upload is None:
+            return
+        try:
+            os.unlink(upload["path"])
+        except OSError:
+            pass
+
+    def _purge_stale_uploads(self) -> None:
+        """Hiç iş bağlanmadan SERVER_UPLOAD_TTL'i geçen yüklemeler."""
+        cutoff = time.time() - UPLOAD_TTL_SECONDS
+        for upload_id, upload in list(self.uploads.items()):
+            if not upload["jobs"] and upload["created"] < cutoff:
+                self._drop_upload(upload_id)
+
+    @staticmethod
+    def _public(info: Dict[str, Any], with_result: bool = True) -> Dict[str, Any]:
+        out = {k: v for k, v in info.items() if k not in ("result", "tokens", "uploads")}
+        if with_result and info.get("result") is not None:
+            out["result"] = info["result"]
+        return out
+
+    # -------------------------------
+    # HTTP
+    # -------------------------------
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._send_json(writer, 400, {"error": "Başlık çok büyük"}, keep_alive=False)
+                    break
+                self.metrics["requests_total"] += 1
+                keep_alive = False
+                try:
+                    # Hatalı istek satırı da 4xx yanıtı alsın (bağlantı sessizce kapanmasın)
+                    method, target, headers = self._parse_head(head)
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                    origin = headers.get("origin")
+                    _request_origin.set(origin)
+                    if not origin_allowed(origin):
+                        # Basit (preflight'sız) çapraz origin POST'lar da burada durur
+                        raise HTTPError(403, "Origin izinli değil")
+                    keep_alive = await self._dispatch(method, target, headers, reader, writer) and keep_alive
+                except HTTPError as e:
+                    # Okunmamış gövde kalmış olabilir; bağlantı kapatılır
+                    await self._send_json(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    keep_alive = False
+                except Exception as e:
+                    await self._send_json(writer, 500, {"error": str(e)}, keep_alive=False)
+                    keep_alive = False
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @staticmethod
+    def _parse_head(head: bytes) -> Tuple[str, str, Dict[str, str]]:
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Geçersiz istek satırı")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        return method.upper(), target, headers
+
+    async def _dispatch(self, method, target, headers, reader, writer) -> bool:
+        url = urlsplit(target)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        parts = [p for p in url.path.split("/") if p]
+
+        if method == "OPTIONS":
+            await self._send(writer, 204, b"", None)
+            return True
+        if parts == ["health"] and method == "GET":
+            return await self._send_json(writer, 200, self._health())
+        if parts == ["metrics"] and method == "GET":
+            await self._send(writer, 200, self._metrics_text().encode("utf-8"), "text/plain; version=0.0.4")
+            return True
+        if parts == ["uploads"] and method == "POST":
+            return await self._send_json(writer, 200, await self._receive_upload(query, headers, reader))
+        if parts == ["jobs"] and method == "POST":
+            body = await self._read_json(headers, reader)
+            return await self._send_json(writer, 202, self._submit_job(body))
+        if parts == ["jobs"] and method == "GET":
+            token = self._token(headers, query)
+            mine = [self._public(i, False) for i in self.jobs.values() if token and self._owns(i, token)]
+            return await self._send_json(writer, 200, {"jobs": mine})
+        if len(parts) >= 2 and parts[0] == "jobs":
+            info = self.jobs.get(int(parts[1])) if parts[1].isdigit() else None
+            token = self._token(headers, query)
+            # Token'ı tutmayan iş için de 404: başka istemcilerin işlerinin varlığı sızmasın
+            if info is None or not token or not self._owns(info, token):
+                raise HTTPError(404, "İş bulunamadı")
+            if len(parts) == 2 and method == "GET":
+                return await self._send_json(writer, 200, self._public(info))
+            if len(parts) == 2 and method == "DELETE":
+                self.scheduler.cancel(info["id"])
+                return await self._send_json(writer, 202, {"id": info["id"], "cancel_requested": True})
+            if parts[2:] == ["events"] and method == "GET":
+                await self._stream_events(info, writer)
+                return False
+        raise HTTPError(404 if method in ("GET", "POST", "DELETE") else 405, "Bilinmeyen uç nokta")
+
+    @staticmethod
+    def _token(headers: Dict[str, str], query: Dict[str, str]) -> Optional[str]:
+        # EventSource başlık gönderemez; onun için ?token=
+        return headers.get("x-job-token") or query.get("token")
+
+    @staticmethod
+    def _owns(info: Dict[str, Any], token: str) -> bool:
+        return any(hmac.compare_digest(token, t) for t in info["tokens"])
+
+    # -------------------------------
+    # Yanıtlar
+    # -------------------------------
+    async def _send(self, writer, status: int, body: bytes, content_type: Optional[str],
+                    keep_alive: bool = True, extra: Optional[Dict[str, str]] = None) -> None:
+        lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+                 f"Content-Length: {len(body)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines += self._cors_lines()
+        if content_type:
+            lines.append(f"Content-Type: {content_type}")
+        for name, value in (extra or {}).items():
+            lines.append(f"{name}: {value}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    @staticmethod
+    def _cors_lines():
+        origin = _cors_origin()
+        if origin is None:
+            return ["Vary: Origin"]
+        return [f"Access-Control-Allow-Origin: {origin}",
+                "Access-Control-Allow-Methods: GET, POST, DELETE, OPTIONS",
+                "Access-Control-Allow-Headers: Content-Type, X-Filename, X-Job-Token",
+                "Vary: Origin"]
+
+    async def _send_json(self, writer, status: int, payload: Any, keep_alive: bool = True) -> bool:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        await self._send(writer, status, body, "application/json; charset=utf-8", keep_alive)
+        return keep_alive
+
+    # -------------------------------
+    # Gövde okuma
+    # -------------------------------
+    async def _iter_body(self, headers, reader, limit: int):
+        """Gövdeyi parça parça verir (Content-Length ya da chunked)."""
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            total = 0
+            while True:
+                size_line = await reader.readuntil(b"\r\n")
+                size = int(size_line.split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    await reader.readuntil(b"\r\n")   # (trailer yok varsayılır) son CRLF
+                    return
+                total += size
+                if total > limit:
+                    raise HTTPError(413, "Gövde çok büyük")
+                remaining = size
+                while remaining:
+                    chunk = await reader.read(min(_IO_CHUNK, remaining))
+                    if not chunk:
+                        raise HTTPError(400, "Bağlantı gövde ortasında kapandı")
+                    remaining -= len(chunk)
+                    yield chunk
+                await reader.readexactly(2)
+        if "content-length" not in headers:
+            raise HTTPError(411, "Content-Length ya da chunked gövde gerekli")
+        remaining = int(headers["content-length"])
+        if remaining > limit:
+            raise HTTPError(413, "Gövde çok büyük")
+        while remaining:
+            chunk = await reader.read(min(_IO_CHUNK, remaining))
+            if not chunk:
+                raise HTTPError(400, "Bağlantı gövde ortasında kapandı")
+            remaining -= len(chunk)
+            yield chunk
+
+    async def _read_json(self, headers, reader) -> Dict[str, Any]:
+        data = b"".join([chunk async for chunk in self._iter_body(headers, reader, _MAX_JSON_BODY)])
+        try:
+            body = json.loads(data or b"{}")
+        except ValueError:
+            raise HTTPError(400, "Geçersiz JSON")
+        if not isinstance(body, dict):
+            raise HTTPError(400, "JSON nesnesi bekleniyor")
+        return body
+
+    async def _receive_upload(self, query, headers, reader) -> Dict[str, Any]:
+        """Gövdeyi belleğe almadan diske yazar; yazma işlemleri event loop'u bloklamaz."""
+        self._purge_stale_uploads()
+        name = os.path.basename(query.get("name") or headers.get("x-filename") or "upload.wav")
+        upload_id = uuid.uuid4().hex
+        ext = os.path.splitext(name)[1].lower() or ".wav"
+        path = os.path.join(self.upload_dir, upload_id + ext)
+        loop = asyncio.get_running_loop()
+        digest = hashlib.sha256()
+        size = 0
+        f = await loop.run_in_executor(None, open, path + ".part", "wb")
+        try:
+            async for chunk in self._iter_body(headers, reader, MAX_UPLOAD_BYTES):
+                digest.update(chunk)
+                size += len(chunk)
+                await loop.run_in_executor(None, f.write, chunk)
+        except BaseException:
+            f.close()
+            os.unlink(path + ".part")
+            raise
+        f.close()
+        os.replace(path + ".part", path)
+        self.metrics["upload_bytes_total"] += size
+        info = {"upload_id": upload_id, "token": secrets.token_urlsafe(24), "name": name, "bytes": size,
+                "sha256": digest.hexdigest(), "path": path, "created": time.time(), "jobs": set()}
+        self.uploads[upload_id] = info
+        return {k: v for k, v in info.items() if k not in ("path", "created", "jobs")}
+
+    # -------------------------------
+    # İşler
+    # -------------------------------
+    def _submit_job(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        upload = self.uploads.get(str(body.get("upload_id", "")))
+        if upload is None:
+            raise HTTPError(400, "Geçersiz upload_id")
+        token = str(body.get("token") or "")
+        if not hmac.compare_digest(token, upload["token"]):
+            raise HTTPError(401, "Geçersiz token")
+        kind = body.get("kind", "pipeline")
+        if kind not in JOB_KINDS:
+            raise HTTPError(400, f"Bilinmeyen iş türü: {kind}")
+        options = {"lang": body.get("lang", "tr"),
+                   "min_speakers": int(body.get("min_speakers", 1)),
+                   "max_speakers": int(body.get("max_speakers", 3))}
+        # Aynı içerik + aynı ayarlar -> tek iş (farklı kullanıcılardan gelse bile)
+        key = f"{upload['sha256']}:{kind}:{json.dumps(options, sort_keys=True)}"
+        fn = JOB_KINDS[kind]
+        path = upload["path"]
+        job = self.scheduler.submit("local", lambda job: fn(job, path, options), key=key,
+                                    title=f"{kind}: {upload['name']}")
+        self.metrics["jobs_submitted_total"] += 1
+        upload["jobs"].add(job.id)
+        if job.id in self.jobs:
+            # Birleşen istemci de kendi token'ıyla bu işi okuyabilir; yüklemesi iş bitince silinir
+            info = self.jobs[job.id]
+            info["tokens"].add(token)
+            if upload["upload_id"] not in info["uploads"]:
+                info["uploads"].append(upload["upload_id"])
+            self.metrics["jobs_coalesced_total"] += 1
+            return dict(self._public(info, False), coalesced=True)
+        info = {"id": job.id, "kind": kind, "upload_id": upload["upload_id"], "name": upload["name"],
+                "options": options, "state": job.state, "stage": None, "percent": 0.0, "eta": None,
+                "created": time.time(), "started": None, "finished": None, "error": None,
+                "tokens": {token}, "uploads": [upload["upload_id"]]}
+        self.jobs[job.id] = info
+        self._handles[job.id] = job
+        return dict(self._public(info, False), coalesced=False)
+
+    async def _stream_events(self, info: Dict[str, Any], writer) -> None:
+        head = "\r\n".join(["HTTP/1.1 200 OK", "Content-Type: text/event-stream", "Cache-Control: no-cache",
+                            "Connection: close", *self._cors_lines()]) + "\r\n\r\n"
+        writer.write(head.encode("latin-1"))
+        q: asyncio.Queue = asyncio.Queue()
+        self._listeners.setdefault(info["id"], set()).add(q)
+        try:
+            payload = self._public(info, with_result=False)
+            while True:
+                writer.write(f"event: {payload['state']}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+                             .encode("utf-8"))
+                await writer.drain()
+                if payload["state"] in _TERMINAL:
+                    break
+                try:
+                    payload = await asyncio.wait_for(q.get(), timeout=_SSE_PING_SECONDS)
+                except asyncio.TimeoutError:
+                    writer.write(b": ping\n\n")
+                    await writer.drain()
+                    payload = self._public(info, with_result=False)
+        except ConnectionError:
+            pass
+        finally:
+            listeners = self._listeners.get(info["id"])
+            if listeners is not None:
+                listeners.discard(q)
+                if not listeners:
+                    del self._listeners[info["id"]]
+
+    # -------------------------------
+    # Sağlık / metrikler
+    # -------------------------------
+    def _loaded_models(self):
+        models = sys.modules.get("transcription.models")
+        if models is None:
+            return [], 0.0
+        return [list(key[:4]) for key in models.REGISTRY.loaded()], models.REGISTRY.used_mb()
+
+    def _health(self) -> Dict[str, Any]:
+        loaded, used_mb = self._loaded_models()
+        return {"status": "ok", "uptime": round(time.time() - self.started, 1),
+                "models": loaded, "model_memory_mb": round(used_mb, 1),
+                "queued": sum(1 for j in self.jobs.values() if j["state"] == "queued"),
+                "running": sum(1 for j in self.jobs.values() if j["state"] == "running")}
+
+    def _metrics_text(self) -> str:
+        lines = []
+        for name, value in self.metrics.items():
+            lines.append(f"asistan_{name} {value}")
+        states: Dict[str, int] = {}
+        for info in self.jobs.values():
+            states[info["state"]] = states.get(info["state"], 0) + 1
+        for state in ("queued", "running", DONE, FAILED, CANCELLED):
+            lines.append(f'asistan_jobs{{state="{state}"}} {states.get(state, 0)}')
+        loaded, used_mb = self._loaded_models()
+        lines.append(f"asistan_models_loaded {len(loaded)}")
+        lines.append(f"asistan_model_memory_mb {used_mb:.1f}")
+        lines.append(f"asistan_uptime_seconds {time.time() - self.started:.1f}")
+        return "\n".join(lines) + "\n"
+
+    # -------------------------------
+    # Çalıştırma
+    # -------------------------------
+    async def serve(self, host: str, port: int) -> None:
+        self.loop = asyncio.get_running_loop()
+        server = await asyncio.start_server(self.handle_connection, host, port, limit=_MAX_HEADER)
+        addrs = ", ".join(str(s.getsockname()) for s in server.sockets)
+        print(f"🌐 Sunucu dinliyor: {addrs}")
+        async with server:
+            await server.serve_forever()
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Akıllı Not Asistanı yerel HTTP servisi")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="İş havuzu boyutu (varsayılan: JOB_WORKERS ya da tür sınırlarının toplamı)")
+    parser.add_argument("--max-local", type=int, default=None,
+                        help="Aynı anda çalışan lokal (GPU/CPU) iş sayısı (varsayılan: JOB_LIMIT_LOCAL)")
+    parser.add_argument("--prewarm", action="store_true", help="Modelleri açılışta arka planda yükle")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    scheduler_kwargs = {}
+    if args.workers:
+        scheduler_kwargs["workers"] = args.workers
+    if args.max_local:
+        scheduler_kwargs["limits"] = {"local": args.max_local}
+    server = PipelineServer(JobScheduler(**scheduler_kwargs))
+    if args.prewarm:
+        import main as local_processor
+        local_processor.prewarm_models(
+            on_done=lambda e: print(f"⚠️ Modeller yüklenemedi: {e}" if e else "🧠 Modeller hazır."))
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.scheduler.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    main()
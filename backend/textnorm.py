@@ -0,0 +1,23 @@
+"""
+Arama için metin katlama (case + aksan), Türkçe "İ/ı" dahil.
+
+`str.lower()` Türkçe için yanlıştır: "İ".lower() == "i̇" (i + U+0307 birleşik
+nokta) olur ve `\\w+` kelimeyi "i" ile "stanbul" diye böler. `fold_text` metni
+NFKD'ye açar, birleşik işaretleri atar ve casefold uygular; böylece
+"İstanbul", "ISTANBUL" ve "istanbul" aynı terime düşer. Sonuç SQLite FTS5
+`unicode61 remove_diacritics 2` tokenizer'ının indekse yazdığıyla aynıdır
+("Güneş" -> "gunes"; "ı" ayrı harf olarak kalır).
+
+Modül olarak:
+    from textnorm import fold_text
+    fold_text("İstanbul'da Görüşme")   # "istanbul'da gorusme"
+"""
+
+import unicodedata
+
+
+def fold_text(text: str) -> str:
+    """Küçük harf + aksansız biçim (sorgu ve indekslenen metin için ortak)."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return stripped.casefold()
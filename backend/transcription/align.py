@@ -0,0 +1,116 @@
+"""
+Kelime ↔ konuşmacı eşleştirme (stage-3 birleştirme).
+
+Whisper kelimelerini diarization turn'leriyle eşleştirir. Eski döngü her kelime
+için tüm turn'leri tarıyordu (O(kelime × turn)); burada turn'ler bir kez
+sıralanır ve kelimeler zaman sırasıyla süpürülür (sweep-line). Her kelime için
+yalnızca o an açık olan turn'lere bakılır, toplam maliyet ~O((kelime + turn) log turn).
+
+Modül olarak:
+    from transcription.align import align_words, render_transcript
+    groups = align_words(words, turns)
+    text = render_transcript(groups)
+"""
+
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+UNKNOWN_SPEAKER = "Bilinmiyor"
+
+# (start, end, speaker)
+Turn = Tuple[float, float, str]
+
+
+def assign_speakers(words: Sequence[Dict[str, Any]],
+                    turns: Iterable[Turn],
+                    unknown: str = UNKNOWN_SPEAKER) -> List[str]:
+    """
+    Her kelimeye en çok örtüşen turn'ün konuşmacısını atar.
+
+    words: [{"start": .., "end": .., "word": ..}, ...] (transcribe_file şekli)
+    turns: [(start, end, speaker), ...] (pyannote itertracks sırası)
+
+    Eşitlikte eski döngüdeki gibi turn listesinde önce gelen kazanır;
+    hiç örtüşme yoksa `unknown` döner.
+    """
+    # Orijinal sıra eşitlik bozmak için saklanır
+    indexed = sorted(
+        ((float(s), float(e), spk, i) for i, (s, e, spk) in enumerate(turns)),
+        key=lambda t: t[0],
+    )
+    order = sorted(range(len(words)), key=lambda i: words[i]["start"])
+
+    speakers = [unknown] * len(words)
+    active: List[Tuple[float, float, str, int]] = []
+    next_turn = 0
+
+    for wi in order:
+        w_start = words[wi]["start"]
+        w_end = words[wi]["end"]
+
+        # Kelime bitmeden başlayan turn'leri aç
+        while next_turn < len(indexed) and indexed[next_turn][0] < w_end:
+            active.append(indexed[next_turn])
+            next_turn += 1
+
+        # Bu kelimeden önce biten turn'ler sonraki kelimeler için de kapalıdır
+        if active:
+            active = [t for t in active if t[1] > w_start]
+
+        best_speaker = unknown
+        best_overlap = 0.0
+        best_index = -1
+        for t_start, t_end, spk, idx in active:
+            overlap = min(w_end, t_end) - max(w_start, t_start)
+            if overlap <= 0:
+                continue
+            if overlap > best_overlap or (overlap == best_overlap and idx < best_index):
+                best_overlap = overlap
+                best_speaker = spk
+                best_index = idx
+        speakers[wi] = best_speaker
+
+    return speakers
+
+
+def group_by_speaker(words: Sequence[Dict[str, Any]],
+                     speakers: Sequence[str]) -> List[Dict[str, Any]]:
+    """
+    Ardışık aynı konuşmacılı kelimeleri tek satırda toplar.
+
+    Dönen şekil:
+    [{"speaker": "SPEAKER_00", "start": 0.53, "end": 2.10, "text": "...", "word_count": 5}, ...]
+    """
+    groups: List[Dict[str, Any]] = []
+    current = None
+
+    for word, speaker in zip(words, speakers):
+        text = (word["word"] or "").strip()
+        if current is not None and speaker == current["speaker"]:
+            current["_words"].append(text)
+            current["end"] = word["end"]
+            continue
+        current = {"speaker": speaker, "start": word["start"], "end": word["end"], "_words": [text]}
+        groups.append(current)
+
+    for g in groups:
+        texts = g.pop("_words")
+        g["text"] = " ".join(texts)
+        g["word_count"] = len(texts)
+    return groups
+
+
+def align_words(words: Sequence[Dict[str, Any]],
+                turns: Iterable[Turn],
+                unknown: str = UNKNOWN_SPEAKER) -> List[Dict[str, Any]]:
+    """assign_speakers + group_by_speaker kısayolu."""
+    return group_by_speaker(words, assign_speakers(words, turns, unknown))
+
+
+def render_transcript(groups: Iterable[Dict[str, Any]]) -> str:
+    """Grupları `[12.34s] SPEAKER_00: ...` satırlarına çevirir (sondaki \\n dahil)."""
+    return "".join(f"[{g['start']:.2f}s] {g['speaker']}: {g['text']}\n" for g in groups)
+
+
+def flatten_words(segments: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """transcribe_file segmentlerinden düz kelime listesi çıkarır."""
+    return [w for s in segments for w in (s.get("words") or [])]
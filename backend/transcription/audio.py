@@ -0,0 +1,208 @@
+"""
+Ortak ses çözme katmanı.
+
+Her dosya bir kez, bellekte 16 kHz mono float32 NumPy dizisine çözülür ve
+aynı tampon hem Whisper'a hem diarization'a verilir; geçici WAV yazılmaz.
+
+  - PCM WAV dosyaları alt süreç açmadan `wave` ile okunur ve süreç içinde
+    yeniden örneklenir (hızlı yol).
+  - Diğer formatlar ffmpeg'in stdout'undan pipe ile doğrudan tampona akar.
+  - ffmpeg yoksa / hata verirse pydub denenir.
+
+Ters yönde `encode_audio`, bir tamponu yüklemeye uygun küçük bir dosyaya
+(ffmpeg ile düşük bit hızlı mp3; ffmpeg yoksa 16 bit WAV) sıkıştırır.
+
+Modül olarak:
+    from transcription.audio import load_audio
+    audio = load_audio("toplanti.mp3")      # np.float32, 16 kHz mono
+"""
+
+import io
+import math
+import shutil
+import subprocess
+import wave
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    from scipy.signal import resample_poly  # type: ignore
+    _HAS_SCIPY = True
+except Exception:
+    _HAS_SCIPY = False
+
+try:
+    from pydub import AudioSegment  # type: ignore
+    _HAS_PYDUB = True
+except Exception:
+    _HAS_PYDUB = False
+
+
+SAMPLE_RATE = 16000
+_PIPE_CHUNK = 1 << 20  # ffmpeg stdout okuma bloğu (1 MB)
+
+
+def resample(audio: np.ndarray, orig_sr: int, target_sr: int = SAMPLE_RATE) -> np.ndarray:
+    """Mono float32 sinyali yeniden örnekler (scipy varsa polyphase, yoksa lineer)."""
+    if orig_sr == target_sr or audio.size == 0:
+        return audio.astype(np.float32, copy=False)
+    if _HAS_SCIPY:
+        g = math.gcd(orig_sr, target_sr)
+        out = resample_poly(audio, target_sr // g, orig_sr // g)
+        return out.astype(np.float32, copy=False)
+    n_out = int(round(audio.size * target_sr / orig_sr))
+    x_out = np.arange(n_out, dtype=np.float64) * (orig_sr / target_sr)
+    return np.interp(x_out, np.arange(audio.size), audio).astype(np.float32)
+
+
+def frame_rms(audio: np.ndarray, hop: int, block_frames: int = 1 << 14) -> np.ndarray:
+    """
+    Ardışık hop'luk çerçevelerin RMS'i. Bloklar halinde hesaplanır; bellek
+    eşlemeli uzun kayıtlarda tüm sesin kopyası oluşmaz.
+    """
+    n = audio.size // hop
+    rms = np.empty(n, dtype=np.float32)
+    for i in range(0, n, block_frames):
+        j = min(n, i + block_frames)
+        frames = np.asarray(audio[i * hop:j * hop], dtype=np.float32).reshape(j - i, hop)
+        rms[i:j] = np.sqrt(np.mean(np.square(frames), axis=1))
+    return rms
+
+
+def pcm_to_float32(raw: bytes, sample_width: int, channels: int) -> np.ndarray:
+    """Ham PCM baytlarını [-1, 1] aralığında mono float32'ye çevirir."""
+    if sample_width == 1:
+        data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        data = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        ints = np.where(ints & 0x800000, ints - (1 << 24), ints)
+        data = ints.astype(np.float32) / float(1 << 23)
+    elif sample_width == 4:
+        data = np.frombuffer(raw, dtype="<i4").astype(np.float32) / float(1 << 31)
+    else:
+        raise ValueError(f"Desteklenmeyen örnek genişliği: {sample_width}")
+
+    if channels > 1:
+        data = data.reshape(-1, channels).mean(axis=1)
+    return data
+
+
+def _read_pcm_wav(path: str) -> Optional[Tuple[np.ndarray, int]]:
+    """PCM WAV ise (mono float32, örnekleme hızı); değilse None."""
+    try:
+        with wave.open(path, "rb") as wf:
+            rate = wf.getframerate()
+            raw = wf.readframes(wf.getnframes())
+            return pcm_to_float32(raw, wf.getsampwidth(), wf.getnchannels()), rate
+    except (wave.Error, EOFError, ValueError):
+        # float WAV, WAVE_FORMAT_EXTENSIBLE ya da WAV değil -> ffmpeg'e bırak
+        return None
+
+
+def _decode_with_ffmpeg(src_path: str, sr: int) -> np.ndarray:
+    """ffmpeg çıktısını (f32le, mono, sr) pipe'tan okuyup diziye çevirir; disk kullanılmaz."""
+    cmd = [
+        shutil.which("ffmpeg"),
+        "-nostdin",
+        "-v", "error",
+        "-i", src_path,
+        "-ac", "1",          # mono
+        "-ar", str(sr),      # 16 kHz
+        "-f", "f32le",       # ham float32
+        "-",
+    ]
+    buf = bytearray()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            chunk = proc.stdout.read(_PIPE_CHUNK)
+            if not chunk:
+                break
+            buf += chunk
+        stderr = proc.stderr.read()
+    finally:
+        proc.wait()
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg dönüştürme hatası: {stderr.decode(errors='ignore')}")
+
+    usable = len(buf) - len(buf) % 4
+    return np.frombuffer(buf, dtype=np.float32, count=usable // 4)
+
+
+def _decode_with_pydub(src_path: str, sr: int) -> np.ndarray:
+    """pydub ile çöz (ffmpeg/avlib arka planda gerekebilir)."""
+    try:
+        seg = AudioSegment.from_file(src_path).set_channels(1).set_frame_rate(sr)
+        return pcm_to_float32(seg.raw_data, seg.sample_width, 1)
+    except Exception as e:
+        raise RuntimeError(
+            f"pydub dönüştürme hatası: {e}\n"
+            "ffmpeg kurulu değilse pydub bazı formatlarda sorun yaşayabilir. "
+            "Öneri: ffmpeg kurun."
+        )
+
+
+def load_audio(src_path: str, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Dosyayı mono float32 diziye çözer (varsayılan 16 kHz).
+    Sıra: PCM WAV hızlı yolu -> ffmpeg pipe -> pydub.
+    """
+    wav = _read_pcm_wav(src_path)
+    if wav is not None:
+        data, rate = wav
+        return resample(data, rate, sr)
+
+    if shutil.which("ffmpeg"):
+        try:
+            return _decode_with_ffmpeg(src_path, sr)
+        except RuntimeError:
+            # ffmpeg hata verirse pydub ile dene
+            if not _HAS_PYDUB:
+                raise
+    if _HAS_PYDUB:
+        return _decode_with_pydub(src_path, sr)
+
+    # İki seçenek de yoksa vaziyet
+    raise RuntimeError(
+        "Ne ffmpeg bulundu ne de pydub kullanılabilir. "
+        "Lütfen ffmpeg kurun (macOS: brew install ffmpeg, Ubuntu: apt install ffmpeg) "
+        "veya 'pip install pydub' yapın."
+    )
+
+
+def _encode_wav(audio: np.ndarray, sr: int) -> bytes:
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767.0).astype("<i2")
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sr)
+        w.writeframes(pcm.tobytes())
+    return buf.getvalue()
+
+
+def encode_audio(audio: np.ndarray, sr: int = SAMPLE_RATE, bitrate: str = "32k") -> Tuple[bytes, str]:
+    """
+    Mono float32 tamponu bellekte sıkıştırır -> (veri, "mp3" | "wav").
+    Konuşma için 16 kHz mono 32 kbps mp3 yeterlidir (44.1 kHz stereo WAV'ın ~1/40'ı).
+    """
+    if shutil.which("ffmpeg"):
+        cmd = [
+            shutil.which("ffmpeg"),
+            "-nostdin",
+            "-v", "error",
+            "-f", "f32le", "-ar", str(sr), "-ac", "1", "-i", "-",
+            "-c:a", "libmp3lame", "-b:a", bitrate,
+            "-f", "mp3",
+            "-",
+        ]
+        proc = subprocess.run(cmd, input=np.ascontiguousarray(audio, dtype=np.float32).tobytes(),
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if proc.returncode == 0 and proc.stdout:
+            return proc.stdout, "mp3"
+    # ffmpeg yoksa (ya da mp3 kodlayıcısı yoksa) 16 kHz 16 bit WAV
+    return _encode_wav(audio, sr), "wav"
@@ -0,0 +1,342 @@
+"""
+Bellek eşlemeli (mmap), pencereli ses kaynağı.
+
+Saatlerce süren kayıtlar bütünüyle belleğe çözülmez. PCM / float WAV
+dosyaları `np.memmap` ile açılır; istenen zaman penceresi diskten işletim
+sisteminin sayfa önbelleği üzerinden okunur. Tepe bellek kayıt süresine değil,
+okunan pencerenin boyuna bağlıdır.
+
+  - 16 kHz mono float32 WAV: pencereler kopyasız görünümdür (zero-copy).
+  - 16 kHz PCM WAV (ör. Recorder'ın int16 çıktısı): doğrudan eşlenir, yalnızca
+    okunan pencere float32'ye çevrilir. `samples()` tüm sesi dizi olarak
+    isterse dosya bir kez, bloklar halinde float32 önbelleğe çevrilir.
+  - Diğer her şey (mp3/ogg/m4a, farklı hız): ffmpeg ile bir kez doğrudan
+    diskteki 16 kHz float32 WAV önbelleğine çözülür (pipe / RAM yok) ve o
+    dosya eşlenir. Önbellek anahtarı dosya içeriğinin özetidir; aynı kayıt
+    ikinci kez çözülmez. ffmpeg yoksa load_audio ile (bellekte) çözülüp yazılır.
+
+Kaynak pickle edilebilir: süreç havuzuna yalnızca yol + düzen bilgisi gider,
+işçi pencereyi kendi eşlemesinden okur.
+
+Modül olarak:
+    from transcription.audio_source import open_audio
+    source = open_audio("toplanti.mp3")
+    window = source.window(3600.0, 3630.0)    # np.float32, 30 sn
+    audio = source.samples()                  # tüm ses, np.memmap (kopyasız)
+    compact = derive(source, "etiket", blocks)    # türetilmiş ses (ör. VAD), yine eşlemeli
+
+Ortam değişkenleri:
+    AUDIO_CACHE_DIR         Çözülmüş WAV klasörü (varsayılan: önbellek klasörü/audio)
+    AUDIO_CACHE_MAX_MB      Boyut sınırı; aşılınca en eski dosyalar silinir (varsayılan 8192)
+"""
+
+import os
+import shutil
+import struct
+import subprocess
+import threading
+from typing import Callable, Dict, Iterator, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from transcription.audio import SAMPLE_RATE, load_audio
+from transcription.cache import CACHE_DIR, get_cache
+
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", os.path.join(CACHE_DIR, "audio"))
+AUDIO_CACHE_MAX_BYTES = int(float(os.getenv("AUDIO_CACHE_MAX_MB", "8192")) * 1024 * 1024)
+
+# Önbelleğe çevirirken bir seferde işlenen örnek sayısı (~4 MB float32)
+_BLOCK_FRAMES = 1 << 20
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_FLOAT = 0x0003
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# (format, bit) -> numpy dtype; 24 bit eşlenemez, önbelleğe çevrilir
+_DTYPES = {
+    (_WAVE_FORMAT_PCM, 8): np.dtype(np.uint8),
+    (_WAVE_FORMAT_PCM, 16): np.dtype("<i2"),
+    (_WAVE_FORMAT_PCM, 32): np.dtype("<i4"),
+    (_WAVE_FORMAT_FLOAT, 32): np.dtype("<f4"),
+    (_WAVE_FORMAT_FLOAT, 64): np.dtype("<f8"),
+}
+
+# Önbellek yolu başına kilit: aynı dosya iki kez çözülmez, farklı dosyalar birbirini beklemez
+_convert_locks: Dict[str, threading.Lock] = {}
+_convert_locks_guard = threading.Lock()
+
+
+class WavLayout(NamedTuple):
+    """Ham örneklerin dosyadaki yeri."""
+    offset: int
+    frames: int
+    dtype: str
+    channels: int
+    sr: int
+
+
+def read_wav_layout(path: str) -> Optional[WavLayout]:
+    """RIFF başlığını okur; eşlenebilir bir WAV değilse None."""
+    try:
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            riff = f.read(12)
+            if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+                return None
+            fmt = None
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    return None
+                chunk_id, chunk_size = header[:4], struct.unpack("<I", header[4:])[0]
+                if chunk_id == b"fmt ":
+                    body = f.read(chunk_size)
+                    tag, channels, sr, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+                    if tag == _WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                        tag = struct.unpack("<H", body[24:26])[0]
+                    fmt = (tag, channels, sr, bits)
+                elif chunk_id == b"data":
+                    if fmt is None or (fmt[0], fmt[3]) not in _DTYPES:
+                        return None
+                    tag, channels, sr, bits = fmt
+                    dtype = _DTYPES[(tag, bits)]
+                    offset = f.tell()
+                    # Kayıt sürerken / çökmüş kayıtta başlık boyu gerçeği yansıtmayabilir
+                    data_bytes = min(chunk_size, size - offset)
+                    frames = data_bytes // (dtype.itemsize * channels)
+                    return WavLayout(offset, frames, dtype.str, channels, sr)
+                else:
+                    f.seek(chunk_size, os.SEEK_CUR)
+                # RIFF parçaları çift bayta hizalıdır
+                if chunk_size % 2:
+                    f.seek(1, os.SEEK_CUR)
+    except (OSError, struct.error):
+        return None
+
+
+def _to_float32(raw: np.ndarray, dtype: np.dtype) -> np.ndarray:
+    """(n, kanal) ham örnekler -> mono float32 [-1, 1]."""
+    if dtype.kind == "u":
+        data = (raw.astype(np.float32) - 128.0) / 128.0
+    elif dtype.kind == "i":
+        data = raw.astype(np.float32) / float(1 << (8 * dtype.itemsize - 1))
+    else:
+        data = raw.astype(np.float32, copy=False)
+    return data[:, 0] if data.shape[1] == 1 else data.mean(axis=1, dtype=np.float32)
+
+
+class AudioSource:
+    """Bir WAV dosyasının bellek eşlemeli, pencere pencere okunan görünümü."""
+
+    def __init__(self, path: str, layout: WavLayout):
+        self.path = path
+        self.layout = layout
+        self.sr = layout.sr
+        self._dtype = np.dtype(layout.dtype)
+        self._raw: Optional[np.ndarray] = None
+
+    @classmethod
+    def open(cls, path: str) -> "AudioSource":
+        layout = read_wav_layout(path)
+        if layout is None:
+            raise ValueError(f"Eşlenebilir PCM/float WAV değil: {path}")
+        return cls(path, layout)
+
+    # Süreçler arasında yalnızca yol + düzen taşınır; eşleme işçide yeniden açılır
+    def __getstate__(self):
+        return {"path": self.path, "layout": tuple(self.layout)}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], WavLayout(*state["layout"]))
+
+    @property
+    def raw(self) -> np.ndarray:
+        if self._raw is None:
+            if self.layout.frames == 0:
+                self._raw = np.zeros((0, self.layout.channels), dtype=self._dtype)
+            else:
+                self._raw = np.memmap(self.path, dtype=self._dtype, mode="r", offset=self.layout.offset,
+                                      shape=(self.layout.frames, self.layout.channels))
+        return self._raw
+
+    @property
+    def frames(self) -> int:
+        return self.layout.frames
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.sr
+
+    @property
+    def zero_copy(self) -> bool:
+        """Pencereler kopyasız görünüm mü (mono float32)?"""
+        return self.layout.channels == 1 and self._dtype == np.dtype("<f4")
+
+    def read(self, start: int, stop: int) -> np.ndarray:
+        """[start, stop) örnek aralığı -> mono float32 (zero_copy ise salt okunur görünüm)."""
+        start, stop = max(0, start), min(self.frames, stop)
+        raw = self.raw[start:max(start, stop)]
+        if self.zero_copy:
+            return raw[:, 0]
+        return _to_float32(raw, self._dtype)
+
+    def window(self, start: float, end: float) -> np.ndarray:
+        """[start, end) saniye penceresi."""
+        return self.read(int(round(start * self.sr)), int(round(end * self.sr)))
+
+    def windows(self, seconds: float, overlap: float = 0.0) -> Iterator[Tuple[int, np.ndarray]]:
+        """Sırayla (başlangıç_örneği, pencere); ardışık pencereler overlap sn örtüşür."""
+        size = max(1, int(seconds * self.sr))
+        hop = max(1, size - int(overlap * self.sr))
+        for start in range(0, max(self.frames, 1), hop):
+            yield start, self.read(start, start + size)
+            if start + size >= self.frames:
+                break
+
+    def samples(self) -> np.ndarray:
+        """
+        Tüm ses, 1-B float32 dizi olarak. Sayfalar okundukça yüklenir ve işletim
+        sistemi gerektiğinde geri alabilir; kopyasız değilse önce önbelleğe çevrilir.
+        """
+        return self.mapped().raw[:, 0]
+
+    def mapped(self) -> "AudioSource":
+        """Kopyasız (mono float32) kaynak: kendisi ya da bir kez çevrilmiş önbellek kopyası."""
+        return self if self.zero_copy else _float_cache(self)
+
+    def close(self) -> None:
+        # Eşleme, dışarıda görünüm kalmadığında kapanır (açıkça kapatmak görünümleri bozar)
+        self._raw = None
+
+    def __enter__(self) -> "AudioSource":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return (f"AudioSource({self.path!r}, {self.duration:.1f} sn, {self.sr} Hz, "
+                f"{self.layout.channels} kanal, {self._dtype.name})")
+
+
+# -------------------------------
+# Çözülmüş WAV önbelleği
+# -------------------------------
+def _float_wav_header(frames: int, sr: int) -> bytes:
+    data_bytes = frames * 4
+    return (b"RIFF" + struct.pack("<I", 36 + data_bytes) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, _WAVE_FORMAT_FLOAT, 1, sr, sr * 4, 4, 32)
+            + b"data" + struct.pack("<I", data_bytes))
+
+
+def _write_float_wav(path: str, blocks: Iterator[np.ndarray], sr: int) -> None:
+    """Blokları mono float32 WAV olarak yazar; başlık sonda düzeltilir."""
+    frames = 0
+    with open(path, "wb") as f:
+        f.write(_float_wav_header(0, sr))
+        for block in blocks:
+            f.write(np.ascontiguousarray(block, dtype="<f4").tobytes())
+            frames += block.size
+        f.seek(0)
+        f.write(_float_wav_header(frames, sr))
+
+
+def _decode_with_ffmpeg(src_path: str, dst_path: str, sr: int) -> None:
+    """ffmpeg doğrudan diske yazar; ses hiçbir zaman bütünüyle belleğe alınmaz."""
+    cmd = [shutil.which("ffmpeg"), "-nostdin", "-v", "error", "-y", "-i", src_path,
+           "-ac", "1", "-ar", str(sr), "-c:a", "pcm_f32le", "-f", "wav", dst_path]
+    proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg dönüştürme hatası: {proc.stderr.decode(errors='ignore')}")
+
+
+def _cache_path(src_path: str, sr: int) -> str:
+    digest = get_cache().file_digest(src_path)
+    return os.path.join(AUDIO_CACHE_DIR, f"{digest[:32]}_{sr}.wav")
+
+
+def _prune(keep: str) -> None:
+    """Boyut sınırı aşıldıysa en eski önbellek dosyalarını siler."""
+    try:
+        # Yazılmakta olan geçici dosyalar (".tmp") başka bir çözmeye aittir, dokunulmaz
+        entries = [e for e in os.scandir(AUDIO_CACHE_DIR) if e.name.endswith(".wav") and ".tmp" not in e.name]
+    except OSError:
+        return
+    entries.sort(key=lambda e: e.stat().st_mtime)
+    total = sum(e.stat().st_size for e in entries)
+    for entry in entries:
+        if total <= AUDIO_CACHE_MAX_BYTES:
+            break
+        if entry.path == keep:
+            continue
+        try:
+            size = entry.stat().st_size
+            os.remove(entry.path)
+            total -= size
+        except OSError:
+            pass
+
+
+def _convert(src_path: str, sr: int, fill) -> AudioSource:
+    """Önbellekte yoksa fill(geçici_yol) ile üretir; her durumda önbellekteki kaynağı döner."""
+    return _materialize(_cache_path(src_path, sr), fill)
+
+
+def _materialize(path: str, fill) -> AudioSource:
+    with _convert_locks_guard:
+        lock = _convert_locks.setdefault(path, threading.Lock())
+    with lock:
+        if not os.path.exists(path):
+            os.makedirs(AUDIO_CACHE_DIR, exist_ok=True)
+            tmp = f"{path}.tmp{os.getpid()}_{threading.get_ident()}.wav"
+            try:
+                fill(tmp)
+                os.replace(tmp, path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            _prune(keep=path)
+        else:
+            # LRU için dokun
+            os.utime(path)
+    return AudioSource.open(path)
+
+
+def _float_cache(source: AudioSource) -> AudioSource:
+    """Eşlenmiş PCM kaynağı bloklar halinde float32 mono önbelleğe çevirir."""
+    def _fill(tmp):
+        blocks = (source.read(i, i + _BLOCK_FRAMES) for i in range(0, source.frames, _BLOCK_FRAMES))
+        _write_float_wav(tmp, blocks, source.sr)
+    return _convert(source.path, source.sr, _fill)
+
+
+def derive(source: AudioSource, tag: str, blocks: Callable[[], Iterator[np.ndarray]]) -> AudioSource:
+    """
+    source'tan türetilen sesi (ör. VAD ile sıkıştırılmış) önbelleğe yazar ve
+    eşlenmiş açar. blocks() float32 bloklar üretir; yazarken bellekte yalnızca
+    bir blok bulunur. tag türetmeyi tanımlar (aynı kaynak + tag bir kez yazılır).
+    """
+    path = _cache_path(source.path, source.sr)[:-len(".wav")] + f"_{tag}.wav"
+    return _materialize(path, lambda tmp: _write_float_wav(tmp, blocks(), source.sr))
+
+
+def open_audio(path: str, sr: int = SAMPLE_RATE) -> AudioSource:
+    """
+    Dosyayı sr Hz mono kaynak olarak açar. sr hızındaki WAV'lar olduğu gibi
+    eşlenir; diğerleri bir kez önbelleğe çözülür.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Ses dosyası bulunamadı: {path}")
+    layout = read_wav_layout(path)
+    if layout is not None and layout.sr == sr:
+        return AudioSource(path, layout)
+
+    def _fill(tmp):
+        if shutil.which("ffmpeg"):
+            try:
+                return _decode_with_ffmpeg(path, tmp, sr)
+            except RuntimeError as e:
+                print(f"⚠️ {e}; bellekte çözülüyor...")
+        # ffmpeg yok: pydub / wave ile bellekte çöz, sonra yaz
+        _write_float_wav(tmp, iter([load_audio(path, sr)]), sr)
+    return _convert(path, sr, _fill)
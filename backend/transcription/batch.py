@@ -0,0 +1,200 @@
+"""
+Klasör / glob üzerinden toplu transkripsiyon.
+
+Tek süreç, tek model: her dosya için yorumlayıcı ve model yeniden
+başlatılmaz. Ses çözme (ffmpeg, GIL dışında) bir thread havuzunda,
+transkripsiyon ayrı bir havuzda aynı modelle (CTranslate2 num_workers)
+yapılır; bir dosya çözülürken önceki dosyalar modelde işlenir. Bellekte
+aynı anda en fazla `prefetch` çözülmüş ses tutulur.
+
+Her dosya bitince çıktı dosyasına bir JSONL satırı yazılır. Aynı çıktı
+dosyasıyla tekrar çalıştırılırsa "ok" durumlu dosyalar atlanır (kaldığı
+yerden devam); hatalılar yeniden denenir.
+
+Kullanım:
+    python transcription/whisper.py batch kayitlar/ "arsiv/**/*.mp3" --out sonuc.jsonl \
+        --decode-workers 2 --infer-workers 2
+
+Modül olarak:
+    from transcription.batch import collect_inputs, run_batch
+    summary = run_batch(collect_inputs(["kayitlar/"]), "sonuc.jsonl")
+"""
+
+import glob
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from transcription.audio import load_audio
+from transcription.cache import CACHE_ENABLED, get_cache, make_key
+from transcription.vad import VAD_ENABLED, vad_params
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".ogg", ".webm", ".flac")
+
+
+def collect_inputs(patterns: Iterable[str], recursive: bool = True) -> List[str]:
+    """Dosya, klasör ve glob desenlerini sıralı, tekrarsız mutlak yol listesine açar."""
+    found: List[str] = []
+    seen: Set[str] = set()
+
+    def add(path: str) -> None:
+        path = os.path.abspath(path)
+        if path not in seen and path.lower().endswith(AUDIO_EXTENSIONS):
+            seen.add(path)
+            found.append(path)
+
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            walker = os.walk(pattern) if recursive else [(pattern, [], os.listdir(pattern))]
+            for root, _, files in walker:
+                for name in sorted(files):
+                    add(os.path.join(root, name))
+        elif os.path.isfile(pattern):
+            add(pattern)
+        else:
+            for path in sorted(glob.glob(pattern, recursive=True)):
+                if os.path.isfile(path):
+                    add(path)
+    return found
+
+
+def load_completed(out_path: str) -> Set[str]:
+    """Çıktı dosyasında başarıyla bitmiş dosya yolları (yarım son satır yok sayılır)."""
+    done: Set[str] = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "ok":
+                done.add(record["path"])
+    return done
+
+
+def _open_output(out_path: str):
+    """Sona ekleme kipinde açar; önceki çalıştırma satır ortasında kesildiyse yeni satırdan başlar."""
+    f = open(out_path, "a+b")
+    if f.tell() > 0:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+    return f
+
+
+def run_batch(paths: List[str], out_path: str, lang: Optional[str] = "tr",
+              model_name: Optional[str] = None, device: Optional[str] = None,
+              compute_type: Optional[str] = None, beam_size: int = 5,
+              decode_workers: int = 2, infer_workers: int = 1, prefetch: Optional[int] = None,
+              use_cache: bool = True, resume: bool = True) -> Dict[str, Any]:
+    """
+    Dosyaları işler, her biri için out_path'e bir JSONL kaydı yazar. Özet döner:
+    {"files", "ok", "failed", "skipped", "audio_seconds", "wall_seconds", "audio_hours_per_hour"}
+    """
+    from transcription import whisper
+
+    model_name = model_name or whisper.DEFAULT_MODEL
+    device = device or whisper.DEFAULT_DEVICE
+    compute_type = compute_type or whisper.DEFAULT_COMPUTE
+    prefetch = prefetch or (decode_workers + infer_workers)
+
+    completed = load_completed(out_path) if resume else set()
+    todo = [p for p in paths if os.path.abspath(p) not in completed]
+    skipped = len(paths) - len(todo)
+    if skipped:
+        print(f"[DEVAM] {skipped} dosya önceki çalıştırmada bitmiş, atlanıyor.", file=sys.stderr)
+
+    # transcribe_file ile aynı önbellek anahtarı: iki yol sonuçları paylaşır
+    params = {"model": model_name, "compute_type": compute_type, "lang": lang, "chunk_seconds": None,
+              "vad": vad_params()}
+    cache = get_cache() if (use_cache and CACHE_ENABLED) else None
+
+    # Modeli işçiler başlamadan, transcribe_audio ile aynı seçeneklerle bir kez yükle
+    whisper.load_model(model_name, device=device, compute_type=compute_type, num_workers=infer_workers)
+
+    slots = threading.BoundedSemaphore(prefetch)
+    records: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+    decode_pool = ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix="decode")
+    infer_pool = ThreadPoolExecutor(max_workers=infer_workers, thread_name_prefix="infer")
+
+    def finish(record: Dict[str, Any]) -> None:
+        slots.release()
+        records.put(record)
+
+    def infer(path: str, key: Optional[str], audio, decode_s: float) -> None:
+        t0 = time.perf_counter()
+        try:
+            result = whisper.transcribe_audio(audio, lang=lang, model_name=model_name, device=device,
+                                              compute_type=compute_type, beam_size=beam_size,
+                                              num_workers=infer_workers, vad=VAD_ENABLED)
+            if key is not None:
+                cache.put(key, "whisper", result)
+        except Exception as e:
+            finish({"path": path, "status": "error", "error": str(e)})
+            return
+        finish({"path": path, "status": "ok", "cached": False,
+                "decode_seconds": round(decode_s, 3),
+                "infer_seconds": round(time.perf_counter() - t0, 3), **result})
+
+    def decode(path: str) -> None:
+        t0 = time.perf_counter()
+        try:
+            key = None
+            if cache is not None:
+                key = make_key("whisper", cache.file_digest(path), params)
+                hit = cache.get(key)
+                if hit is not None:
+                    finish({"path": path, "status": "ok", "cached": True, **hit})
+                    return
+            audio = load_audio(path)
+        except Exception as e:
+            finish({"path": path, "status": "error", "error": str(e)})
+            return
+        infer_pool.submit(infer, path, key, audio, time.perf_counter() - t0)
+
+    def feed() -> None:
+        for path in todo:
+            slots.acquire()   # çözülmüş ses sayısını sınırla
+            decode_pool.submit(decode, path)
+
+    start = time.perf_counter()
+    feeder = threading.Thread(target=feed, name="batch-feed", daemon=True)
+    feeder.start()
+
+    ok = failed = 0
+    audio_seconds = 0.0
+    with _open_output(out_path) as out:
+        for i in range(len(todo)):
+            record = records.get()
+            out.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+            out.flush()
+            if record["status"] == "ok":
+                ok += 1
+                audio_seconds += record.get("duration") or 0.0
+                tag = "önbellek" if record.get("cached") else f"{record.get('infer_seconds', 0):.1f}s"
+                print(f"[{i + 1}/{len(todo)}] OK {os.path.basename(record['path'])} ({tag})", file=sys.stderr)
+            else:
+                failed += 1
+                print(f"[{i + 1}/{len(todo)}] HATA {os.path.basename(record['path'])}: {record['error']}",
+                      file=sys.stderr)
+
+    feeder.join()
+    decode_pool.shutdown()
+    infer_pool.shutdown()
+    wall = time.perf_counter() - start
+    return {
+        "files": len(paths),
+        "ok": ok,
+        "failed": failed,
+        "skipped": skipped,
+        "audio_seconds": round(audio_seconds, 2),
+        "wall_seconds": round(wall, 2),
+        "audio_hours_per_hour": round(audio_seconds / wall, 2) if wall > 0 else 0.0,
+    }
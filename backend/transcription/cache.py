@@ -0,0 +1,160 @@
+"""
+İçerik adresli sonuç önbelleği (SQLite).
+
+Anahtar = ses dosyası içeriğinin akışlı SHA-256 özeti + model parametreleri
+(model adı, compute_type, dil, konuşmacı sınırları...). Aynı kayıt tekrar
+işlenirse transkripsiyon/diarization yeniden yapılmaz, sonuç milisaniyeler
+içinde döner. Dosya özeti (yol, boyut, mtime) ile ayrıca hatırlanır; büyük
+dosyalar her seferinde yeniden okunmaz.
+
+Toplam boyut sınırı aşılınca en uzun süredir kullanılmayan kayıtlar silinir.
+
+Modül olarak:
+    from transcription.cache import cached
+    result = cached("whisper", "kayit.wav", {"model": "small"}, lambda: transcribe(...))
+
+Ortam değişkenleri:
+    TRANSCRIPT_CACHE_DIR     Önbellek klasörü (varsayılan ~/.cache/akilli-not-asistani)
+    TRANSCRIPT_CACHE_MAX_MB  Boyut sınırı (varsayılan 512)
+    TRANSCRIPT_CACHE=0       Önbelleği kapatır
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Optional
+
+CACHE_DIR = os.getenv("TRANSCRIPT_CACHE_DIR",
+                      os.path.join(os.path.expanduser("~"), ".cache", "akilli-not-asistani"))
+CACHE_MAX_BYTES = int(float(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "512")) * 1024 * 1024)
+CACHE_ENABLED = os.getenv("TRANSCRIPT_CACHE", "1") != "0"
+
+_HASH_CHUNK = 1 << 20
+
+
+class ResultCache:
+    """Sıkıştırılmış JSON sonuçlarını ve dosya özetlerini tutan SQLite önbellek."""
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = CACHE_MAX_BYTES):
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, "results.db")
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS results
+                             (key TEXT PRIMARY KEY,
+                              kind TEXT,
+                              value BLOB,
+                              size INTEGER,
+                              last_access REAL)''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_results_access ON results(last_access)")
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS file_hashes
+                             (path TEXT PRIMARY KEY,
+                              size INTEGER,
+                              mtime_ns INTEGER,
+                              digest TEXT)''')
+        self.conn.commit()
+
+    # -------------------------------
+    # Dosya özeti
+    # -------------------------------
+    def file_digest(self, path: str) -> str:
+        """Dosya içeriğinin SHA-256'sı; (yol, boyut, mtime) değişmediyse hatırlanan değer."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        with self._lock:
+            row = self.conn.execute("SELECT size, mtime_ns, digest FROM file_hashes WHERE path=?",
+                                    (path,)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?)",
+                              (path, st.st_size, st.st_mtime_ns, digest))
+            self.conn.commit()
+        return digest
+
+    # -------------------------------
+    # Sonuçlar
+    # -------------------------------
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM results WHERE key=?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE results SET last_access=? WHERE key=?", (time.time(), key))
+            self.conn.commit()
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def put(self, key: str, kind: str, value: Any) -> None:
+        blob = zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"), 6)
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                              (key, kind, blob, len(blob), time.time()))
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self) -> None:
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.conn.execute(
+                "SELECT key, size FROM results ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM results WHERE key=?", (key,))
+            total -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM results")
+            self.conn.commit()
+
+
+def make_key(kind: str, audio_digest: str, params: Dict[str, Any]) -> str:
+    payload = json.dumps({"kind": kind, "audio": audio_digest, "params": params},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+_default: Optional[ResultCache] = None
+_default_lock = threading.Lock()
+
+
+def get_cache() -> ResultCache:
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = ResultCache()
+        return _default
+
+
+def cached(kind: str, audio_path: str, params: Dict[str, Any],
+           compute: Callable[[], Any],
+           should_store: Callable[[Any], bool] = lambda v: v is not None) -> Any:
+    """
+    Önbellekte varsa sonucu döner; yoksa compute() çalıştırıp saklar.
+    should_store(sonuç) False dönerse (ör. hata mesajı) sonuç saklanmaz.
+    """
+    if not CACHE_ENABLED:
+        return compute()
+    cache = get_cache()
+    key = make_key(kind, cache.file_digest(audio_path), params)
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
+    value = compute()
+    if should_store(value):
+        cache.put(key, kind, value)
+    return value
@@ -0,0 +1,174 @@
+"""
+Aşama bazlı kontrol noktaları (checkpoint).
+
+Her çalıştırma, ses içeriği + ayarlardan türetilen bir klasöre bağlanır ve
+her aşama çıktısını oraya kalıcı bir artefakt olarak yazar:
+
+    <runs>/<run_id>/manifest.json     aşama durumları (done / failed)
+    <runs>/<run_id>/audio.npy         çözülmüş 16 kHz mono ses
+    <runs>/<run_id>/transcript.json   Whisper kelimeleri
+    <runs>/<run_id>/diarization.json  konuşmacı turn'leri
+    <runs>/<run_id>/alignment.json    eşleştirilmiş satırlar
+
+Aynı dosya tekrar işlenirse (hata sonrası yeniden deneme ya da uygulama
+kapanıp açıldıktan sonra) yalnızca eksik ya da başarısız aşamalar çalışır.
+Yazımlar geçici dosya + os.replace ile atomiktir; yarım artefakt kalmaz.
+
+Modül olarak:
+    from transcription.checkpoint import RunStore
+    store = RunStore.for_audio("kayit.wav", {"model": "medium"})
+    words = store.stage("transcript", lambda: transcribe(...))
+
+Ortam değişkenleri:
+    PIPELINE_RUNS_DIR       Klasör (varsayılan: önbellek klasörü/runs)
+    PIPELINE_CHECKPOINTS=0  Kontrol noktalarını kapatır
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from transcription.cache import CACHE_DIR, get_cache, make_key
+
+RUNS_DIR = os.getenv("PIPELINE_RUNS_DIR", os.path.join(CACHE_DIR, "runs"))
+CHECKPOINTS_ENABLED = os.getenv("PIPELINE_CHECKPOINTS", "1") != "0"
+
+# Aşama adı -> dosya adı (.npy NumPy dizisi, diğerleri JSON)
+STAGE_FILES = {
+    "audio": "audio.npy",
+    "transcript": "transcript.json",
+    "diarization": "diarization.json",
+    "alignment": "alignment.json",
+}
+
+
+class RunStore:
+    """Bir çalıştırmanın aşama artefaktlarını tutan klasör."""
+
+    def __init__(self, run_id: str, root: str = RUNS_DIR, meta: Optional[Dict[str, Any]] = None):
+        self.run_id = run_id
+        self.path = os.path.join(root, run_id)
+        os.makedirs(self.path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._manifest_path = os.path.join(self.path, "manifest.json")
+        self.manifest = self._read_manifest()
+        if meta:
+            self.manifest.update(meta)
+            self._write_manifest()
+
+    @classmethod
+    def for_audio(cls, audio_path: str, params: Dict[str, Any], root: str = RUNS_DIR) -> "RunStore":
+        digest = get_cache().file_digest(audio_path)
+        run_id = make_key("run", digest, params)[:32]
+        return cls(run_id, root, meta={"audio_path": os.path.abspath(audio_path), "params": params})
+
+    # -------------------------------
+    # Manifest
+    # -------------------------------
+    def _read_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self._manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"stages": {}}
+
+    def _write_manifest(self) -> None:
+        self._atomic_write(self._manifest_path,
+                           json.dumps(self.manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+
+    def _set_status(self, stage: str, status: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            entry = {"status": status, "updated": time.time()}
+            if error:
+                entry["error"] = error
+            self.manifest.setdefault("stages", {})[stage] = entry
+            self._write_manifest()
+
+    def status(self, stage: str) -> Optional[str]:
+        return self.manifest.get("stages", {}).get(stage, {}).get("status")
+
+    # -------------------------------
+    # Artefaktlar
+    # -------------------------------
+    @staticmethod
+    def _atomic_write(path: str, data: bytes) -> None:
+        tmp = f"{path}.tmp{threading.get_ident()}"
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _file(self, stage: str) -> str:
+        return os.path.join(self.path, STAGE_FILES[stage])
+
+    def has(self, stage: str) -> bool:
+        return self.status(stage) == "done" and os.path.exists(self._file(stage))
+
+    def load(self, stage: str) -> Any:
+        path = self._file(stage)
+        if path.endswith(".npy"):
+            return np.load(path)
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, stage: str, value: Any) -> None:
+        path = self._file(stage)
+        if path.endswith(".npy"):
+            tmp = f"{path}.tmp{threading.get_ident()}.npy"
+            np.save(tmp, value)
+            os.replace(tmp, path)
+        else:
+            self._atomic_write(path, json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        self._set_status(stage, "done")
+
+    def discard(self, stage: str) -> None:
+        """Artık gerekmeyen (büyük) artefaktı siler, ör. iş bitince çözülmüş ses."""
+        try:
+            os.unlink(self._file(stage))
+        except OSError:
+            pass
+        with self._lock:
+            self.manifest.get("stages", {}).pop(stage, None)
+            self._write_manifest()
+
+    def stage(self, name: str, compute: Callable[[], Any]) -> Any:
+        """Artefakt varsa yükler; yoksa compute() çalıştırıp kaydeder. Hata durumunu manifest'e yazar."""
+        if self.has(name):
+            print(f"   ♻️ '{name}' aşaması önceki çalıştırmadan yüklendi.")
+            return self.load(name)
+        try:
+            value = compute()
+        except Exception as e:
+            self._set_status(name, "failed", str(e))
+            raise
+        self.save(name, value)
+        return value
+
+    def remove(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class NullStore:
+    """Kontrol noktaları kapalıyken aynı arayüz, hiçbir şey saklamaz."""
+
+    def has(self, stage: str) -> bool:
+        return False
+
+    def stage(self, name: str, compute: Callable[[], Any]) -> Any:
+        return compute()
+
+    def discard(self, stage: str) -> None:
+        pass
+
+
+def open_run(audio_path: str, params: Dict[str, Any]):
+    """Ayara göre RunStore ya da NullStore döner."""
+    if not CHECKPOINTS_ENABLED:
+        return NullStore()
+    return RunStore.for_audio(audio_path, params)
@@ -0,0 +1,201 @@
+"""
+Uzun kayıtlar için parçalı (chunked) transkripsiyon.
+
+Ses, hedef uzunluğa yakın sessizlik noktalarından bölünür; parçalar bir
+süreç havuzunda (her işçi kendi modelini tutar) transkribe edilir ve sonuç
+global zaman damgalarıyla tek `{"language", "duration", "segments"}`
+şekline dikilir. Parçalar sınırlarda biraz örtüşür; örtüşen bölgede iki kez
+çıkan kelimeler orta noktasına göre tek bir parçaya bırakılır.
+
+İşçi sayısı verilmezse (WHISPER_WORKERS de yoksa) küçük tutulur:
+min(çekirdek // 4, bellek bütçesi // model boyutu). Her işçi süreci modelin
+kendi kopyasını yükler; 16 çekirdekte `medium` için 16 kopya açılmaz.
+
+Girdi bir `AudioSource` ise (transcription/audio_source.py) işçilere ses
+dizisi değil yalnızca kaynak + örnek aralığı gönderilir; her işçi kendi
+penceresini bellek eşlemeli dosyadan okur.
+
+Modül olarak:
+    from transcription.chunked import transcribe_chunked
+    result = transcribe_chunked(audio, chunk_seconds=120, workers=4)
+    result = transcribe_chunked(open_audio("toplanti.mp3"), chunk_seconds=120)
+
+Ortam değişkenleri:
+    WHISPER_WORKERS         İşçi süreç sayısı (varsayılan: yukarıdaki formül)
+    MODEL_MEMORY_BUDGET_MB  İşçi başına bir model kopyası bu bütçeye sığmalı
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from transcription.audio import SAMPLE_RATE, frame_rms
+from transcription.audio_source import AudioSource
+from transcription.models import REGISTRY, estimate_size_mb
+from transcription.whisper import (
+    DEFAULT_COMPUTE, DEFAULT_DEVICE, DEFAULT_MODEL, load_model, transcribe_audio,
+)
+
+DEFAULT_CHUNK_SECONDS = 120.0
+DEFAULT_OVERLAP_SECONDS = 1.0
+_FRAME_MS = 30
+
+
+# -------------------------------
+# Bölme
+# -------------------------------
+def _frame_energy(audio: np.ndarray, sr: int) -> Tuple[np.ndarray, int]:
+    """Sabit uzunluklu çerçevelerin RMS enerjisi ve çerçeve boyu (örnek)."""
+    hop = max(1, int(sr * _FRAME_MS / 1000))
+    return frame_rms(audio, hop), hop
+
+
+def find_split_points(audio: np.ndarray, sr: int = SAMPLE_RATE,
+                      chunk_seconds: float = DEFAULT_CHUNK_SECONDS,
+                      search_seconds: Optional[float] = None) -> List[int]:
+    """
+    Her ~chunk_seconds noktasının ±search_seconds çevresindeki en sessiz
+    çerçeveyi bulur. Başı (0) ve sonu (len) içeren kesim listesi döner.
+    """
+    total = audio.size
+    chunk = int(chunk_seconds * sr)
+    if total <= chunk:
+        return [0, total]
+
+    energy, hop = _frame_energy(audio, sr)
+    search = int((search_seconds if search_seconds is not None else min(5.0, chunk_seconds / 4)) * sr)
+
+    cuts = [0]
+    target = chunk
+    while target < total - chunk // 4:
+        lo = max(cuts[-1] + chunk // 2, target - search) // hop
+        hi = min(total, target + search) // hop
+        if hi > lo:
+            cut = (lo + int(np.argmin(energy[lo:hi]))) * hop + hop // 2
+        else:
+            cut = target
+        cuts.append(cut)
+        target = cut + chunk
+    cuts.append(total)
+    return cuts
+
+
+# -------------------------------
+# İşçi süreç
+# -------------------------------
+def _init_worker(settings: Dict[str, Any]) -> None:
+    """Her işçi modeli bir kez, kendi kayıt defterine yükler."""
+    load_model(**settings)
+
+
+def _transcribe_chunk(audio: Union[np.ndarray, AudioSource], lang: Optional[str], settings: Dict[str, Any],
+                      start: int = 0, stop: Optional[int] = None) -> Dict[str, Any]:
+    # Ayarlar her çağrıyla gelir; aynı süreçteki eşzamanlı çağıranlar birbirini ezmez
+    if isinstance(audio, AudioSource):
+        # Pencere işçide, eşlenmiş dosyadan okunur
+        audio = audio.read(start, audio.frames if stop is None else stop)
+    return transcribe_audio(audio, lang=lang, **settings)
+
+
+def default_workers(model_name: str = DEFAULT_MODEL, compute_type: str = DEFAULT_COMPUTE) -> int:
+    """Çekirdeklerin dörtte biri, ama işçi başına bir model kopyası bellek bütçesine sığacak kadar."""
+    cores = os.cpu_count() or 1
+    by_cores = max(1, cores // 4)
+    model_mb = estimate_size_mb("whisper", model_name, compute_type)
+    by_memory = max(1, int(REGISTRY.budget_mb // model_mb)) if model_mb > 0 else by_cores
+    return min(by_cores, by_memory)
+
+
+# -------------------------------
+# Dikiş
+# -------------------------------
+def _shift(segments: List[Dict[str, Any]], offset: float) -> None:
+    for s in segments:
+        s["start"] += offset
+        s["end"] += offset
+        for w in s["words"]:
+            w["start"] += offset
+            w["end"] += offset
+
+
+def stitch(parts: List[Tuple[float, float, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    parts: [(sahip_başlangıç_sn, sahip_bitiş_sn, parça_sonucu), ...] (global zamanlı).
+    Her kelime orta noktası hangi parçanın sahip aralığına düşüyorsa orada kalır.
+    """
+    out: List[Dict[str, Any]] = []
+    for own_start, own_end, result in parts:
+        for s in result["segments"]:
+            words = s["words"]
+            if words:
+                kept = [w for w in words if own_start <= (w["start"] + w["end"]) / 2 < own_end]
+                if not kept:
+                    continue
+                if len(kept) != len(words):
+                    s = dict(s, words=kept, start=kept[0]["start"], end=kept[-1]["end"],
+                             text="".join(w["word"] for w in kept).strip())
+            elif not own_start <= (s["start"] + s["end"]) / 2 < own_end:
+                continue
+            out.append(s)
+    return out
+
+
+def transcribe_chunked(audio: Union[np.ndarray, AudioSource], lang: Optional[str] = "tr",
+                       model_name: str = DEFAULT_MODEL,
+                       device: str = DEFAULT_DEVICE,
+                       compute_type: str = DEFAULT_COMPUTE,
+                       chunk_seconds: float = DEFAULT_CHUNK_SECONDS,
+                       overlap_seconds: float = DEFAULT_OVERLAP_SECONDS,
+                       workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    16 kHz mono sesi (dizi ya da AudioSource) parçalara bölüp süreç havuzunda transkribe eder.
+    workers: None -> WHISPER_WORKERS ortam değişkeni ya da default_workers().
+    Çekirdekler işçiler arasında bölünür (işçi başına cpu_threads).
+    """
+    sr = SAMPLE_RATE
+    source = audio if isinstance(audio, AudioSource) else None
+    if source is not None:
+        audio = source.samples()
+    cuts = find_split_points(audio, sr, chunk_seconds)
+    overlap = int(overlap_seconds * sr)
+    n_chunks = len(cuts) - 1
+
+    cores = os.cpu_count() or 1
+    workers = workers or int(os.getenv("WHISPER_WORKERS", "0")) or default_workers(model_name, compute_type)
+    workers = max(1, min(workers, n_chunks))
+    settings = {"model_name": model_name, "device": device, "compute_type": compute_type,
+                "cpu_threads": max(1, cores // workers)}
+
+    spans = []
+    for i in range(n_chunks):
+        read_start = max(0, cuts[i] - overlap)
+        read_end = min(audio.size, cuts[i + 1] + overlap)
+        spans.append((read_start, read_end, cuts[i] / sr, cuts[i + 1] / sr))
+
+    if workers == 1:
+        results = [_transcribe_chunk(audio[a:b], lang, settings) for a, b, _, _ in spans]
+    elif source is not None:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(settings,)) as pool:
+            futures = [pool.submit(_transcribe_chunk, source, lang, settings, a, b) for a, b, _, _ in spans]
+            results = [f.result() for f in futures]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(settings,)) as pool:
+            futures = [pool.submit(_transcribe_chunk, audio[a:b], lang, settings) for a, b, _, _ in spans]
+            results = [f.result() for f in futures]
+
+    parts = []
+    for (read_start, _, own_start, own_end), result in zip(spans, results):
+        _shift(result["segments"], read_start / sr)
+        # Son parçanın sahip aralığı açık uçlu olsun (son kelime dışarıda kalmasın)
+        parts.append((own_start, own_end if own_end < audio.size / sr else float("inf"), result))
+
+    languages = [r["language"] for r in results if r.get("language")]
+    return {
+        "language": lang or (max(set(languages), key=languages.count) if languages else None),
+        "duration": audio.size / sr,
+        "segments": stitch(parts),
+    }
@@ -1,67 +1,157 @@
+"""
+Diarization motoru seçimi (pyannote | ecapa).
+
+    pyannote  pyannote/speaker-diarization-3.1 hattı (en isabetli, yavaş; GPU'da iyi)
+    ecapa     transcription/diarization/ecapa.py: VAD pencereleri + toplu ECAPA
+              gömmeleri + çevrimiçi kümeleme (CPU'da hızlı; düzenli ekip toplantıları için)
+
+İki motor da aynı biçimi döner: [(start, end, speaker), ...]. Kayıtlı ses
+izleri varsa (ecapa.VoiceprintStore) konuşmacılar SPEAKER_00 yerine kişi
+adıyla etiketlenir; pyannote turn'leri de aynı şekilde adlandırılır.
+
+Modül olarak:
+    from transcription.diarization.diarization import diarize
+    turns = diarize(audio, min_speakers=1, max_speakers=3)
+
+CLI (backend klasöründen):
+    python -m transcription.diarization.diarization kayit.ogg --backend ecapa
+
+Ortam değişkenleri:
+    DIARIZATION_BACKEND     pyannote | ecapa (varsayılan pyannote)
+    VOICEPRINTS=0           Ses izleriyle kişi tanımayı kapatır
+    VOICEPRINT_DIR          Ses izi klasörü (varsayılan: önbellek klasörü/voiceprints)
+    HF_TOKEN                pyannote modelleri için Hugging Face token'ı
+"""
+
+import glob
 import os
-import torch
-import torchaudio
-from pyannote.audio import Pipeline
-from dotenv import load_dotenv
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
 
-# .env dosyasini yukle
-load_dotenv()
+from transcription import tracing
+from transcription.audio import SAMPLE_RATE
+from transcription.cache import CACHE_DIR
+from transcription.models import DIARIZATION_MODEL, get_diarization_pipeline
 
-# --- AYARLAR ---
+DIARIZATION_BACKEND = os.getenv("DIARIZATION_BACKEND", "pyannote")
+VOICEPRINTS_ENABLED = os.getenv("VOICEPRINTS", "1") != "0"
 HF_TOKEN = os.getenv("HF_TOKEN")
-# Eger .env calismazsa tokeni asagidaki tirnak icine yaz:
-# HF_TOKEN = "hf_SeninTokenKodun"
+VOICEPRINT_DIR = os.getenv("VOICEPRINT_DIR", os.path.join(CACHE_DIR, "voiceprints"))
 
 AUDIO_FILE = "backend/sample/ses_dosyasi.ogg"
 
-def run_diarization():
-    print("🚀 Islem baslatiliyor...")
+Turn = Tuple[float, float, str]
+BACKENDS = ("pyannote", "ecapa")
 
-    # 1. DOSYA KONTROLU
-    if not os.path.exists(AUDIO_FILE):
-        print(f"❌ HATA: '{AUDIO_FILE}' dosyasi bulunamadi! Yolunu kontrol et.")
-        return
+_voiceprints = None
 
-    # 2. CIHAZ KONTROLU
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    print(f"🖥️ Cihaz kullaniliyor: {device}")
 
-    # 3. MODELI YUKLE
-    try:
-        print("⏳ Model yukleniyor (biraz surer)...")
-        pipeline = Pipeline.from_pretrained(
-            "pyannote/speaker-diarization-3.1",
-            token=HF_TOKEN 
-        ).to(device)
-    except Exception as e:
-        print(f"\n❌ MODEL YUKLEME HATASI: {e}")
-        return
+def _has_enrollments() -> bool:
+    # ecapa'yı import etmeden, yalnızca diske bakar (herhangi bir model için kayıt var mı)
+    return bool(glob.glob(os.path.join(glob.escape(VOICEPRINT_DIR), "*", "voiceprints.json")))
+
+
+def get_voiceprints(backend: Optional[str] = None):
+    """
+    Paylaşılan ses izi deposu; kapalıysa ya da kayıt yoksa None. Depo yalnızca
+    ecapa motorunda ya da diskte kayıtlı kişi varken yüklenir.
+    """
+    global _voiceprints
+    if not VOICEPRINTS_ENABLED:
+        return None
+    if _voiceprints is None:
+        if (backend or DIARIZATION_BACKEND) != "ecapa" and not _has_enrollments():
+            return None
+        from transcription.diarization.ecapa import VoiceprintStore
+        _voiceprints = VoiceprintStore()
+    return _voiceprints if len(_voiceprints) else None
+
+
+def _pyannote(audio: np.ndarray, min_speakers: int, max_speakers: Optional[int],
+              device: str, token: Optional[str]) -> List[Turn]:
+    import torch
+    with tracing.span("diarization.model_load", model=DIARIZATION_MODEL, device=device):
+        pipeline = get_diarization_pipeline(device=device, token=token)
 
-    print("✅ Model hazir! Ses analizi basliyor...")
-    
+    # Whisper ile aynı tampon (bellek eşlemeli olabilir); kopyasız (1, n) tensor görünümü.
+    # {"audio": yol} verilmez: pyannote dosyayı bütünüyle yeni bir tensöre çözer.
+    inputs = {"waveform": torch.from_numpy(np.asarray(audio)).unsqueeze(0), "sample_rate": SAMPLE_RATE}
+    with tracing.span("diarization.infer", audio_seconds=audio.size / SAMPLE_RATE):
+        output = pipeline(inputs, min_speakers=min_speakers, max_speakers=max_speakers)
+
+    if hasattr(output, "speaker_diarization"): diarization_result = output.speaker_diarization
+    elif hasattr(output, "annotation"): diarization_result = output.annotation
+    elif isinstance(output, tuple): diarization_result = output[0]
+    else: diarization_result = output
+
+    return [(turn.start, turn.end, speaker)
+            for turn, _, speaker in diarization_result.itertracks(yield_label=True)]
+
+
+def diarize(audio: np.ndarray, min_speakers: int = 1, max_speakers: Optional[int] = 3,
+            backend: Optional[str] = None, device: str = "cpu", token: Optional[str] = None) -> List[Turn]:
+    """
+    Seçili motorla konuşmacı turn'leri -> [(start, end, speaker), ...].
+    audio bellek eşlemeli olabilir (bkz. transcription/audio_source.py); kopyalanmaz.
+    """
+    backend = backend or DIARIZATION_BACKEND
+    if backend not in BACKENDS:
+        raise KeyError(f"Bilinmeyen diarization motoru: {backend} (seçenekler: {', '.join(BACKENDS)})")
+    voiceprints = get_voiceprints(backend)
+    if backend == "ecapa":
+        from transcription.diarization.ecapa import diarize as ecapa_diarize
+        return ecapa_diarize(audio, min_speakers=min_speakers, max_speakers=max_speakers,
+                             voiceprints=voiceprints, device=device)
+
+    turns = _pyannote(audio, min_speakers, max_speakers, device, token or HF_TOKEN)
+    if voiceprints is not None:
+        from transcription.diarization.ecapa import label_turns
+        turns = label_turns(audio, turns, voiceprints)
+    return turns
+
+
+def backend_params(backend: Optional[str] = None) -> Dict[str, Any]:
+    """Önbellek / checkpoint anahtarlarına girecek diarization ayarları."""
+    backend = backend or DIARIZATION_BACKEND
+    params: Dict[str, Any] = {"backend": backend}
+    if backend == "ecapa":
+        from transcription.diarization.ecapa import CLUSTER_THRESHOLD, SPEAKER_EMBEDDING_MODEL, WINDOW_SECONDS
+        params.update(model=SPEAKER_EMBEDDING_MODEL, threshold=CLUSTER_THRESHOLD, window=WINDOW_SECONDS)
+    else:
+        params["model"] = DIARIZATION_MODEL
+    voiceprints = get_voiceprints(backend)
+    if voiceprints is not None:
+        params["voiceprints"] = voiceprints.fingerprint()
+    return params
+
+
+def run_diarization(audio_path: str = AUDIO_FILE, backend: Optional[str] = None) -> Optional[List[Turn]]:
+    print("🚀 Islem baslatiliyor...")
+
+    if not os.path.exists(audio_path):
+        print(f"❌ HATA: '{audio_path}' dosyasi bulunamadi! Yolunu kontrol et.")
+        return None
+
+    from transcription.audio_source import open_audio
+    source = open_audio(audio_path)
     try:
-        # 4. SESI MANUEL YUKLEME
-        waveform, sample_rate = torchaudio.load(AUDIO_FILE)
-        
-        # Sesi modele veriyoruz
-        output = pipeline({"waveform": waveform, "sample_rate": sample_rate})
-
-        # 5. SONUCU ALMA (Sorunu Çözen Yer Burası!)
-        # Senin attigin listeye gore veri 'speaker_diarization' icinde.
-        diarization = output.speaker_diarization
-
-        print("\n📝 --- SONUCLAR ---")
-        # Sonuçları ekrana yazdır
-        for turn, _, speaker in diarization.itertracks(yield_label=True):
-            print(f"⏱️ Zaman: {turn.start:.1f}s - {turn.end:.1f}s --> {speaker}")
-            
-        print("\n✅ ISLEM BAŞARIYLA TAMAMLANDI REIS!")
-
-    except AttributeError:
-        print("\n⚠️ Hata: Sonuc formatı yine farkli geldi.")
-        print(f"Gelen veri: {output}")
+        turns = diarize(source.samples(), backend=backend, max_speakers=None)
     except Exception as e:
         print(f"\n❌ Islem sirasinda hata: {e}")
+        return None
+
+    print("\n📝 --- SONUCLAR ---")
+    for start, end, speaker in turns:
+        print(f"⏱️ Zaman: {start:.1f}s - {end:.1f}s --> {speaker}")
+    print("\n✅ ISLEM BAŞARIYLA TAMAMLANDI REIS!")
+    return turns
+
 
 if __name__ == "__main__":
-    run_diarization()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Konuşmacı ayrıştırma (diarization)")
+    parser.add_argument("audio", nargs="?", default=AUDIO_FILE)
+    parser.add_argument("--backend", choices=BACKENDS, default=None)
+    args = parser.parse_args()
+    run_diarization(args.audio, args.backend)
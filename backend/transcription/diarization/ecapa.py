@@ -0,0 +1,479 @@
+"""
+ECAPA konuşmacı gömmeleri (embedding), çevrimiçi kümeleme ve kalıcı ses izleri.
+
+pyannote 3.1 hattının tamamını (segmentasyon + gömme + küresel kümeleme)
+koşturmak yerine hızlı bir CPU yolu:
+
+1. Konuşma bölgeleri (transcription/vad.py) kayan pencerelere bölünür
+   (varsayılan 1.5 sn, 0.75 sn adım).
+2. Pencereler toplu (batch) halde gömme modeline verilir; çıktılar L2
+   normalize edilir.
+3. `OnlineClusterer` gömmeleri tek geçişte merkezlere (centroid) atar, sonunda
+   yakın merkezleri birleştirir ve her pencereyi en yakın merkeze yeniden atar.
+4. Ardışık aynı etiketli pencereler turn'lere birleştirilir.
+
+Tanınan kişiler `VoiceprintStore`'da tutulur: tek bir (K, D) float32 matris
+(voiceprints.npy) + isim listesi (voiceprints.json). Yeni bir toplantıda her
+kümenin merkezi bu matrisle tek bir matris çarpımıyla karşılaştırılır; eşiği
+geçen kümeler SPEAKER_00 yerine kişinin adını alır. pyannote turn'leri de
+`label_turns` ile aynı şekilde adlandırılabilir.
+
+Modül olarak:
+    from transcription.diarization.ecapa import VoiceprintStore, diarize, enroll_speakers
+    store = VoiceprintStore()
+    turns = diarize(audio, max_speakers=5, voiceprints=store)   # [(start, end, speaker), ...]
+    enroll_speakers(audio, turns, {"SPEAKER_01": "Ayşe"}, store)
+
+CLI (backend klasöründen):
+    python -m transcription.diarization.ecapa diarize toplanti.wav --max-speakers 5
+    python -m transcription.diarization.ecapa enroll "Ayşe" ayse.wav
+    python -m transcription.diarization.ecapa list
+    python -m transcription.diarization.ecapa remove "Ayşe"
+
+Ortam değişkenleri:
+    SPEAKER_EMBEDDING_MODEL Konuşmacı gömme modeli (varsayılan speechbrain/spkrec-ecapa-voxceleb;
+                            pyannote/wespeaker-voxceleb-resnet34-LM gibi pyannote modelleri de olur)
+    ECAPA_WINDOW            Pencere uzunluğu, sn (varsayılan 1.5)
+    ECAPA_BATCH             Toplu gömme boyutu (varsayılan 32)
+    ECAPA_THRESHOLD         Küme eşiği, kosinüs benzerliği (varsayılan 0.6)
+    VOICEPRINT_DIR          Ses izi klasörü (varsayılan: önbellek klasörü/voiceprints)
+    VOICEPRINT_THRESHOLD    Kişi tanıma eşiği, kosinüs benzerliği (varsayılan 0.65)
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from transcription import tracing
+from transcription.audio import SAMPLE_RATE
+from transcription.diarization.diarization import VOICEPRINT_DIR
+from transcription.models import REGISTRY, register_loader
+from transcription.vad import SpeechMap, detect_speech
+
+SPEAKER_EMBEDDING_MODEL = os.getenv("SPEAKER_EMBEDDING_MODEL", "speechbrain/spkrec-ecapa-voxceleb")
+WINDOW_SECONDS = float(os.getenv("ECAPA_WINDOW", "1.5"))
+STEP_SECONDS = WINDOW_SECONDS / 2
+# Bundan kısa konuşma bölgeleri güvenilir gömme vermez
+MIN_WINDOW_SECONDS = 0.5
+BATCH_SIZE = int(os.getenv("ECAPA_BATCH", "32"))
+CLUSTER_THRESHOLD = float(os.getenv("ECAPA_THRESHOLD", "0.6"))
+IDENTIFY_THRESHOLD = float(os.getenv("VOICEPRINT_THRESHOLD", "0.65"))
+# Bundan az pencereli kümeler en yakın kümeye katılır (öksürük, tek kelimelik araya girme)
+MIN_CLUSTER_WINDOWS = 3
+
+Turn = Tuple[float, float, str]
+
+
+# -------------------------------
+# Gömme modeli
+# -------------------------------
+def _load_embedding(name: str, device: str, compute_type: str, **options) -> object:
+    import torch
+    from pyannote.audio.pipelines.speaker_verification import PretrainedSpeakerEmbedding
+    return PretrainedSpeakerEmbedding(name, device=torch.device(device), token=options.get("token"))
+
+
+# ECAPA-TDNN ~20M parametre; wespeaker ResNet34 ~7M
+register_loader("embedding", _load_embedding, lambda name, compute_type: 100.0)
+
+
+def get_embedding_model(name: str = SPEAKER_EMBEDDING_MODEL, device: str = "cpu", token: Optional[str] = None):
+    """Gömme modeli (paylaşımlı, transcription/models.py kayıt defterinde)."""
+    return REGISTRY.get("embedding", name, device, "float32", token=token or os.getenv("HF_TOKEN"))
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def speech_windows(regions: np.ndarray, sr: int = SAMPLE_RATE, window: float = WINDOW_SECONDS,
+                   step: float = STEP_SECONDS, min_window: float = MIN_WINDOW_SECONDS) -> np.ndarray:
+    """Konuşma bölgelerini (örnek indisleri) kayan pencerelere böler -> (W, 2)."""
+    size, hop, shortest = int(window * sr), int(step * sr), int(min_window * sr)
+    out = []
+    for start, end in np.asarray(regions, dtype=np.int64).reshape(-1, 2):
+        if end - start < shortest:
+            continue
+        if end - start <= size:
+            out.append(np.array([[start, end]]))
+            continue
+        starts = np.arange(start, end - size + 1, hop)
+        # Bölgenin sonu açıkta kalmasın
+        if starts[-1] + size < end:
+            starts = np.append(starts, end - size)
+        out.append(np.stack([starts, starts + size], axis=1))
+    return np.concatenate(out).astype(np.int64) if out else np.zeros((0, 2), dtype=np.int64)
+
+
+def embed_windows(audio: np.ndarray, windows: np.ndarray, model=None,
+                  batch_size: int = BATCH_SIZE) -> np.ndarray:
+    """
+    Pencerelerin gömmeleri -> (W, D), L2 normalize. Kısa pencereler sıfırla
+    doldurulur ve maskelenir; model gömme üretemezse satır NaN olur.
+    """
+    import torch
+    model = model or get_embedding_model()
+    out = np.full((len(windows), model.dimension), np.nan, dtype=np.float32)
+    if not len(windows):
+        return out
+    lengths = windows[:, 1] - windows[:, 0]
+    for i in range(0, len(windows), batch_size):
+        batch = windows[i:i + batch_size]
+        size = int(lengths[i:i + batch_size].max())
+        waves = np.zeros((len(batch), 1, size), dtype=np.float32)
+        masks = np.zeros((len(batch), size), dtype=np.float32)
+        for j, (start, end) in enumerate(batch):
+            waves[j, 0, :end - start] = audio[start:end]
+            masks[j, :end - start] = 1.0
+        with torch.inference_mode():
+            out[i:i + len(batch)] = model(torch.from_numpy(waves), masks=torch.from_numpy(masks))
+    return _normalize(out)
+
+
+# -------------------------------
+# Çevrimiçi kümeleme
+# -------------------------------
+class OnlineClusterer:
+    """
+    Tek geçişli kosinüs kümeleme. Her gömme en yakın merkeze (benzerlik eşiği
+    geçiyorsa) eklenir, yoksa yeni küme açar. max_speakers dolduysa en yakın
+    kümeye eklenir. Merkezler toplam vektör olarak tutulur (ortalama yönü).
+    """
+
+    def __init__(self, threshold: float = CLUSTER_THRESHOLD, max_speakers: Optional[int] = None):
+        self.threshold = threshold
+        self.max_speakers = max_speakers
+        self.sums: Optional[np.ndarray] = None
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    @property
+    def centroids(self) -> np.ndarray:
+        return _normalize(self.sums) if self.sums is not None else np.zeros((0, 0), dtype=np.float32)
+
+    def add(self, embedding: np.ndarray) -> int:
+        if self.sums is None:
+            self.sums = embedding[None, :].astype(np.float64)
+            self.counts = np.ones(1, dtype=np.int64)
+            return 0
+        sims = self.centroids @ embedding
+        best = int(sims.argmax())
+        full = self.max_speakers is not None and len(self.counts) >= self.max_speakers
+        if sims[best] >= self.threshold or full:
+            self.sums[best] += embedding
+            self.counts[best] += 1
+            return best
+        self.sums = np.vstack([self.sums, embedding])
+        self.counts = np.append(self.counts, 1)
+        return len(self.counts) - 1
+
+    def partial_fit(self, embeddings: np.ndarray) -> np.ndarray:
+        return np.array([self.add(e) for e in embeddings], dtype=np.int64)
+
+    def _merge(self, keep: int, drop: int) -> None:
+        self.sums[keep] += self.sums[drop]
+        self.counts[keep] += self.counts[drop]
+        self.sums = np.delete(self.sums, drop, axis=0)
+        self.counts = np.delete(self.counts, drop)
+
+    def finalize(self, embeddings: np.ndarray, min_speakers: int = 1,
+                 min_windows: int = MIN_CLUSTER_WINDOWS) -> np.ndarray:
+        """
+        Eşiği geçen merkez çiftlerini ve çok küçük kümeleri birleştirir
+        (min_speakers'ın altına inmeden), sonra tüm gömmeleri son merkezlere
+        yeniden atar. Etiketler ilk görünme sırasına göre 0..K-1 döner.
+        """
+        if self.sums is None:
+            return np.zeros(0, dtype=np.int64)
+        while len(self.counts) > max(min_speakers, 1):
+            centroids = self.centroids
+            sims = centroids @ centroids.T
+            np.fill_diagonal(sims, -np.inf)
+            small = int(self.counts.argmin())
+            if self.counts[small] < min_windows:
+                self._merge(int(sims[small].argmax()), small)
+                continue
+            a, b = np.unravel_index(int(sims.argmax()), sims.shape)
+            if sims[a, b] < self.threshold:
+                break
+            self._merge(min(a, b), max(a, b))
+        labels = (embeddings @ self.centroids.T).argmax(axis=1)
+        # İlk konuşan SPEAKER_00 olsun
+        _, first = np.unique(labels, return_index=True)
+        order = np.unique(labels)[np.argsort(first)]
+        remap = np.empty(len(self.counts), dtype=np.int64)
+        remap[order] = np.arange(len(order))
+        return remap[labels]
+
+
+def windows_to_turns(windows: np.ndarray, labels: np.ndarray, names: Sequence[str],
+                     sr: int = SAMPLE_RATE) -> List[Turn]:
+    """
+    Etiketli pencereleri turn'lere çevirir. Örtüşen iki pencerenin sınırı
+    örtüşmenin ortasıdır; aynı etiketli bitişik pencereler birleşir.
+    """
+    if not len(windows):
+        return []
+    starts, ends = windows[:, 0].astype(np.float64), windows[:, 1].astype(np.float64)
+    overlap = starts[1:] < ends[:-1]
+    cut = np.where(overlap, (starts[1:] + ends[:-1]) / 2, ends[:-1])
+    eff_start, eff_end = starts.copy(), ends.copy()
+    eff_end[:-1] = cut
+    eff_start[1:] = np.where(overlap, cut, starts[1:])
+    breaks = np.flatnonzero((labels[1:] != labels[:-1]) | (eff_start[1:] > eff_end[:-1])) + 1
+    bounds = np.concatenate(([0], breaks, [len(labels)]))
+    return [(float(eff_start[a] / sr), float(eff_end[b - 1] / sr), names[labels[a]])
+            for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def _turn_regions(turns: Iterable[Turn], sr: int) -> Dict[str, np.ndarray]:
+    by_label: Dict[str, List[Tuple[int, int]]] = {}
+    for start, end, label in turns:
+        by_label.setdefault(label, []).append((int(start * sr), int(end * sr)))
+    return {label: np.array(regions, dtype=np.int64) for label, regions in by_label.items()}
+
+
+def speaker_centroids(audio: np.ndarray, turns: Iterable[Turn], sr: int = SAMPLE_RATE,
+                      model=None) -> Dict[str, np.ndarray]:
+    """Her etiketin turn'lerinden ortalama (normalize) gömme; tek toplu geçiş."""
+    regions = _turn_regions(turns, sr)
+    labels, windows = [], []
+    for label, spans in regions.items():
+        w = speech_windows(spans, sr)
+        labels += [label] * len(w)
+        windows.append(w)
+    if not labels:
+        return {}
+    embeddings = embed_windows(audio, np.concatenate(windows), model=model)
+    labels = np.array(labels)
+    valid = np.isfinite(embeddings).all(axis=1)
+    return {label: _normalize(embeddings[valid & (labels == label)].mean(axis=0))
+            for label in regions if (valid & (labels == label)).any()}
+
+
+# -------------------------------
+# Kalıcı ses izleri
+# -------------------------------
+class VoiceprintStore:
+    """
+    Kayıtlı konuşmacılar: <root>/<model>/voiceprints.npy (K, D) + voiceprints.json.
+    Her model kendi klasörünü kullanır (farklı boyutlu gömmeler karışmaz).
+    """
+
+    def __init__(self, root: str = VOICEPRINT_DIR, model: str = SPEAKER_EMBEDDING_MODEL):
+        self.model = model
+        self.path = os.path.join(root, re.sub(r"[^\w.-]+", "_", model))
+        self._matrix_file = os.path.join(self.path, "voiceprints.npy")
+        self._index_file = os.path.join(self.path, "voiceprints.json")
+        self._lock = threading.Lock()
+        self.names: List[str] = []
+        self.counts: List[int] = []
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self._load()
+
+    def _load(self) -> None:
+        if not (os.path.exists(self._index_file) and os.path.exists(self._matrix_file)):
+            return
+        with open(self._index_file, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        matrix = np.load(self._matrix_file)
+        if len(matrix) != len(index["names"]):
+            print(f"⚠️ Ses izi dosyaları uyuşmuyor, yok sayıldı: {self.path}")
+            return
+        self.names, self.counts, self.matrix = index["names"], index["counts"], matrix
+
+    def _save(self) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        suffix = f".tmp{threading.get_ident()}"
+        with open(self._matrix_file + suffix, "wb") as f:
+            np.save(f, self.matrix.astype(np.float32))
+        with open(self._index_file + suffix, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model, "names": self.names, "counts": self.counts}, f, ensure_ascii=False)
+        os.replace(self._matrix_file + suffix, self._matrix_file)
+        os.replace(self._index_file + suffix, self._index_file)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.names
+
+    def fingerprint(self) -> Optional[str]:
+        """Önbellek anahtarları için içerik özeti (kayıt yoksa None)."""
+        if not self.names:
+            return None
+        digest = hashlib.sha256(json.dumps([self.names, self.counts]).encode("utf-8"))
+        digest.update(self.matrix.tobytes())
+        return digest.hexdigest()[:16]
+
+    def enroll(self, name: str, embeddings: np.ndarray) -> None:
+        """
+        Kişiyi ekler ya da ses izini günceller. embeddings: (n, D) normalize
+        gömmeler; var olan iz, önceki gömme sayısıyla ağırlıklı ortalanır.
+        """
+        embeddings = np.atleast_2d(embeddings)
+        embeddings = embeddings[np.isfinite(embeddings).all(axis=1)]
+        if not len(embeddings):
+            raise ValueError(f"'{name}' için geçerli gömme yok (kayıt çok kısa olabilir)")
+        with self._lock:
+            vector = embeddings.sum(axis=0)
+            if name in self.names:
+                i = self.names.index(name)
+                vector = vector + self.matrix[i] * self.counts[i]
+                self.matrix[i] = _normalize(vector)
+                self.counts[i] += len(embeddings)
+            else:
+                if self.matrix.size and self.matrix.shape[1] != vector.size:
+                    raise ValueError(f"Gömme boyutu uyuşmuyor: {vector.size} != {self.matrix.shape[1]}")
+                self.matrix = np.vstack([self.matrix.reshape(-1, vector.size), _normalize(vector)[None, :]])
+                self.names.append(name)
+                self.counts.append(len(embeddings))
+            self._save()
+
+    def remove(self, name: str) -> bool:
+        with self._lock:
+            if name not in self.names:
+                return False
+            i = self.names.index(name)
+            self.matrix = np.delete(self.matrix, i, axis=0)
+            del self.names[i], self.counts[i]
+            self._save()
+            return True
+
+    def identify(self, embeddings: np.ndarray, threshold: float = IDENTIFY_THRESHOLD
+                 ) -> List[Tuple[Optional[str], float]]:
+        """Her gömme için en yakın kayıtlı kişi ve benzerliği; eşiğin altındaysa (None, skor)."""
+        embeddings = np.atleast_2d(embeddings)
+        if not self.names:
+            return [(None, 0.0)] * len(embeddings)
+        sims = embeddings @ self.matrix.T
+        best = sims.argmax(axis=1)
+        return [(self.names[b] if sims[i, b] >= threshold else None, float(sims[i, b]))
+                for i, b in enumerate(best)]
+
+    def assign(self, centroids: Dict[str, np.ndarray], threshold: float = IDENTIFY_THRESHOLD
+               ) -> Dict[str, str]:
+        """
+        Küme etiketi -> kişi adı. Aynı kişi iki kümeye verilmez: çiftler
+        benzerliğe göre sıralanıp açgözlü (greedy) eşleştirilir.
+        """
+        if not self.names or not centroids:
+            return {}
+        labels = list(centroids)
+        sims = np.stack([centroids[l] for l in labels]) @ self.matrix.T
+        mapping: Dict[str, str] = {}
+        used = set()
+        for flat in np.argsort(sims, axis=None)[::-1]:
+            i, j = np.unravel_index(flat, sims.shape)
+            if sims[i, j] < threshold:
+                break
+            if labels[i] in mapping or j in used:
+                continue
+            mapping[labels[i]] = self.names[j]
+            used.add(j)
+        return mapping
+
+
+# -------------------------------
+# Diarization
+# -------------------------------
+def diarize(audio: np.ndarray, sr: int = SAMPLE_RATE, min_speakers: int = 1,
+            max_speakers: Optional[int] = None, speech: Optional[SpeechMap] = None,
+            voiceprints: Optional[VoiceprintStore] = None, threshold: float = CLUSTER_THRESHOLD,
+            device: str = "cpu") -> List[Turn]:
+    """Hızlı CPU diarization -> [(start, end, speaker), ...] (pyannote çıktısıyla aynı biçim)."""
+    speech = speech or detect_speech(audio, sr)
+    windows = speech_windows(speech.regions, sr)
+    with tracing.span("ecapa.model_load", model=SPEAKER_EMBEDDING_MODEL, device=device):
+        model = get_embedding_model(device=device)
+    with tracing.span("ecapa.embed", windows=len(windows)):
+        embeddings = embed_windows(audio, windows, model=model)
+    valid = np.isfinite(embeddings).all(axis=1)
+    windows, embeddings = windows[valid], embeddings[valid]
+    if not len(windows):
+        return []
+
+    with tracing.span("ecapa.cluster") as span:
+        clusterer = OnlineClusterer(threshold, max_speakers)
+        clusterer.partial_fit(embeddings)
+        labels = clusterer.finalize(embeddings, min_speakers=min_speakers)
+        span.set(speakers=int(labels.max()) + 1)
+
+    names = [f"SPEAKER_{k:02d}" for k in range(int(labels.max()) + 1)]
+    if voiceprints is not None and len(voiceprints):
+        centroids = {names[k]: _normalize(embeddings[labels == k].mean(axis=0)) for k in range(len(names))}
+        known = voiceprints.assign(centroids)
+        names = [known.get(n, n) for n in names]
+    return windows_to_turns(windows, labels, names, sr)
+
+
+def label_turns(audio: np.ndarray, turns: List[Turn], voiceprints: VoiceprintStore,
+                sr: int = SAMPLE_RATE, threshold: float = IDENTIFY_THRESHOLD) -> List[Turn]:
+    """Başka bir motorun (pyannote) anonim etiketlerini kayıtlı kişi adlarıyla değiştirir."""
+    if not len(voiceprints) or not turns:
+        return turns
+    with tracing.span("ecapa.identify", speakers=len({t[2] for t in turns})):
+        known = voiceprints.assign(speaker_centroids(audio, turns, sr), threshold)
+    return [(start, end, known.get(label, label)) for start, end, label in turns]
+
+
+def enroll_speakers(audio: np.ndarray, turns: List[Turn], names: Dict[str, str],
+                    voiceprints: VoiceprintStore, sr: int = SAMPLE_RATE) -> List[str]:
+    """Toplantıdaki etiketleri kişilere bağlar: {"SPEAKER_01": "Ayşe"}. Kaydedilen adları döner."""
+    selected = [t for t in turns if t[2] in names]
+    regions = _turn_regions(selected, sr)
+    enrolled = []
+    for label, spans in regions.items():
+        embeddings = embed_windows(audio, speech_windows(spans, sr))
+        try:
+            voiceprints.enroll(names[label], embeddings)
+            enrolled.append(names[label])
+        except ValueError as e:
+            print(f"⚠️ {e}")
+    return enrolled
+
+
+def _main(argv=None) -> None:
+    import argparse
+    from transcription.audio import load_audio
+
+    parser = argparse.ArgumentParser(description="ECAPA diarization ve ses izi kaydı")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("diarize", help="Kaydı konuşmacılara ayır")
+    p.add_argument("audio")
+    p.add_argument("--min-speakers", type=int, default=1)
+    p.add_argument("--max-speakers", type=int, default=None)
+    p = sub.add_parser("enroll", help="Tek kişilik bir kayıttan ses izi kaydet / güncelle")
+    p.add_argument("name")
+    p.add_argument("audio")
+    sub.add_parser("list", help="Kayıtlı kişiler")
+    p = sub.add_parser("remove", help="Kişiyi sil")
+    p.add_argument("name")
+    args = parser.parse_args(argv)
+
+    store = VoiceprintStore()
+    if args.command == "list":
+        for name, count in zip(store.names, store.counts):
+            print(f"{name:30s} {count:6d} pencere")
+        print(f"Toplam {len(store)} kişi ({store.path})")
+    elif args.command == "remove":
+        print("✅ Silindi." if store.remove(args.name) else f"❌ Kayıtlı değil: {args.name}")
+    elif args.command == "enroll":
+        audio = load_audio(args.audio)
+        speech = detect_speech(audio)
+        store.enroll(args.name, embed_windows(audio, speech_windows(speech.regions)))
+        print(f"✅ {args.name} kaydedildi ({speech.speech_seconds:.1f} sn konuşma)")
+    else:
+        audio = load_audio(args.audio)
+        for start, end, speaker in diarize(audio, min_speakers=args.min_speakers,
+                                           max_speakers=args.max_speakers, voiceprints=store):
+            print(f"⏱️ {start:7.2f}s - {end:7.2f}s --> {speaker}")
+
+
+if __name__ == "__main__":
+    _main()
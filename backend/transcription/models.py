@@ -0,0 +1,226 @@
+"""
+Süreç genelinde paylaşılan model kayıt defteri (Whisper + pyannote).
+
+Her model (tür, ad, cihaz, compute_type, yükleme seçenekleri) anahtarıyla bir
+kez yüklenir ve sonraki çağrılarda aynı nesne döner. num_workers gibi modeli
+değiştiren seçenekler anahtara girer (varsayılan değer = hiç verilmemiş);
+cpu_threads ve token girmez, aynı model tüm çağıranlarca paylaşılır. Toplam tahmini bellek bütçeyi aşarsa en
+uzun süredir kullanılmayan (LRU) model bırakılır. Yükleme tembeldir ve
+thread-safe'dir: aynı anahtarı isteyen iki thread modeli iki kez yüklemez,
+farklı anahtarlar birbirini beklemez.
+
+Modül olarak:
+    from transcription.models import get_whisper_model, prewarm
+    model = get_whisper_model("medium", device="cpu", compute_type="int8")
+    prewarm([("whisper", "medium", "cpu", "int8")])   # arka planda ısıt
+
+Ortam değişkenleri:
+    MODEL_MEMORY_BUDGET_MB  Bütçe (MB). Varsayılan 6000.
+    PYANNOTE_MEMORY_MB      pyannote hattının bellek tahmini (MB). Varsayılan 500.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+# (tür, ad, cihaz, compute_type, ((seçenek, değer), ...))
+ModelKey = Tuple[str, str, str, str, Tuple[Tuple[str, Any], ...]]
+
+DEFAULT_BUDGET_MB = float(os.getenv("MODEL_MEMORY_BUDGET_MB", "6000"))
+PYANNOTE_MEMORY_MB = float(os.getenv("PYANNOTE_MEMORY_MB", "500"))
+DIARIZATION_MODEL = "pyannote/speaker-diarization-3.1"
+
+# Yaklaşık parametre sayıları (milyon) -> bellek tahmini için
+_WHISPER_PARAMS_M = {
+    "tiny": 39, "base": 74, "small": 244, "medium": 769,
+    "large": 1550, "large-v1": 1550, "large-v2": 1550, "large-v3": 1550,
+    "distil-large-v2": 756, "distil-large-v3": 756,
+}
+# Anahtara girmeyen seçenekler: token gizli kalır; cpu_threads yalnızca hız ayarıdır,
+# paralel / sıralı / GUI çağrıları aynı modeli paylaşsın diye ilk yüklemeninki geçerlidir
+_KEYLESS_OPTIONS = {"token", "cpu_threads"}
+# Varsayılan değer (ya da 0 / None) verilmemiş sayılır: num_workers=1 ile hiç verilmemesi aynı model
+_OPTION_DEFAULTS = {"num_workers": 1}
+_BYTES_PER_PARAM = {
+    "int8": 1, "int8_float16": 1, "int8_bfloat16": 1, "int8_float32": 1,
+    "float16": 2, "bfloat16": 2, "float32": 4, "default": 4,
+}
+
+
+# -------------------------------
+# Yükleyiciler ve bellek tahminleri
+# -------------------------------
+def _load_whisper(name: str, device: str, compute_type: str, **options: Any) -> Any:
+    # Ağır import ilk kullanımda yapılır
+    from faster_whisper import WhisperModel
+    return WhisperModel(name, device=device, compute_type=compute_type, **options)
+
+
+def _load_pyannote(name: str, device: str, compute_type: str, **options: Any) -> Any:
+    import torch
+    from pyannote.audio import Pipeline
+    pipeline = Pipeline.from_pretrained(name, token=options.get("token"))
+    return pipeline.to(torch.device(device))
+
+
+def _whisper_size_mb(name: str, compute_type: str) -> float:
+    base = name.split("/")[-1].replace("faster-whisper-", "")
+    params = _WHISPER_PARAMS_M.get(base, 769)
+    return params * _BYTES_PER_PARAM.get(compute_type, 4)
+
+
+def _pyannote_size_mb(name: str, compute_type: str) -> float:
+    # segmentation + embedding modeli ve torch tamponları; cihaza göre değişir,
+    # ölçülen değer PYANNOTE_MEMORY_MB ile verilebilir
+    return PYANNOTE_MEMORY_MB
+
+
+_LOADERS: Dict[str, Callable[..., Any]] = {
+    "whisper": _load_whisper,
+    "pyannote": _load_pyannote,
+}
+_SIZERS: Dict[str, Callable[[str, str], float]] = {
+    "whisper": _whisper_size_mb,
+    "pyannote": _pyannote_size_mb,
+}
+
+
+def estimate_size_mb(kind: str, name: str, compute_type: str = "default") -> float:
+    """Bir modelin tahmini bellek boyutu (MB); bilinmeyen türlerde 0."""
+    return _SIZERS.get(kind, lambda n, c: 0.0)(name, compute_type)
+
+
+def register_loader(kind: str, loader: Callable[..., Any],
+                    size_mb: Optional[Callable[[str, str], float]] = None) -> None:
+    """Yeni bir model türü ekler (ör. embedding modeli)."""
+    _LOADERS[kind] = loader
+    if size_mb is not None:
+        _SIZERS[kind] = size_mb
+
+
+# -------------------------------
+# Kayıt defteri
+# -------------------------------
+class ModelRegistry:
+    """LRU + bellek bütçeli, thread-safe model önbelleği."""
+
+    def __init__(self, budget_mb: float = DEFAULT_BUDGET_MB):
+        self.budget_mb = budget_mb
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[ModelKey, Tuple[Any, float]]" = OrderedDict()
+        self._key_locks: Dict[ModelKey, threading.Lock] = {}
+
+    def get(self, kind: str, name: str, device: str = "cpu",
+            compute_type: str = "default", **options: Any) -> Any:
+        """
+        Modeli döndürür; yoksa yükler.
+
+        options (token, cpu_threads, num_workers vb.) yükleyiciye iletilir.
+        token ve cpu_threads anahtara girmez; num_workers gibi modelin nasıl
+        kullanılabileceğini değiştirenler varsayılan değerlerinden farklıysa
+        anahtara girer ve ayrı bir model örneği yüklenir.
+        """
+        key: ModelKey = (kind, name, device, compute_type, _options_key(options))
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Aynı anahtar için tek yükleyici; diğerleri burada bekler
+        with key_lock:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    return self._entries[key][0]
+
+            if kind not in _LOADERS:
+                raise KeyError(f"Bilinmeyen model türü: {kind}")
+            size_mb = estimate_size_mb(kind, name, compute_type)
+
+            # Yer aç (yüklemeden önce, tepe belleği düşük tutmak için)
+            self._evict(size_mb)
+            model = _LOADERS[kind](name, device, compute_type, **options)
+
+            with self._lock:
+                self._entries[key] = (model, size_mb)
+                self._key_locks.pop(key, None)
+            # Bütçe yükleme sırasında değiştiyse tekrar dengele
+            self._evict(0.0, keep=key)
+            return model
+
+    def _evict(self, incoming_mb: float, keep: Optional[ModelKey] = None) -> None:
+        with self._lock:
+            while self._entries and self.used_mb() + incoming_mb > self.budget_mb:
+                oldest = next(iter(self._entries))
+                if oldest == keep:
+                    break
+                model, _ = self._entries.pop(oldest)
+                print(f"♻️ Model bellekten çıkarıldı: {oldest[1]} ({oldest[0]}, {oldest[2]})")
+                del model
+
+    def used_mb(self) -> float:
+        return sum(size for _, size in self._entries.values())
+
+    def loaded(self) -> Iterable[ModelKey]:
+        with self._lock:
+            return list(self._entries)
+
+    def set_budget(self, budget_mb: float) -> None:
+        self.budget_mb = budget_mb
+        self._evict(0.0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def _options_key(options: Dict[str, Any]) -> Tuple[Tuple[str, Any], ...]:
+    return tuple(sorted((k, v) for k, v in options.items()
+                        if k not in _KEYLESS_OPTIONS and v not in (None, 0)
+                        and v != _OPTION_DEFAULTS.get(k)))
+
+
+REGISTRY = ModelRegistry()
+
+
+def get_whisper_model(name: str, device: str = "cpu", compute_type: str = "int8",
+                      **options: Any) -> Any:
+    """faster-whisper WhisperModel (paylaşımlı)."""
+    return REGISTRY.get("whisper", name, device, compute_type, **options)
+
+
+def get_diarization_pipeline(name: str = DIARIZATION_MODEL, device: str = "cpu",
+                             token: Optional[str] = None) -> Any:
+    """pyannote Pipeline (paylaşımlı)."""
+    return REGISTRY.get("pyannote", name, device, "float32", token=token)
+
+
+def prewarm(specs: Iterable[Tuple], on_done: Optional[Callable[[Optional[Exception]], None]] = None
+            ) -> threading.Thread:
+    """
+    Modelleri arka plan thread'inde yükler.
+
+    specs: [(tür, ad, cihaz, compute_type[, options dict]), ...]
+    on_done(hata): bitince çağrılır; başarılıysa hata None.
+    """
+    specs = list(specs)
+
+    def _run():
+        error = None
+        for spec in specs:
+            kind, name, device, compute_type = spec[:4]
+            options = spec[4] if len(spec) > 4 else {}
+            try:
+                REGISTRY.get(kind, name, device, compute_type, **options)
+            except Exception as e:
+                error = e
+                print(f"⚠️ Ön yükleme hatası ({name}): {e}")
+        if on_done:
+            on_done(error)
+
+    thread = threading.Thread(target=_run, name="model-prewarm", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,231 @@
+"""
+Sabit bellekli mikrofon kaydedici.
+
+Ses kartı callback'i blokları önceden ayrılmış bir halka tampona (ring
+buffer) kopyalar; arka plandaki yazıcı thread tamponu boşaltıp WAV dosyasına
+artımlı olarak yazar. Bellek kullanımı toplantı süresinden bağımsızdır,
+WAV başlığı her yazımda güncellendiği için çökmede de kayıt kaybolmaz.
+
+Varsayılan çıktı 16 kHz mono int16'dır; Whisper/pyannote için ayrıca
+yeniden örnekleme gerekmez. Cihaz 16 kHz açılamazsa kendi hızında açılır ve
+bloklar yazıcı thread'de akış halinde yeniden örneklenir.
+
+Kayıt sürerken de dosya bellek eşlemeli okunabilir (`source()` /
+`window()`, bkz. transcription/audio_source.py); son dakikayı işlemek için
+kaydın tamamı belleğe alınmaz.
+
+Modül olarak:
+    from transcription.recorder import Recorder
+    rec = Recorder("kayit.wav", on_block=print)   # on_block: 16 kHz float32 bloklar
+    rec.start(); ...
+    last_minute = rec.window(rec.seconds - 60, rec.seconds)
+    rec.stop()
+"""
+
+import threading
+import wave
+from typing import Callable, Optional
+
+import numpy as np
+
+from transcription.audio import SAMPLE_RATE
+from transcription.audio_source import AudioSource, open_audio
+
+try:
+    from scipy.signal import butter, sosfilt, sosfilt_zi  # type: ignore
+    _HAS_SCIPY = True
+except Exception:
+    _HAS_SCIPY = False
+
+
+class RingBuffer:
+    """Tek üretici / tek tüketici float32 halka tampon."""
+
+    def __init__(self, capacity: int):
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self._capacity = capacity
+        self._read = 0       # toplam okunan örnek
+        self._write = 0      # toplam yazılan örnek
+        self._lock = threading.Lock()
+        self.overflows = 0   # yazıcı yetişemediği için düşen örnek sayısı
+
+    def write(self, block: np.ndarray) -> None:
+        n = block.shape[0]
+        with self._lock:
+            free = self._capacity - (self._write - self._read)
+            if n > free:
+                self.overflows += n - free
+                block = block[:free]
+                n = free
+            start = self._write % self._capacity
+            first = min(n, self._capacity - start)
+            self._data[start:start + first] = block[:first]
+            self._data[:n - first] = block[first:]
+            self._write += n
+
+    def read(self) -> np.ndarray:
+        """Biriken tüm örnekleri (kopya olarak) döner."""
+        with self._lock:
+            n = self._write - self._read
+            start = self._read % self._capacity
+        if n == 0:
+            return self._data[:0].copy()
+        first = min(n, self._capacity - start)
+        out = np.concatenate((self._data[start:start + first], self._data[:n - first]))
+        with self._lock:
+            self._read += n
+        return out
+
+
+class StreamResampler:
+    """Bloklar arasında durum tutan yeniden örnekleyici (anti-alias + lineer enterpolasyon)."""
+
+    def __init__(self, in_rate: int, out_rate: int):
+        self.step = in_rate / out_rate
+        self._last = np.float32(0.0)
+        self._pos = 1.0   # bir sonraki çıktı örneğinin, [son örnek] + blok içindeki konumu
+        self._sos = None
+        if _HAS_SCIPY and out_rate < in_rate:
+            self._sos = butter(8, 0.45 * out_rate, fs=in_rate, output="sos")
+            self._zi = sosfilt_zi(self._sos) * 0.0
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        if self._sos is not None:
+            block, self._zi = sosfilt(self._sos, block, zi=self._zi)
+        x = np.concatenate(([self._last], block)).astype(np.float32)
+        last_index = x.size - 1
+        if last_index < self._pos:
+            self._pos -= x.size - 1
+            self._last = x[-1]
+            return np.zeros(0, dtype=np.float32)
+        n_out = int((last_index - self._pos) // self.step) + 1
+        t = self._pos + self.step * np.arange(n_out)
+        out = np.interp(t, np.arange(x.size), x).astype(np.float32)
+        self._pos = t[-1] + self.step - last_index
+        self._last = x[-1]
+        return out
+
+
+class Recorder:
+    """Halka tampon + arka plan yazıcı ile diske akan kaydedici."""
+
+    def __init__(self, path: str, samplerate: int = SAMPLE_RATE,
+                 buffer_seconds: float = 30.0,
+                 on_block: Optional[Callable[[np.ndarray], None]] = None):
+        self.path = path
+        self.samplerate = samplerate
+        self.buffer_seconds = buffer_seconds
+        self.on_block = on_block
+        self.frames_written = 0
+
+        self._stream = None
+        self._ring: Optional[RingBuffer] = None
+        self._resampler: Optional[StreamResampler] = None
+        self._file = None
+        self._wav: Optional[wave.Wave_write] = None
+        self._file_lock = threading.Lock()
+        self._data_ready = threading.Event()
+        self._stopping = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+
+    # -------------------------------
+    # Ses kartı tarafı
+    # -------------------------------
+    def _callback(self, indata, frames, time_info, status) -> None:
+        # Ses thread'inde: sadece kopyala ve yazıcıyı uyandır
+        self._ring.write(indata[:, 0])
+        self._data_ready.set()
+
+    def _open_stream(self):
+        import sounddevice as sd
+        try:
+            stream = sd.InputStream(samplerate=self.samplerate, channels=1,
+                                    dtype="float32", callback=self._callback)
+            return stream, self.samplerate
+        except sd.PortAudioError:
+            # Cihaz 16 kHz desteklemiyor -> kendi hızında aç, yazıcıda çevir
+            rate = int(sd.query_devices(kind="input")["default_samplerate"])
+            stream = sd.InputStream(samplerate=rate, channels=1,
+                                    dtype="float32", callback=self._callback)
+            return stream, rate
+
+    # -------------------------------
+    # Yazıcı thread
+    # -------------------------------
+    def _drain(self) -> None:
+        block = self._ring.read()
+        if block.size == 0:
+            return
+        if self._resampler is not None:
+            block = self._resampler.process(block)
+        pcm = (np.clip(block, -1.0, 1.0) * 32767.0).astype("<i2")
+        # wave her writeframes'te başlığı günceller -> dosya her an geçerli
+        with self._file_lock:
+            self._wav.writeframes(pcm.tobytes())
+            # Eşlemeyle okuyanlar (source / window) yeni blokları görsün
+            self._file.flush()
+            self.frames_written += pcm.size
+        if self.on_block is not None:
+            self.on_block(block)
+
+    def _writer_loop(self) -> None:
+        while not self._stopping.is_set():
+            self._data_ready.wait(timeout=0.2)
+            self._data_ready.clear()
+            self._drain()
+        self._drain()
+
+    # -------------------------------
+    # Dış API
+    # -------------------------------
+    def start(self) -> None:
+        stream, device_rate = self._open_stream()
+        self._ring = RingBuffer(int(self.buffer_seconds * device_rate))
+        if device_rate != self.samplerate:
+            self._resampler = StreamResampler(device_rate, self.samplerate)
+
+        self._file = open(self.path, "wb")
+        self._wav = wave.open(self._file, "wb")
+        self._wav.setnchannels(1)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(self.samplerate)
+
+        self._writer = threading.Thread(target=self._writer_loop, name="recorder-writer", daemon=True)
+        self._writer.start()
+        self._stream = stream
+        stream.start()
+
+    def stop(self) -> float:
+        """Kaydı durdurur, dosyayı kapatır; kaydedilen süreyi (sn) döner."""
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+        self._stopping.set()
+        self._data_ready.set()
+        if self._writer is not None:
+            self._writer.join()
+        if self._wav is not None:
+            with self._file_lock:
+                self._wav.close()
+                self._file.close()
+                self._wav = self._file = None
+        return self.frames_written / self.samplerate
+
+    @property
+    def seconds(self) -> float:
+        """Şu ana kadar diske yazılan süre."""
+        return self.frames_written / self.samplerate
+
+    def source(self) -> AudioSource:
+        """Kaydın o ana kadarki hali, bellek eşlemeli (kayıt sürerken de çağrılabilir)."""
+        with self._file_lock:
+            return open_audio(self.path, self.samplerate)
+
+    def window(self, start: float, end: float) -> np.ndarray:
+        """Kayıttan [start, end) sn penceresi (float32); yalnızca o pencere okunur."""
+        return self.source().window(max(0.0, start), end)
+
+    @property
+    def overflows(self) -> int:
+        return self._ring.overflows if self._ring else 0
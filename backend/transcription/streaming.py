@@ -0,0 +1,163 @@
+"""
+Kayıt sırasında canlı (streaming) transkripsiyon.
+
+Mikrofondan gelen 16 kHz mono bloklar kayan bir pencerede birikir; her
+`step_seconds` kadar yeni ses geldiğinde pencere yeniden çözülür. İki ardışık
+çözümün ortak ön eki (LocalAgreement-2) kesinleşmiş (committed) kabul edilip
+dışarı verilir, pencere kesinleşen son kelimeden kırpılır. Kayıt bitince
+yalnızca kesinleşmemiş kuyruk bir kez daha çözülür.
+
+Modül olarak:
+    from transcription.streaming import StreamingTranscriber, format_words
+    st = StreamingTranscriber(lang="tr")
+    st.feed(block)                      # 16 kHz mono float32
+    print(format_words(st.process()))   # kesinleşen yeni kelimeler
+    tail = st.finish()
+"""
+
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from transcription.audio import SAMPLE_RATE
+from transcription.whisper import DEFAULT_COMPUTE, DEFAULT_DEVICE, _get_model
+
+# Canlı modda gecikme için daha küçük model varsayılan
+STREAM_MODEL = os.getenv("STREAM_MODEL_NAME", "small")
+
+_NORMALIZE = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def _norm(word: str) -> str:
+    return _NORMALIZE.sub("", word).lower()
+
+
+class StreamingTranscriber:
+    """Artımlı Whisper çözücü (tek thread'den kullanılmalı)."""
+
+    def __init__(self, lang: Optional[str] = "tr",
+                 model_name: str = STREAM_MODEL,
+                 device: str = DEFAULT_DEVICE,
+                 compute_type: str = DEFAULT_COMPUTE,
+                 step_seconds: float = 2.0,
+                 max_window_seconds: float = 25.0,
+                 beam_size: int = 1):
+        self.lang = lang
+        self.model = _get_model(model_name=model_name, device=device, compute_type=compute_type)
+        self.step = int(step_seconds * SAMPLE_RATE)
+        self.max_window = int(max_window_seconds * SAMPLE_RATE)
+        self.beam_size = beam_size
+
+        self._blocks: List[np.ndarray] = []
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._buffer_offset = 0          # penceredeki ilk örneğin global indeksi
+        self._pending = 0                # son çözümden beri gelen örnek sayısı
+        self._hypothesis: List[Dict[str, Any]] = []  # kesinleşmemiş kelimeler
+        self.committed: List[Dict[str, Any]] = []
+        self.committed_end = 0.0
+
+    # -------------------------------
+    # Girdi
+    # -------------------------------
+    def feed(self, samples: np.ndarray) -> None:
+        """16 kHz mono float32 blok ekler (çözme yapmaz)."""
+        if samples.size:
+            self._blocks.append(np.asarray(samples, dtype=np.float32).reshape(-1))
+            self._pending += samples.size
+
+    def _collect(self) -> None:
+        if self._blocks:
+            self._buffer = np.concatenate([self._buffer] + self._blocks)
+            self._blocks = []
+
+    # -------------------------------
+    # Çözme
+    # -------------------------------
+    def _decode(self) -> List[Dict[str, Any]]:
+        offset = self._buffer_offset / SAMPLE_RATE
+        prompt = "".join(w["word"] for w in self.committed[-30:]).strip() or None
+        segments, _ = self.model.transcribe(
+            self._buffer,
+            language=self.lang,
+            beam_size=self.beam_size,
+            word_timestamps=True,
+            condition_on_previous_text=False,
+            initial_prompt=prompt,
+            vad_filter=False,
+        )
+        words = []
+        for s in segments:
+            for w in (s.words or []):
+                start, end = w.start + offset, w.end + offset
+                # Önceden kesinleşmiş bölgeye düşen kelimeleri atla
+                if (start + end) / 2 >= self.committed_end:
+                    words.append({"start": start, "end": end, "word": w.word})
+        return words
+
+    def _commit(self, words: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if words:
+            self.committed.extend(words)
+            self.committed_end = words[-1]["end"]
+        return words
+
+    def _trim(self) -> None:
+        """Pencere uzadıysa kesinleşmiş kısmı at; hiç kesinleşme yoksa eski kelimeleri zorla kesinleştir."""
+        if self._buffer.size <= self.max_window:
+            return
+        buffer_end = (self._buffer_offset + self._buffer.size) / SAMPLE_RATE
+        if self.committed_end <= self._buffer_offset / SAMPLE_RATE:
+            limit = buffer_end - self.max_window / SAMPLE_RATE / 2
+            forced = [w for w in self._hypothesis if w["end"] <= limit]
+            self._hypothesis = self._hypothesis[len(forced):]
+            self._commit(forced)
+        cut_at = int(self.committed_end * SAMPLE_RATE)
+        # Kesinleşme olmasa da pencere max_window'u aşmasın (ör. uzun sessizlik)
+        cut_at = max(cut_at, self._buffer_offset + self._buffer.size - self.max_window)
+        drop = min(self._buffer.size, max(0, cut_at - self._buffer_offset))
+        self._buffer = self._buffer[drop:]
+        self._buffer_offset += drop
+
+    def process(self) -> List[Dict[str, Any]]:
+        """
+        Yeterli yeni ses varsa pencereyi çözer.
+        Yeni kesinleşen kelimeleri döner: [{"start", "end", "word"}, ...]
+        """
+        if self._pending < self.step:
+            return []
+        self._collect()
+        self._pending = 0
+
+        hypothesis = self._decode()
+        agreed = 0
+        for old, new in zip(self._hypothesis, hypothesis):
+            if _norm(old["word"]) != _norm(new["word"]):
+                break
+            agreed += 1
+        committed = self._commit(hypothesis[:agreed])
+        self._hypothesis = hypothesis[agreed:]
+        self._trim()
+        return committed
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """Kayıt bitti: kalan kuyruğu bir kez çözüp tamamını kesinleştirir."""
+        self._collect()
+        self._pending = 0
+        if self._buffer.size == 0:
+            return self._commit(self._hypothesis)
+        tail = self._commit(self._decode())
+        self._hypothesis = []
+        return tail
+
+    @property
+    def text(self) -> str:
+        return "".join(w["word"] for w in self.committed).strip()
+
+
+def format_words(words: List[Dict[str, Any]]) -> str:
+    """Kesinleşen kelimeleri `[12.34s] ...` satırına çevirir."""
+    if not words:
+        return ""
+    text = "".join(w["word"] for w in words).strip()
+    return f"[{words[0]['start']:.2f}s] {text}"
@@ -0,0 +1,406 @@
+"""
+Aşama bazlı izleme (tracing) ve profil kancaları.
+
+Bir çalıştırma bir `Tracer`'dır; her aşama iç içe geçebilen bir `span`'dir.
+Her span için tutulanlar: başlangıç/bitiş, thread, başlangıç/bitiş RSS'i,
+bitişteki süreç tepe RSS'i, işlenen ses saniyesi ve buradan gerçek zaman
+oranı (RTF = süre / ses süresi). main.py'deki eski StageTimer'ın yerini alır;
+`tracer.stages` ve `tracer.report()` aynı şekli korur.
+
+- Olay akışı: span başında/sonunda abonelere düz dict gider (GUI log'u,
+  sunucu SSE'si). `format_event` tek satırlık metne çevirir.
+- Dışa aktarım: Chrome trace JSON (chrome://tracing, Perfetto, speedscope).
+- Profil: TRACE_PROFILE=cprofile her üst düzey span için .prof yazar
+  (snakeviz / pstats); TRACE_PROFILE=py-spy süreç boyunca py-spy kaydı alır.
+
+Derin kod tracer'ı parametre olarak almaz; etkin tracer context'te tutulur:
+    from transcription import tracing
+    with tracing.Tracer("pipeline", on_event=print) as tracer:
+        with tracing.span("decode") as s:
+            audio = load_audio(path)
+            s.set(audio_seconds=audio.size / 16000)
+        pool.submit(tracing.bind(work))          # başka thread'de de aynı tracer
+    tracer.export("run.trace.json")
+
+Ortam değişkenleri:
+    TRACE_DIR       Verilirse her tracer bitince <ad>-<zaman>.trace.json yazılır
+    TRACE_PROFILE   cprofile | py-spy (boş: kapalı)
+"""
+
+import contextvars
+import itertools
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+TRACE_DIR = os.getenv("TRACE_DIR") or None
+TRACE_PROFILE = os.getenv("TRACE_PROFILE", "").lower() or None
+
+_current: "contextvars.ContextVar[Optional[Tracer]]" = contextvars.ContextVar("tracer", default=None)
+_ids = itertools.count(1)
+
+
+# -------------------------------
+# Bellek
+# -------------------------------
+def current_rss_mb() -> Optional[float]:
+    """Şu anki RSS (MB); ölçülemiyorsa None."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except Exception:
+        return None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Süreç başından beri tepe RSS (MB)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux KB, macOS bayt döner
+        return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    except ImportError:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+        except Exception:
+            return None
+
+
+# -------------------------------
+# Span
+# -------------------------------
+class Span:
+    """Tek bir ölçüm aralığı. Süreler tracer başlangıcına göre saniyedir."""
+
+    __slots__ = ("id", "name", "parent", "thread", "start", "end", "rss_start", "rss_end",
+                 "peak_rss", "attrs", "error")
+
+    def __init__(self, name: str, parent: Optional[int], start: float, attrs: Dict[str, Any]):
+        self.id = next(_ids)
+        self.name = name
+        self.parent = parent
+        self.thread = threading.current_thread().name
+        self.start = start
+        self.end: Optional[float] = None
+        self.rss_start = current_rss_mb()
+        self.rss_end: Optional[float] = None
+        self.peak_rss: Optional[float] = None
+        self.attrs = attrs
+        self.error: Optional[str] = None
+
+    def set(self, **attrs: Any) -> None:
+        """Ek bilgi (ör. audio_seconds, model, kelime sayısı)."""
+        self.attrs.update(attrs)
+
+    @property
+    def duration(self) -> Optional[float]:
+        return None if self.end is None else self.end - self.start
+
+    @property
+    def rtf(self) -> Optional[float]:
+        audio = self.attrs.get("audio_seconds")
+        if not audio or self.end is None:
+            return None
+        return self.duration / audio
+
+    def to_dict(self) -> Dict[str, Any]:
+        def r(value, digits=4):
+            return None if value is None else round(value, digits)
+        return {
+            "id": self.id, "name": self.name, "parent": self.parent, "thread": self.thread,
+            "start": r(self.start), "end": r(self.end), "duration": r(self.duration),
+            "rss_start_mb": r(self.rss_start, 1), "rss_end_mb": r(self.rss_end, 1),
+            "peak_rss_mb": r(self.peak_rss, 1), "rtf": r(self.rtf), "error": self.error,
+            **self.attrs,
+        }
+
+
+class _NullSpan:
+    """Etkin tracer yokken `span()` bunu verir; çağrılar boşa gider."""
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+# -------------------------------
+# Tracer
+# -------------------------------
+class Tracer:
+    """Bir çalıştırmanın span'lerini toplar, olay yayınlar, dışa aktarır. Thread-safe."""
+
+    def __init__(self, name: str = "pipeline", on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 trace_dir: Optional[str] = TRACE_DIR, profile: Optional[str] = TRACE_PROFILE):
+        self.name = name
+        self.origin = time.perf_counter()
+        self.wall_origin = time.time()
+        self.spans: List[Span] = []
+        self.trace_dir = trace_dir
+        self.profile = profile
+        self._lock = threading.Lock()
+        self._stack = threading.local()
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = [on_event] if on_event else []
+        self._token = None
+        self._pyspy: Optional[subprocess.Popen] = None
+
+    # --- olaylar ---
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def _emit(self, kind: str, span: Span) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return
+        event = {"type": kind, "trace": self.name, **span.to_dict()}
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"⚠️ İzleme dinleyicisi hata verdi: {e}")
+
+    # --- span'ler ---
+    def _parents(self) -> List[Span]:
+        stack = getattr(self._stack, "spans", None)
+        if stack is None:
+            stack = self._stack.spans = []
+        return stack
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any):
+        """Bir aşamayı ölçer; içinde `.set(...)` ile bilgi eklenebilir. Hata span'e yazılıp yükselir."""
+        stack = self._parents()
+        parent = stack[-1].id if stack else None
+        span = Span(name, parent, time.perf_counter() - self.origin, attrs)
+        stack.append(span)
+        self._emit("span_start", span)
+        profiler = self._start_cprofile() if parent is None else None
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if profiler is not None:
+                self._stop_cprofile(profiler, span)
+            span.end = time.perf_counter() - self.origin
+            span.rss_end = current_rss_mb()
+            span.peak_rss = peak_rss_mb()
+            stack.pop()
+            with self._lock:
+                self.spans.append(span)
+            self._emit("span_end", span)
+
+    # --- etkinleştirme ---
+    def __enter__(self) -> "Tracer":
+        self._token = _current.set(self)
+        if self.profile == "py-spy":
+            self._start_pyspy()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._token is not None:
+            _current.reset(self._token)
+            self._token = None
+        self._stop_pyspy()
+        if self.trace_dir:
+            stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.wall_origin))
+            try:
+                self.export(os.path.join(self.trace_dir, f"{self.name}-{stamp}.trace.json"))
+            except OSError as e:
+                print(f"⚠️ İz dosyası yazılamadı: {e}")
+
+    # --- profil ---
+    def _start_cprofile(self):
+        if self.profile != "cprofile":
+            return None
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Bu thread'de başka bir profilleyici zaten açık
+            return None
+        return profiler
+
+    def _stop_cprofile(self, profiler, span: Span) -> None:
+        profiler.disable()
+        out_dir = self.trace_dir or "."
+        os.makedirs(out_dir, exist_ok=True)
+        path = os.path.join(out_dir, f"{self.name}-{span.name}-{span.id}.prof")
+        profiler.dump_stats(path)
+        span.set(profile=path)
+
+    def _start_pyspy(self) -> None:
+        out_dir = self.trace_dir or "."
+        os.makedirs(out_dir, exist_ok=True)
+        path = os.path.join(out_dir, f"{self.name}-{os.getpid()}.speedscope.json")
+        try:
+            self._pyspy = subprocess.Popen(
+                ["py-spy", "record", "--pid", str(os.getpid()), "--threads", "--native",
+                 "--format", "speedscope", "--output", path],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            print(f"⚠️ py-spy başlatılamadı: {e}")
+
+    def _stop_pyspy(self) -> None:
+        if self._pyspy is None:
+            return
+        # py-spy Ctrl+C ile kaydı dosyaya yazıp çıkar
+        if os.name == "posix":
+            self._pyspy.send_signal(signal.SIGINT)
+        else:
+            self._pyspy.terminate()
+        try:
+            self._pyspy.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self._pyspy.kill()
+        self._pyspy = None
+
+    # --- raporlar ---
+    def finished(self) -> List[Span]:
+        with self._lock:
+            return sorted(self.spans, key=lambda s: s.start)
+
+    @property
+    def stages(self) -> List[Tuple[str, float, float]]:
+        """Üst düzey span'ler: [(ad, başlangıç, bitiş), ...] (eski StageTimer.stages şekli)."""
+        return [(s.name, s.start, s.end) for s in self.finished() if s.parent is None]
+
+    def report(self) -> str:
+        top = [s for s in self.finished() if s.parent is None]
+        if not top:
+            return ""
+        by_parent: Dict[Optional[int], List[Span]] = {}
+        for s in self.finished():
+            by_parent.setdefault(s.parent, []).append(s)
+
+        lines = ["⏱️  Aşama süreleri:"]
+
+        def emit(span: Span, depth: int) -> None:
+            extra = ""
+            if span.rtf is not None:
+                extra += f"  RTF {span.rtf:.3f}"
+            if span.rss_end is not None and span.rss_start is not None:
+                extra += f"  RSS {span.rss_end:.0f} MB ({span.rss_end - span.rss_start:+.0f})"
+            if span.error:
+                extra += f"  ❌ {span.error}"
+            name = "  " * depth + span.name
+            lines.append(f"   {name:<24} {span.start:8.2f}s → {span.end:8.2f}s  ({span.duration:.2f}s){extra}")
+            for child in by_parent.get(span.id, []):
+                emit(child, depth + 1)
+
+        for span in top:
+            emit(span, 0)
+        wall = max(s.end for s in top) - min(s.start for s in top)
+        busy = sum(s.duration for s in top)
+        lines.append(f"   Toplam aşama süresi: {busy:.2f}s | Duvar saati: {wall:.2f}s | "
+                     f"Çakışma kazancı: {busy - wall:.2f}s")
+        peak = peak_rss_mb()
+        if peak is not None:
+            lines.append(f"   Tepe bellek (RSS): {peak:.0f} MB")
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "started": self.wall_origin,
+                "spans": [s.to_dict() for s in self.finished()]}
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """chrome://tracing / Perfetto 'complete' (ph=X) olayları + RSS sayaçları."""
+        pid = os.getpid()
+        threads: Dict[str, int] = {}
+        events: List[Dict[str, Any]] = []
+        for s in self.finished():
+            tid = threads.setdefault(s.thread, len(threads) + 1)
+            args = {k: v for k, v in s.to_dict().items() if k not in ("name", "start", "end", "thread")}
+            events.append({"name": s.name, "cat": self.name, "ph": "X", "pid": pid, "tid": tid,
+                           "ts": round(s.start * 1e6), "dur": round((s.duration or 0.0) * 1e6),
+                           "args": args})
+            if s.rss_end is not None:
+                events.append({"name": "rss_mb", "ph": "C", "pid": pid, "ts": round(s.end * 1e6),
+                               "args": {"rss": round(s.rss_end, 1)}})
+        for name, tid in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+        return {"traceEvents": events, "displayTimeUnit": "ms",
+                "otherData": {"trace": self.name, "started": self.wall_origin}}
+
+    def export(self, path: str) -> str:
+        """Chrome trace JSON yazar (.json); yolu döner."""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f, ensure_ascii=False)
+        os.replace(tmp, path)
+        return path
+
+
+# -------------------------------
+# Etkin tracer yardımcıları
+# -------------------------------
+def current() -> Optional[Tracer]:
+    return _current.get()
+
+
+def span(name: str, **attrs: Any):
+    """Etkin tracer varsa onun span'i, yoksa hiçbir şey yapmayan bağlam."""
+    tracer = _current.get()
+    if tracer is None:
+        return nullcontext(_NULL_SPAN)
+    return tracer.span(name, **attrs)
+
+
+@contextmanager
+def activate(tracer: Optional[Tracer]):
+    """Bu thread/context'te tracer'ı etkinleştirir (None -> değişiklik yok)."""
+    if tracer is None:
+        yield None
+        return
+    token = _current.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _current.reset(token)
+
+
+def bind(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Çağrı anındaki tracer'ı yakalar; fn başka thread'de çalışsa da span'ler ona gider."""
+    tracer = _current.get()
+    if tracer is None:
+        return fn
+
+    def wrapper(*args, **kwargs):
+        with activate(tracer):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def format_event(event: Dict[str, Any]) -> Optional[str]:
+    """span_end olayını GUI log satırına çevirir; diğer olaylar için None."""
+    if event.get("type") != "span_end":
+        return None
+    indent = "   " if event.get("parent") else ""
+    parts = [f"{indent}⏱️ {event['name']}: {event['duration']:.2f} sn"]
+    if event.get("rtf") is not None:
+        parts.append(f"RTF {event['rtf']:.3f}")
+    if event.get("rss_end_mb") is not None:
+        parts.append(f"RSS {event['rss_end_mb']:.0f} MB")
+    if event.get("error"):
+        parts.append(f"❌ {event['error']}")
+    return " · ".join(parts)
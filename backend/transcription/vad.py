@@ -0,0 +1,295 @@
+"""
+Ortak ses etkinliği tespiti (VAD) aşaması.
+
+Konuşma bölgeleri bir kez bulunur; Whisper ve pyannote'a yalnızca bu
+bölgelerden oluşan sıkıştırılmış (compact) ses verilir. Kayıt bir
+`AudioSource` ise sıkıştırılmış ses de bölge bölge diske yazılıp bellek
+eşlemeli açılır (`compact_source`); tepe bellek kayıt süresiyle büyümez. Bölgeler arasına kısa
+bir sessizlik konur ki modeller iki ayrı cümleyi birleştirmesin. Modellerin
+çıktısındaki zamanlar `SpeechMap` ile orijinal kayıt zamanına tam olarak geri
+çevrilir (kelime, segment ve konuşmacı turn'leri). Seyrek kayıtlarda (uzun
+aralar, boş bekleme) işlem süresi sessizlik oranında düşer.
+
+Dedektörler:
+    energy  Vektörize çerçeve enerjisi (dBFS) + uyarlanır eşik; bağımlılık yok.
+    silero  faster-whisper ile gelen Silero VAD modeli (daha isabetli, ~1 ms/sn).
+Yenileri `register_detector` ile eklenir.
+
+Modül olarak:
+    from transcription.vad import detect_speech
+    speech = detect_speech(audio)             # SpeechMap
+    compact = speech.compact_source(source).samples()   # ya da speech.compact(audio)
+    words = speech.map_words(transcribe(compact))
+    turns = speech.map_turns(diarize(compact))
+
+Ortam değişkenleri:
+    PIPELINE_VAD=0          VAD'ı kapatır (tüm ses işlenir)
+    VAD_BACKEND             energy | silero (varsayılan energy)
+    VAD_MIN_SILENCE         Bundan kısa sessizlikler kesilmez, sn (varsayılan 1.0)
+    VAD_PAD                 Bölgelerin iki yanına eklenen pay, sn (varsayılan 0.2)
+"""
+
+import hashlib
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from transcription.audio import SAMPLE_RATE, frame_rms
+
+VAD_ENABLED = os.getenv("PIPELINE_VAD", "1") != "0"
+VAD_BACKEND = os.getenv("VAD_BACKEND", "energy")
+MIN_SILENCE_SECONDS = float(os.getenv("VAD_MIN_SILENCE", "1.0"))
+PAD_SECONDS = float(os.getenv("VAD_PAD", "0.2"))
+MIN_SPEECH_SECONDS = 0.25
+# Sıkıştırılmış seste bölgeler arasına konan sessizlik
+GAP_SECONDS = 0.3
+# compact_source'ta bir seferde okunan örnek sayısı (~4 MB float32)
+_BLOCK_FRAMES = 1 << 20
+# Konuşma oranı bunun üstündeyse kesmeye değmez; ses olduğu gibi kullanılır
+MAX_SPEECH_RATIO = 0.95
+
+_FRAME_MS = 30
+_MARGIN_DB = 10.0
+_FLOOR_DB = -55.0
+_DYNAMIC_DB = 20.0
+
+
+# -------------------------------
+# Bölge işlemleri (örnek indeksleri, [başlangıç, bitiş))
+# -------------------------------
+def _runs(mask: np.ndarray) -> np.ndarray:
+    """True bloklarının (k, 2) [başlangıç, bitiş) indeksleri."""
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    return np.stack((np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)), axis=1)
+
+
+def _merge(regions: np.ndarray, max_gap: int) -> np.ndarray:
+    """Aralarındaki boşluk max_gap'ten küçük (ya da örtüşen) bölgeleri birleştirir."""
+    if len(regions) < 2:
+        return regions
+    regions = regions[np.argsort(regions[:, 0], kind="stable")]
+    ends = np.maximum.accumulate(regions[:, 1])
+    new_group = np.concatenate(([True], regions[1:, 0] - ends[:-1] >= max_gap))
+    starts = regions[new_group, 0]
+    group_ends = np.maximum.reduceat(regions[:, 1], np.flatnonzero(new_group))
+    return np.stack((starts, group_ends), axis=1)
+
+
+def postprocess(regions: np.ndarray, total: int, sr: int = SAMPLE_RATE,
+                min_silence: float = MIN_SILENCE_SECONDS, min_speech: float = MIN_SPEECH_SECONDS,
+                pad: float = PAD_SECONDS) -> np.ndarray:
+    """Kısa sessizlikleri kapatır, kısa konuşmaları atar, pay ekler, örtüşenleri birleştirir."""
+    regions = np.asarray(regions, dtype=np.int64).reshape(-1, 2)
+    if not len(regions):
+        return regions
+    regions = _merge(regions, int(min_silence * sr))
+    regions = regions[regions[:, 1] - regions[:, 0] >= int(min_speech * sr)]
+    p = int(pad * sr)
+    regions = np.stack((np.maximum(regions[:, 0] - p, 0), np.minimum(regions[:, 1] + p, total)), axis=1)
+    return _merge(regions, 1)
+
+
+# -------------------------------
+# Dedektörler: fn(audio, sr) -> (k, 2) örnek indeksi
+# -------------------------------
+def energy_regions(audio: np.ndarray, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Çerçeve RMS'i (dBFS); eşik = gürültü tabanı (10. yüzdelik) + 10 dB, en az -55 dBFS.
+    Kayıt baştan sona konuşmaysa eşik yüksek seviyenin 20 dB altına çekilir.
+    """
+    hop = max(1, int(sr * _FRAME_MS / 1000))
+    n = audio.size // hop
+    if n == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+    rms = frame_rms(audio, hop)
+    db = 20.0 * np.log10(rms + 1e-10)
+    noise, loud = np.percentile(db, (10, 95))
+    threshold = min(max(noise + _MARGIN_DB, _FLOOR_DB), loud - _DYNAMIC_DB)
+    regions = _runs(db > threshold) * hop
+    if len(regions) and regions[-1, 1] == n * hop:
+        regions[-1, 1] = audio.size
+    return regions
+
+
+def silero_regions(audio: np.ndarray, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """faster-whisper'ın Silero VAD'ı (model pakette gelir, indirme yok)."""
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+    # Pay ve kısa sessizlik birleştirme postprocess'te; burada iki kez uygulanmasın
+    options = VadOptions(min_silence_duration_ms=int(MIN_SILENCE_SECONDS * 1000), speech_pad_ms=0)
+    stamps = get_speech_timestamps(audio, options, sampling_rate=sr)
+    return np.array([(s["start"], s["end"]) for s in stamps], dtype=np.int64).reshape(-1, 2)
+
+
+_DETECTORS: Dict[str, Callable[[np.ndarray, int], np.ndarray]] = {
+    "energy": energy_regions,
+    "silero": silero_regions,
+}
+
+
+def register_detector(name: str, detector: Callable[[np.ndarray, int], np.ndarray]) -> None:
+    """Yeni dedektör ekler: detector(audio, sr) -> (k, 2) [başlangıç, bitiş) örnek indeksi."""
+    _DETECTORS[name] = detector
+
+
+# -------------------------------
+# Zaman eşlemesi
+# -------------------------------
+class SpeechMap:
+    """Konuşma bölgeleri + sıkıştırılmış ses ↔ orijinal zaman eşlemesi."""
+
+    def __init__(self, regions: np.ndarray, total: int, sr: int = SAMPLE_RATE, gap_seconds: float = GAP_SECONDS):
+        self.regions = np.asarray(regions, dtype=np.int64).reshape(-1, 2)
+        self.total = int(total)
+        self.sr = sr
+        self.gap = int(gap_seconds * sr) if len(self.regions) > 1 else 0
+        lengths = self.regions[:, 1] - self.regions[:, 0]
+        self.lengths = lengths
+        # Her bölgenin sıkıştırılmış sesteki başlangıcı
+        self.starts = np.concatenate(([0], np.cumsum(lengths + self.gap)[:-1])).astype(np.int64)
+
+    @classmethod
+    def identity(cls, total: int, sr: int = SAMPLE_RATE) -> "SpeechMap":
+        return cls(np.array([[0, total]]), total, sr)
+
+    @property
+    def is_identity(self) -> bool:
+        return len(self.regions) == 1 and self.regions[0, 0] == 0 and self.regions[0, 1] == self.total
+
+    @property
+    def speech_seconds(self) -> float:
+        return float(self.lengths.sum()) / self.sr
+
+    @property
+    def total_seconds(self) -> float:
+        return self.total / self.sr
+
+    @property
+    def ratio(self) -> float:
+        return self.speech_seconds / self.total_seconds if self.total else 0.0
+
+    def compact(self, audio: np.ndarray) -> np.ndarray:
+        """
+        Yalnızca konuşma bölgeleri (aralarında GAP_SECONDS sessizlik), bellekte yeni
+        bir dizi olarak; uzun kayıtlarda compact_source tercih edilir.
+        """
+        if self.is_identity:
+            return audio
+        if not len(self.regions):
+            return audio[:0]
+        out = np.zeros(int(self.lengths.sum()) + self.gap * (len(self.regions) - 1), dtype=audio.dtype)
+        for (a, b), start in zip(self.regions, self.starts):
+            out[start:start + b - a] = audio[a:b]
+        return out
+
+    def compact_source(self, source):
+        """
+        compact() ile aynı ses, ama bellekte tek dizi yerine AudioSource olarak:
+        bölgeler kaynaktan blok blok okunup önbelleğe yazılır ve eşlenmiş açılır.
+        """
+        if self.is_identity:
+            return source.mapped()
+        from transcription.audio_source import derive
+        tag = hashlib.sha1(self.regions.tobytes() + str(self.gap).encode()).hexdigest()[:16]
+
+        def blocks():
+            for i, (a, b) in enumerate(self.regions):
+                if i:
+                    yield np.zeros(self.gap, dtype=np.float32)
+                for start in range(int(a), int(b), _BLOCK_FRAMES):
+                    yield source.read(start, min(int(b), start + _BLOCK_FRAMES))
+        return derive(source, f"vad{tag}", blocks)
+
+    def to_original(self, seconds, side: str = "start"):
+        """
+        Sıkıştırılmış zaman(lar)ı orijinal zamana çevirir (skaler ya da dizi).
+        Araya konan sessizliğe düşen bir zaman, side="start" ise sonraki bölgenin
+        başına, "end" ise önceki bölgenin sonuna çekilir.
+        """
+        t = np.asarray(seconds, dtype=np.float64) * self.sr
+        if not len(self.regions):
+            return np.zeros_like(t) if t.ndim else 0.0
+        i = np.clip(np.searchsorted(self.starts, t, side="right") - 1, 0, len(self.regions) - 1)
+        offset = np.maximum(t - self.starts[i], 0.0)
+        inside = offset <= self.lengths[i]
+        mapped = self.regions[i, 0] + offset
+        if side == "start":
+            nxt = np.minimum(i + 1, len(self.regions) - 1)
+            fallback = np.where(i + 1 < len(self.regions), self.regions[nxt, 0], self.regions[i, 1])
+        else:
+            fallback = self.regions[i, 1]
+        out = np.where(inside, mapped, fallback) / self.sr
+        return float(out) if out.ndim == 0 else out
+
+    def _map_items(self, items: Sequence[Dict[str, Any]]) -> None:
+        if self.is_identity or not items:
+            return
+        starts = self.to_original([x["start"] for x in items], "start")
+        ends = self.to_original([x["end"] for x in items], "end")
+        for x, s, e in zip(items, starts, ends):
+            x["start"], x["end"] = float(s), float(max(s, e))
+
+    def map_words(self, words: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Kelime listesinin zamanlarını yerinde orijinale çevirir."""
+        self._map_items(words)
+        return words
+
+    def map_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """transcribe_audio çıktısı (segment + kelimeler) -> orijinal zaman, süre orijinal uzunluk."""
+        segments = result.get("segments") or []
+        self._map_items(segments)
+        self._map_items([w for s in segments for w in (s.get("words") or [])])
+        result["duration"] = self.total_seconds
+        return result
+
+    def map_turns(self, turns: Iterable[Tuple[float, float, str]]) -> List[Tuple[float, float, str]]:
+        """
+        Turn'leri orijinal zamana çevirir. Birden çok konuşma bölgesine yayılan turn
+        bölge sınırlarından parçalanır; aradaki kesilmiş sessizliğe konuşmacı yazılmaz.
+        """
+        turns = list(turns)
+        if self.is_identity or not len(self.regions):
+            return turns
+        sr = self.sr
+        region_starts = self.starts / sr
+        region_ends = (self.starts + self.lengths) / sr
+        out = []
+        for start, end, speaker in turns:
+            first = max(0, int(np.searchsorted(region_ends, start, side="right")))
+            last = int(np.searchsorted(region_starts, end, side="left"))
+            for i in range(first, min(last, len(self.regions))):
+                a, b = max(start, region_starts[i]), min(end, region_ends[i])
+                if b <= a:
+                    continue
+                base = self.regions[i, 0] / sr - region_starts[i]
+                out.append((float(a + base), float(b + base), speaker))
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"regions": self.regions.tolist(), "total": self.total, "sr": self.sr,
+                "speech_seconds": round(self.speech_seconds, 3), "ratio": round(self.ratio, 4)}
+
+
+def detect_speech(audio: np.ndarray, sr: int = SAMPLE_RATE, backend: Optional[str] = None,
+                  min_silence: float = MIN_SILENCE_SECONDS, pad: float = PAD_SECONDS,
+                  max_ratio: float = MAX_SPEECH_RATIO) -> SpeechMap:
+    """
+    Konuşma bölgelerini bulur. Konuşma oranı max_ratio'nun üstündeyse (kesmeye
+    değmez) birim eşleme döner; compact() sesi kopyalamadan olduğu gibi verir.
+    """
+    backend = backend or VAD_BACKEND
+    if backend not in _DETECTORS:
+        raise KeyError(f"Bilinmeyen VAD: {backend} (seçenekler: {', '.join(_DETECTORS)})")
+    raw = _DETECTORS[backend](audio, sr)
+    regions = postprocess(raw, audio.size, sr, min_silence=min_silence, pad=pad)
+    speech = SpeechMap(regions, audio.size, sr)
+    if len(regions) and speech.ratio > max_ratio:
+        return SpeechMap.identity(audio.size, sr)
+    return speech
+
+
+def vad_params(enabled: Optional[bool] = None) -> Optional[Dict[str, Any]]:
+    """Önbellek anahtarlarına girecek VAD ayarları (kapalıysa None)."""
+    if not (VAD_ENABLED if enabled is None else enabled):
+        return None
+    return {"backend": VAD_BACKEND, "min_silence": MIN_SILENCE_SECONDS, "pad": PAD_SECONDS}
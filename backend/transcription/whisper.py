@@ -6,6 +6,12 @@ Kullanım (CLI):
     python transcription/whisper.py --audio path/to/audio.(wav|mp3|m4a|ogg|webm) \
         --lang tr --model small --device cpu --compute-type int8_float16 --json-out out.json
 
+    Uzun kayıtlar (parçalı, çok süreçli):
+    python transcription/whisper.py --audio toplanti.wav --chunk-seconds 120 --workers 4
+
+    Toplu mod (klasör / glob, tek model, JSONL çıktı, kaldığı yerden devam):
+    python transcription/whisper.py batch kayitlar/ "arsiv/*.mp3" --out sonuc.jsonl
+
 Modül olarak:
     from transcription.whisper import transcribe_file
     result = transcribe_file("input.wav", lang="tr")
@@ -14,22 +20,25 @@ Modül olarak:
 import os
 import sys
 import json
-import tempfile
-import shutil
-import subprocess
-from functools import lru_cache
 from typing import Dict, Any, Optional
 
-# faster-whisper: pip install faster-whisper
-from faster_whisper import WhisperModel     
+import numpy as np
+
+# CLI olarak çalıştırıldığında `transcription` paketini bulabilmek için
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# faster-whisper: pip install faster-whisper (model kayıt defteri tembel import eder)
+from transcription.models import get_whisper_model
+
+# Ses bir kez diskteki 16k mono WAV'a çözülür ve bellek eşlemeli okunur (transcription/audio_source.py)
+from transcription.audio_source import open_audio
+
+# Aynı ses + aynı parametreler -> önbellekten (transcription/cache.py)
+from transcription.cache import cached
 
-# pydub + ffmpeg fallback için (opsiyonel ama önerilir)
-# pip install pydub soundfile librosa
-try:
-    from pydub import AudioSegment  # type: ignore
-    _HAS_PYDUB = True
-except Exception:
-    _HAS_PYDUB = False
+# Uzun sessizlikler modele verilmez (transcription/vad.py)
+from transcription.vad import VAD_ENABLED, detect_speech, vad_params
 
 
 # -------------------------------
@@ -42,97 +51,108 @@ DEFAULT_DEVICE = os.getenv("DEVICE", "cpu")
 DEFAULT_COMPUTE = "int8"
 
 
-
-def _which(cmd: str) -> Optional[str]:
-    """Sistemde komut var mı (ffmpeg/ffprobe kontrolü gibi)."""
-    return shutil.which(cmd)
-
-
-def _convert_to_wav_16k_mono(src_path: str) -> str:
-    """
-    Girdi dosyasını 16 kHz mono WAV'a çevirir ve geçici bir dosya döner.
-    Önce ffmpeg dene; yoksa pydub ile dene.
-    """
-    # Geçici çıkış
-    tmp_out = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-    tmp_out_path = tmp_out.name
-    tmp_out.close()
-
-    ffmpeg_bin = _which("ffmpeg")
-
-    if ffmpeg_bin:
-        # ffmpeg hızlı ve güvenilir
-        cmd = [
-            ffmpeg_bin,
-            "-y",                # üzerine yaz
-            "-i", src_path,
-            "-ac", "1",          # mono
-            "-ar", "16000",      # 16 kHz
-            "-f", "wav",
-            tmp_out_path,
-        ]
-        proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        if proc.returncode != 0:
-            # ffmpeg hata verirse pydub ile dene
-            if _HAS_PYDUB:
-                return _convert_with_pydub(src_path, tmp_out_path)
-            else:
-                # pydub yoksa hatayı yükselt
-                raise RuntimeError(
-                    f"ffmpeg dönüştürme hatası: {proc.stderr.decode(errors='ignore')}\n"
-                    "Lütfen ffmpeg kurun (macOS: brew install ffmpeg, Ubuntu: apt install ffmpeg) "
-                    "veya pydub kurun: pip install pydub"
-                )
-        return tmp_out_path
-    # ffmpeg yoksa pydub dene
-    if _HAS_PYDUB:
-        return _convert_with_pydub(src_path, tmp_out_path)
-
-    # İki seçenek de yoksa vaziyet
-    raise RuntimeError(
-        "Ne ffmpeg bulundu ne de pydub kullanılabilir. "
-        "Lütfen ffmpeg kurun (önerilir) veya 'pip install pydub' yapın."
-    )
-
-
-def _convert_with_pydub(src_path: str, dst_path: str) -> str:
-    """pydub ile 16k mono WAV üret (ffmpeg/avlib arka planda gerekebilir)."""
-    try:
-        audio = AudioSegment.from_file(src_path)
-        audio = audio.set_channels(1).set_frame_rate(16000)
-        audio.export(dst_path, format="wav")
-        return dst_path
-    except Exception as e:
-        raise RuntimeError(
-            f"pydub dönüştürme hatası: {e}\n"
-            "ffmpeg kurulu değilse pydub bazı formatlarda sorun yaşayabilir. "
-            "Öneri: ffmpeg kurun."
-        )
-
-
-@lru_cache(maxsize=1)
 def _get_model(model_name: str = DEFAULT_MODEL,
                device: str = DEFAULT_DEVICE,
-               compute_type: str = DEFAULT_COMPUTE) -> WhisperModel:
+               compute_type: str = DEFAULT_COMPUTE,
+               **options: Any):
     """
-    WhisperModel tek sefer yüklenir (cache'li).
+    WhisperModel süreç genelindeki kayıt defterinden alınır
+    (bkz. transcription/models.py); her (model, cihaz, compute_type) bir kez yüklenir.
     device: 'cpu' veya 'cuda'
     compute_type:
       - CPU: 'int8_float16' iyi dengedir
       - GPU: 'float16' genelde en iyisi
     """
-    return WhisperModel(model_name, device=device, compute_type=compute_type)
+    return get_whisper_model(model_name, device=device, compute_type=compute_type, **options)
+
+
+def load_model(model_name: str = DEFAULT_MODEL,
+               device: str = DEFAULT_DEVICE,
+               compute_type: str = DEFAULT_COMPUTE,
+               cpu_threads: int = 0,
+               num_workers: int = 1):
+    """
+    transcribe_audio'nun kullanacağı modeli aynı seçeneklerle yükler; ön yükleme
+    (toplu mod, benchmark) bunu çağırırsa kayıt defterinde aynı girdi ısınır.
+    """
+    options = {"num_workers": num_workers} if num_workers > 1 else {}
+    return _get_model(model_name=model_name, device=device, compute_type=compute_type,
+                      cpu_threads=cpu_threads, **options)
+
+
+def transcribe_audio(audio: np.ndarray, lang: Optional[str] = "tr",
+                     model_name: str = DEFAULT_MODEL,
+                     device: str = DEFAULT_DEVICE,
+                     compute_type: str = DEFAULT_COMPUTE,
+                     beam_size: int = 5,
+                     cpu_threads: int = 0,
+                     num_workers: int = 1,
+                     vad: bool = False) -> Dict[str, Any]:
+    """
+    Önceden çözülmüş 16 kHz mono float32 sesi transkribe eder
+    (bkz. transcribe_file; dönen şekil aynıdır).
+    cpu_threads: 0 -> CTranslate2 varsayılanı.
+    num_workers: >1 ise aynı model birden çok thread'den eşzamanlı çağrılabilir (toplu mod).
+    vad: True ise yalnızca konuşma bölgeleri çözülür; zamanlar orijinal sese göredir.
+    """
+    if vad:
+        speech = detect_speech(audio)
+        if not speech.is_identity:
+            if not len(speech.regions):
+                return {"language": lang, "duration": speech.total_seconds, "segments": []}
+            result = transcribe_audio(speech.compact(audio), lang=lang, model_name=model_name,
+                                      device=device, compute_type=compute_type, beam_size=beam_size,
+                                      cpu_threads=cpu_threads, num_workers=num_workers)
+            return speech.map_result(result)
+
+    model = load_model(model_name, device=device, compute_type=compute_type,
+                       cpu_threads=cpu_threads, num_workers=num_workers)
+
+    segments, info = model.transcribe(
+        audio,
+        language=lang,           # dili biliyorsan set et; bilmiyorsan None bırakıp otomatiğe verilebilir
+        beam_size=beam_size,
+        word_timestamps=True,    # kelime zaman damgaları
+        vad_filter=False         # VAD bizde (transcription/vad.py, vad=True)
+    )
+
+    out_segments = []
+    for s in segments:
+        out_segments.append({
+            "start": s.start,
+            "end": s.end,
+            "text": (s.text or "").strip(),
+            "words": [
+                {"start": w.start, "end": w.end, "word": w.word}
+                for w in (s.words or [])
+            ]
+        })
+
+    return {
+        "language": info.language,
+        "duration": info.duration,
+        "segments": out_segments
+    }
 
 
 def transcribe_file(input_path: str, lang: str = "tr",
                     model_name: str = DEFAULT_MODEL,
                     device: str = DEFAULT_DEVICE,
-                    compute_type: str = DEFAULT_COMPUTE) -> Dict[str, Any]:
+                    compute_type: str = DEFAULT_COMPUTE,
+                    chunk_seconds: Optional[float] = None,
+                    workers: Optional[int] = None,
+                    use_cache: bool = True,
+                    vad: Optional[bool] = None) -> Dict[str, Any]:
     """
-    Verilen ses dosyasını (wav/mp3/ogg/webm/m4a vs.) önce 16k mono WAV'a çevirir,
-    sonra faster-whisper ile kelime zaman damgalarıyla transkribe eder.
+    Verilen ses dosyasını (wav/mp3/ogg/webm/m4a vs.) 16k mono kaynak olarak açar
+    (bellek eşlemeli, bkz. transcription/audio_source.py), sonra faster-whisper ile kelime zaman damgalarıyla transkribe eder.
     JSON-uyumlu dict döner.
 
+    chunk_seconds verilirse ses sessizlik noktalarından parçalanır ve parçalar
+    `workers` süreçte paralel işlenir (bkz. transcription/chunked.py).
+    Aynı içerik ve parametrelerle tekrar çağrılırsa sonuç önbellekten döner.
+    vad (None -> PIPELINE_VAD): uzun sessizlikler atlanır, zamanlar orijinal sese göredir.
+
     Dönen şekil:
     {
       "language": "tr",
@@ -150,46 +170,37 @@ def transcribe_file(input_path: str, lang: str = "tr",
     """
     if not os.path.exists(input_path):
         raise FileNotFoundError(f"Ses dosyası bulunamadı: {input_path}")
+    vad = VAD_ENABLED if vad is None else vad
+
+    def _compute() -> Dict[str, Any]:
+        # 1) 16k mono float32, bellek eşlemeli (sayfalar okundukça yüklenir)
+        source = open_audio(input_path)
+        audio = source.samples()
+
+        # 2) Sessizlik atılır; sıkıştırılmış ses de diskte, bellek eşlemeli (compact_source)
+        speech = detect_speech(audio) if vad else None
+        if speech is not None and not len(speech.regions):
+            return {"language": lang, "duration": speech.total_seconds, "segments": []}
+        compact = source if speech is None else speech.compact_source(source)
+
+        # 3) Modeli al & transcribe
+        if chunk_seconds:
+            from transcription.chunked import transcribe_chunked
+            # İşçiler pencerelerini (sıkıştırılmış) dosyadan kendileri okur
+            result = transcribe_chunked(compact, lang=lang,
+                                        model_name=model_name, device=device,
+                                        compute_type=compute_type, chunk_seconds=chunk_seconds,
+                                        workers=workers)
+        else:
+            result = transcribe_audio(compact.samples(), lang=lang, model_name=model_name,
+                                      device=device, compute_type=compute_type)
+        return speech.map_result(result) if speech is not None and not speech.is_identity else result
 
-    # 1) 16k mono WAV hazırla
-    wav_path = _convert_to_wav_16k_mono(input_path)
-
-    # 2) Modeli al & transcribe
-    model = _get_model(model_name=model_name, device=device, compute_type=compute_type)
-
-    try:
-        segments, info = model.transcribe(
-            wav_path,
-            language=lang,           # dili biliyorsan set et; bilmiyorsan None bırakıp otomatiğe verilebilir
-            word_timestamps=True,    # kelime zaman damgaları
-            vad_filter=False         # kendi VAD akışını ayrı kuracaksan False bırak
-        )
-
-        out_segments = []
-        for s in segments:
-            out_segments.append({
-                "start": s.start,
-                "end": s.end,
-                "text": (s.text or "").strip(),
-                "words": [
-                    {"start": w.start, "end": w.end, "word": w.word}
-                    for w in (s.words or [])
-                ]
-            })
-
-        result = {
-            "language": info.language,
-            "duration": info.duration,
-            "segments": out_segments
-        }
-        return result
-
-    finally:
-        # geçici wav'ı sil
-        try:
-            os.unlink(wav_path)
-        except Exception:
-            pass
+    if not use_cache:
+        return _compute()
+    params = {"model": model_name, "compute_type": compute_type, "lang": lang,
+              "chunk_seconds": chunk_seconds, "vad": vad_params(vad)}
+    return cached("whisper", input_path, params, _compute)
 
 
 # -------------------------------
@@ -204,11 +215,62 @@ def _parse_args(argv=None):
     parser.add_argument("--device", default=DEFAULT_DEVICE, help=f"cpu veya cuda (varsayılan: {DEFAULT_DEVICE})")
     parser.add_argument("--compute-type", default=DEFAULT_COMPUTE,
                         help=f"Örn. cpu: int8_float16, gpu: float16 (varsayılan: {DEFAULT_COMPUTE})")
+    parser.add_argument("--chunk-seconds", type=float, default=None,
+                        help="Uzun kayıtları bu uzunlukta parçalara bölüp paralel işle (örn: 120)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parçalı modda süreç sayısı (varsayılan: WHISPER_WORKERS ya da chunked.default_workers)")
+    parser.add_argument("--no-cache", action="store_true", help="Sonuç önbelleğini kullanma")
+    parser.add_argument("--no-vad", action="store_true", help="Sessizlikleri atlama, tüm sesi çöz")
     parser.add_argument("--json-out", default=None, help="Sonucu JSON dosyasına yaz (örn: out.json)")
     return parser.parse_args(argv)
 
 
+def _parse_batch_args(argv):
+    import argparse
+    parser = argparse.ArgumentParser(prog="whisper.py batch",
+                                     description="Klasör / glob üzerinden toplu transkripsiyon (JSONL)")
+    parser.add_argument("inputs", nargs="+", help="Ses dosyaları, klasörler veya glob desenleri")
+    parser.add_argument("--out", required=True, help="JSONL çıktı dosyası (devam etmek için de kullanılır)")
+    parser.add_argument("--lang", default="tr", help="Dil (ör: tr, en). Boş bırakılırsa otomatik tespit.")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help=f"Model adı (varsayılan: {DEFAULT_MODEL})")
+    parser.add_argument("--device", default=DEFAULT_DEVICE, help=f"cpu veya cuda (varsayılan: {DEFAULT_DEVICE})")
+    parser.add_argument("--compute-type", default=DEFAULT_COMPUTE,
+                        help=f"Örn. cpu: int8_float16, gpu: float16 (varsayılan: {DEFAULT_COMPUTE})")
+    parser.add_argument("--beam-size", type=int, default=5)
+    parser.add_argument("--decode-workers", type=int, default=2, help="Ses çözme thread sayısı")
+    parser.add_argument("--infer-workers", type=int, default=1,
+                        help="Aynı modeli paylaşan transkripsiyon thread sayısı")
+    parser.add_argument("--no-recursive", action="store_true", help="Klasörlerin alt klasörlerine inme")
+    parser.add_argument("--no-resume", action="store_true", help="Çıktı dosyasındaki bitmiş dosyaları yeniden işle")
+    parser.add_argument("--no-cache", action="store_true", help="Sonuç önbelleğini kullanma")
+    return parser.parse_args(argv)
+
+
+def _batch_main(argv):
+    from transcription.batch import collect_inputs, run_batch
+    args = _parse_batch_args(argv)
+    paths = collect_inputs(args.inputs, recursive=not args.no_recursive)
+    if not paths:
+        print("[HATA] Girdi ses dosyası bulunamadı.", file=sys.stderr)
+        sys.exit(1)
+    summary = run_batch(paths, args.out, lang=args.lang if args.lang else None,
+                        model_name=args.model, device=args.device, compute_type=args.compute_type,
+                        beam_size=args.beam_size, decode_workers=args.decode_workers,
+                        infer_workers=args.infer_workers, use_cache=not args.no_cache,
+                        resume=not args.no_resume)
+    print(f"[ÖZET] {summary['ok']} tamam, {summary['failed']} hata, {summary['skipped']} atlandı | "
+          f"{summary['audio_seconds'] / 3600:.2f} saat ses, {summary['wall_seconds'] / 3600:.2f} saat duvar | "
+          f"{summary['audio_hours_per_hour']:.2f} ses-saati / saat", file=sys.stderr)
+    print(json.dumps(summary, ensure_ascii=False))
+    if summary["failed"]:
+        sys.exit(2)
+
+
 def _main():
+    # Alt komut: `batch`; aksi halde eski tek dosyalık --audio arayüzü
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        _batch_main(sys.argv[2:])
+        return
     args = _parse_args()
     try:
         result = transcribe_file(
@@ -216,7 +278,11 @@ def _main():
             lang=args.lang if args.lang else None,
             model_name=args.model,
             device=args.device,
-            compute_type=args.compute_type
+            compute_type=args.compute_type,
+            chunk_seconds=args.chunk_seconds,
+            workers=args.workers,
+            use_cache=not args.no_cache,
+            vad=False if args.no_vad else None
         )
         txt = json.dumps(result, ensure_ascii=False, indent=2)
         if args.json_out:
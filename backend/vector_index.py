@@ -0,0 +1,218 @@
+"""
+Not parçaları için yerel vektör indeksi (anlamsal arama).
+
+Anahtar kelime araması (FTS5) başka kelimelerle söylenmiş ifadeleri kaçırır.
+Her not parçası bir gömme (embedding) vektörüne çevrilir ve diskte tek bir
+bitişik float32 matris olarak tutulur:
+
+    <dizin>/vectors.f32   (n, dim) float32, satır satır eklenir
+    <dizin>/ids.i64       (n,) int64, satırın note_chunks.id değeri
+    <dizin>/meta.json     {"dim": .., "embedder": ..}
+
+Matris np.memmap ile okunur; yeni parçalar dosyanın sonuna eklenir, indeks
+yeniden kurulmaz. Vektörler L2-normalize saklandığı için kosinüs benzerliği
+tek bir matris-vektör çarpımıdır (100k × 384 ≈ birkaç ms).
+
+Gömücü değiştirilebilir: varsayılan `HashingEmbedder` tamamen yerel ve
+deterministiktir (özellik hashleme; testler/çevrimdışı kullanım için),
+`OpenAIEmbedder` gerçek anlamsal vektörler üretir. Gömücü adı ya da boyutu
+değişirse indeks sıfırlanır ve veritabanından yeniden doldurulur.
+
+Modül olarak:
+    from vector_index import VectorIndex, get_embedder
+    emb = get_embedder()
+    index = VectorIndex("notlar.vectors", emb.dim, emb.name)
+    index.add([1, 2], emb.embed(["ilk parça", "ikinci parça"]))
+    ids, scores = index.search(emb.embed(["soru"])[0], k=5)
+
+Ortam değişkenleri:
+    EMBEDDER=hash|openai     Gömücü (varsayılan: hash)
+    EMBEDDING_MODEL          OpenAI modeli (varsayılan: text-embedding-3-small)
+    EMBEDDING_DIM            Vektör boyutu (varsayılan: hash 384, openai 512)
+"""
+
+import json
+import os
+import re
+import threading
+import zlib
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from textnorm import fold_text
+
+EMBEDDER = os.getenv("EMBEDDER", "hash")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+
+_TOKEN = re.compile(r"\w+")
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+# -------------------------------
+# Gömücüler
+# -------------------------------
+class HashingEmbedder:
+    """
+    Deterministik yerel gömücü (özellik hashleme).
+
+    Kelimeler, 5 harflik kökler (Türkçe ekleri kabaca yok sayar) ve kelime
+    içi harf üçlüleri CRC32 ile `dim` kovaya işaretli olarak dağıtılır.
+    Model ya da ağ gerektirmez; aynı metin her zaman aynı vektörü verir.
+    """
+
+    def __init__(self, dim: int = int(os.getenv("EMBEDDING_DIM", "384"))):
+        self.dim = dim
+        self.name = f"hash-v2-{dim}"   # v2: fold_text ile katlama (eski indeks yeniden kurulur)
+
+    def _features(self, text: str) -> List[str]:
+        feats = []
+        for token in _TOKEN.findall(fold_text(text)):
+            feats.append(token)
+            if len(token) > 5:
+                feats.append("~" + token[:5])
+            padded = f"#{token}#"
+            feats.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return feats
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in self._features(text)),
+                                 dtype=np.uint32)
+            if hashes.size == 0:
+                continue
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+            out[row] = np.bincount(hashes % self.dim, weights=signs, minlength=self.dim)
+        return _normalize(out)
+
+
+class OpenAIEmbedder:
+    """OpenAI embeddings API ile gömme (istemci verilmezse OPENAI_API_KEY ile açılır)."""
+
+    batch_size = 256
+
+    def __init__(self, model: str = EMBEDDING_MODEL,
+                 dim: int = int(os.getenv("EMBEDDING_DIM", "512")), client=None):
+        self.model = model
+        self.dim = dim
+        self.name = f"openai:{model}:{dim}"
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import OpenAI
+            self._client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return self._client
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        rows = []
+        for i in range(0, len(texts), self.batch_size):
+            res = self.client.embeddings.create(model=self.model, dimensions=self.dim,
+                                                input=list(texts[i:i + self.batch_size]))
+            rows.extend(item.embedding for item in res.data)
+        if not rows:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return _normalize(np.asarray(rows, dtype=np.float32))
+
+
+def get_embedder(kind: str = EMBEDDER):
+    if kind == "openai":
+        return OpenAIEmbedder()
+    if kind == "hash":
+        return HashingEmbedder()
+    raise ValueError(f"Bilinmeyen gömücü: {kind}")
+
+
+# -------------------------------
+# İndeks
+# -------------------------------
+class VectorIndex:
+    """Diskte bitişik float32 matris; memmap ile okunur, sona eklenerek büyür."""
+
+    def __init__(self, path: str, dim: int, embedder_name: str):
+        self.path = path
+        self.dim = dim
+        os.makedirs(path, exist_ok=True)
+        self._vec_path = os.path.join(path, "vectors.f32")
+        self._ids_path = os.path.join(path, "ids.i64")
+        self._meta_path = os.path.join(path, "meta.json")
+        self._lock = threading.Lock()
+
+        meta = {"dim": dim, "embedder": embedder_name}
+        files_ok = os.path.exists(self._vec_path) and os.path.exists(self._ids_path)
+        if not files_ok or self._read_meta() != meta:
+            # Farklı gömücünün vektörleri karşılaştırılamaz -> sıfırdan
+            self._reset(meta)
+        self._remap()
+
+    def _read_meta(self):
+        try:
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _reset(self, meta) -> None:
+        for path in (self._vec_path, self._ids_path):
+            open(path, "wb").close()
+        with open(self._meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    def _remap(self) -> None:
+        row_bytes = self.dim * 4
+        n = min(os.path.getsize(self._vec_path) // row_bytes, os.path.getsize(self._ids_path) // 8)
+        # Yarım kalmış bir ekleme (çökme) varsa iki dosya da son tam satıra kırpılır
+        if os.path.getsize(self._vec_path) != n * row_bytes:
+            os.truncate(self._vec_path, n * row_bytes)
+        if os.path.getsize(self._ids_path) != n * 8:
+            os.truncate(self._ids_path, n * 8)
+        if n:
+            self._matrix = np.memmap(self._vec_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+        else:
+            self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+        self._ids = np.fromfile(self._ids_path, dtype=np.int64, count=n)
+
+    def __len__(self) -> int:
+        return self._ids.shape[0]
+
+    @property
+    def last_id(self) -> int:
+        """En son eklenen parça id'si (artımlı senkron için)."""
+        ids = self._ids
+        return int(ids[-1]) if ids.size else 0
+
+    def add(self, ids: Sequence[int], vectors: np.ndarray) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        ids = np.asarray(ids, dtype=np.int64)
+        if ids.shape[0] != vectors.shape[0]:
+            raise ValueError("id ve vektör sayısı eşleşmiyor")
+        if ids.size == 0:
+            return
+        with self._lock:
+            with open(self._vec_path, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._ids_path, "ab") as f:
+                f.write(ids.tobytes())
+            self._remap()
+
+    def search(self, query: np.ndarray, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Kosinüs benzerliğine göre en yakın k satır: (ids, skorlar), azalan sırada."""
+        matrix, ids = self._matrix, self._ids   # anlık görüntü; eklemeler bunu bozmaz
+        n = ids.shape[0]
+        if n == 0 or k <= 0:
+            return ids[:0], np.zeros(0, dtype=np.float32)
+        q = np.asarray(query, dtype=np.float32).reshape(self.dim)
+        scores = matrix @ q
+        if k < n:
+            top = np.argpartition(scores, n - k)[n - k:]
+        else:
+            top = np.arange(n)
+        top = top[np.argsort(scores[top])[::-1]]
+        return ids[top], scores[top]
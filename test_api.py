@@ -1,4 +1,10 @@
 # Dosya: test_api.py
+import os
+import sys
+
+# backend modülleri birbirini `transcription.*` olarak import eder
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
 from backend.cloud_api import CloudTranscriber
 
 # 1. Robotu Hazırla